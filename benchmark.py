@@ -0,0 +1,345 @@
+"""
+db_manager benchmark suite.
+
+Times every public db_manager data function (and the notification
+fetch path) against a scratch database, pytest-benchmark style: a
+warm-up call, then N timed rounds reported as min / max / mean /
+median / stddev / ops. Results are written as JSON so runs can be
+compared across commits:
+
+    python datagen.py bench.db --owners 50000 --prescriptions 1000000
+    python benchmark.py bench.db --out before.json
+    ... change something ...
+    python benchmark.py bench.db --out after.json --compare before.json
+
+Write functions run against the scratch DB too, so it grows a little
+with every run; regenerate it for strict like-for-like numbers.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import platform
+import argparse
+import statistics
+import subprocess
+from types import SimpleNamespace
+from datetime import date, datetime, timedelta
+
+import db_manager
+
+# functions that manage the connection / schema rather than read or write clinic data
+NOT_BENCHMARKED = {
+    "get_connection", "configure", "configure_pool", "pool_stats",
+    "reset_pool_stats", "close_pool", "checkpoint", "start_checkpoint_scheduler",
+    "shutdown", "schema_version", "use_database", "check_query_plans",
+    "rebuild_daily_summary", "open_read_only", "group_transaction",
+    # outbox state transitions, driven by the dispatcher and CalendarPage (claim_next_reminder covers them)
+    "mark_reminder_sent", "mark_reminder_failed", "requeue_interrupted_reminders",
+    "retry_failed_reminders", "dismiss_failed_reminders",
+}
+
+
+# ── Fixtures ──
+
+def _sample() -> SimpleNamespace:
+    """Pick realistic arguments (ids, names, date ranges) from the scratch DB."""
+    conn = db_manager.get_connection(); cur = conn.cursor()
+
+    def one(sql):
+        row = cur.execute(sql).fetchone()
+        return row[0] if row else None
+
+    owner_id = one("""
+        SELECT owner_id FROM pets GROUP BY owner_id
+         ORDER BY COUNT(*) DESC, owner_id LIMIT 1
+    """) or 1
+    pet = cur.execute("""
+        SELECT p.id, p.pet_name, s.name AS species, p.first_visit, p.gender
+          FROM pets p JOIN species s ON s.id = p.species_id
+         WHERE p.owner_id = ? LIMIT 1
+    """, (owner_id,)).fetchone()
+    # unexpired, so dispense() can take from it
+    item = cur.execute("SELECT * FROM inventory WHERE expiration_date >= date('now') "
+                       "ORDER BY quantity DESC LIMIT 1").fetchone()
+    s = SimpleNamespace(
+        owner_id   = owner_id,
+        phone      = one(f"SELECT phone FROM owners WHERE id = {owner_id}") or "",
+        owner_name = (one(f"SELECT name FROM owners WHERE id = {owner_id}") or "a")[:3],
+        pet        = dict(pet) if pet else None,
+        pet_id     = one("SELECT pet_id FROM visits GROUP BY pet_id ORDER BY COUNT(*) DESC LIMIT 1"),
+        visit_id   = one("SELECT visit_id FROM prescriptions GROUP BY visit_id "
+                         "ORDER BY COUNT(*) DESC LIMIT 1"),
+        appt_visit = one("SELECT visit_id FROM future_appointments LIMIT 1"),
+        item       = dict(item) if item else None,
+        reason_id  = one("SELECT id FROM reasons LIMIT 1"),
+        last_day   = one("SELECT MAX(visit_date) FROM visits") or date.today().isoformat(),
+    )
+    conn.close()
+
+    last = date.fromisoformat(s.last_day)
+    s.month = ((last - timedelta(days=30)).isoformat(), last.isoformat())
+    s.year  = ((last - timedelta(days=365)).isoformat(), last.isoformat())
+    s.today = date.today().isoformat()
+    s.week  = (date.today() + timedelta(days=7)).isoformat()
+    return s
+
+
+def _counter():
+    n = [0]
+    def nxt():
+        n[0] += 1
+        return f"{os.getpid()}-{time.monotonic_ns()}-{n[0]}"
+    return nxt
+
+
+def build_cases(s: SimpleNamespace) -> list[tuple[str, str, object]]:
+    """(group, name, zero-arg callable) for each benchmarked function."""
+    dm  = db_manager
+    uid = _counter()
+    pet = s.pet or {"id": 1, "pet_name": "Max", "species": "Cat",
+                    "first_visit": s.today, "gender": "Male"}
+    item = s.item or {"id": 1, "name": "Bench", "category": "", "quantity": 0,
+                      "unit": "", "reorder_level": 0, "expiration_date": s.week,
+                      "default_sell_price": 1.0}
+
+    def batch():
+        return {"name": f"Bench {uid()}", "category": "Bench", "quantity": 10,
+                "unit": "tablet", "reorder_level": 1, "expiration_date": s.week,
+                "default_sell_price": 2.0}
+
+    def delete_item():
+        dm.delete_inventory_item(dm.add_or_restock_inventory(batch()))
+
+    def visit():
+        return {"pet_id": pet["id"], "visit_date": s.today, "notes": "bench",
+                "doctor_name": "Bench"}
+
+    def commit_visit():
+        dm.commit_visit(visit(),
+                        [{"date": s.week, "reason": "Follow up"}],
+                        [{"inventory_id": item["id"], "med_name": item["name"],
+                          "is_inventory": 1, "quantity": 0,
+                          "unit_price": item["default_sell_price"]},
+                         {"inventory_id": None, "med_name": "External",
+                          "is_inventory": 0, "quantity": 1, "unit_price": 10.0}])
+
+    def claim_reminder():
+        r = dm.claim_next_reminder(time.time())
+        if r:
+            dm.mark_reminder_sent(r["id"])
+
+    read = [
+        ("get_owner_by_phone",        lambda: dm.get_owner_by_phone(s.phone)),
+        ("get_all_species",           dm.get_all_species),
+        ("get_pets_by_owner",         lambda: dm.get_pets_by_owner(s.owner_id)),
+        ("find_pet",                  lambda: dm.find_pet(s.owner_id, pet["species"], pet["pet_name"])),
+        ("get_all_inventory",         dm.get_all_inventory),
+        ("get_inventory_names",       dm.get_inventory_names),
+        ("get_stock_snapshot",        dm.get_stock_snapshot),
+        ("get_inventory_page",        lambda: dm.get_inventory_page((item["name"], "", 0))),
+        ("get_low_stock_items",       dm.get_low_stock_items),
+        ("get_expiring_items",        lambda: dm.get_expiring_items(s.week)),
+        ("get_inventory_batches",     lambda: dm.get_inventory_batches(item["name"])),
+        ("get_visits_by_pet",         lambda: dm.get_visits_by_pet(s.pet_id)),
+        ("get_prescriptions_by_visit", lambda: dm.get_prescriptions_by_visit(s.visit_id)),
+        ("get_dispensed_batches",     lambda: dm.get_dispensed_batches(s.visit_id)),
+        ("find_owners_by_name",       lambda: dm.find_owners_by_name(s.owner_name)),
+        ("search_owners",             lambda: dm.search_owners(s.owner_name)),
+        ("get_patient_history",       lambda: dm.get_patient_history(s.owner_id)),
+        ("get_financial_summary",     lambda: dm.get_financial_summary(*s.year)),
+        ("get_revenue_and_cost",      lambda: dm.get_revenue_and_cost(*s.month)),
+        ("get_appointment_count",     lambda: dm.get_appointment_count(*s.month)),
+        ("get_total_cost",            lambda: dm.get_total_cost(*s.month)),
+        ("get_all_reasons",           dm.get_all_reasons),
+        ("get_change_versions",       dm.get_change_versions),
+        ("get_future_appointments_by_visit",
+                                      lambda: dm.get_future_appointments_by_visit(s.appt_visit)),
+        ("get_upcoming_appointments", lambda: dm.get_upcoming_appointments(s.today)),
+        ("get_appointments_between",  lambda: dm.get_appointments_between(*s.month)),
+        ("get_appointment_counts",    lambda: dm.get_appointment_counts(*s.month)),
+        ("get_appointments_on",       lambda: dm.get_appointments_on(s.week)),
+        ("get_report_details",        lambda: dm.get_report_details(*s.month)),
+        ("get_purchase_details",      lambda: dm.get_purchase_details(*s.year)),
+        ("get_sales_details",         lambda: dm.get_sales_details(*s.month)),
+        ("get_visit_details",         lambda: dm.get_visit_details(*s.month)),
+        ("get_visit_report_details",  lambda: dm.get_visit_report_details(*s.month)),
+        ("get_purchase_page",         lambda: dm.get_purchase_page(*s.year)),
+        ("get_sales_page",            lambda: dm.get_sales_page(*s.year)),
+        ("get_visit_report_page",     lambda: dm.get_visit_report_page(*s.year)),
+        ("get_report_page",           lambda: dm.get_report_page("sales", *s.year)),
+        ("iter_report_pages",         lambda: next(dm.iter_report_pages("sales", *s.year), None)),
+        ("iter_report_rows",          lambda: sum(1 for _ in dm.iter_report_rows("sales", *s.year))),
+        ("stream_report",             lambda: sum(1 for _ in dm.stream_report("sales", *s.year))),
+        ("stream_daily_summary",      lambda: sum(1 for _ in dm.stream_daily_summary(*s.year))),
+        ("get_outbox_counts",         dm.get_outbox_counts),
+        ("get_next_reminder_due",     dm.get_next_reminder_due),
+    ]
+    write = [
+        ("add_owner",        lambda: dm.add_owner({"name": "Bench Owner", "phone": f"b{uid()}"})),
+        ("add_species",      lambda: dm.add_species(pet["species"])),
+        ("add_pet",          lambda: dm.add_pet({"owner_id": s.owner_id, "pet_name": f"B{uid()}",
+                                                 "species": pet["species"],
+                                                 "first_visit": s.today, "gender": "Male"})),
+        ("update_pet",       lambda: dm.update_pet(pet["id"], pet)),
+        ("add_or_restock_inventory", lambda: dm.add_or_restock_inventory({**item, "quantity": 0})),
+        ("bulk_restock",     lambda: dm.bulk_restock([
+                                 {**batch(), "purchase_date": s.today, "unit_cost": 1.0}
+                                 for _ in range(50)])),
+        ("update_inventory_item", lambda: dm.update_inventory_item(item["id"], item)),
+        ("set_reorder_level", lambda: dm.set_reorder_level(item["id"], item["reorder_level"])),
+        ("delete_inventory_item", delete_item),
+        ("add_visit",        lambda: dm.add_visit(visit())),
+        ("add_prescription", lambda: dm.add_prescription({
+                                 "visit_id": s.visit_id, "inventory_id": None,
+                                 "med_name": "Bench", "is_inventory": 0,
+                                 "quantity": 1, "unit_price": 1.0})),
+        ("add_purchase",     lambda: dm.add_purchase(item["id"], s.today, 1, 1.0)),
+        ("add_reason",       lambda: dm.add_reason("Follow up")),
+        ("add_future_appointment",
+                             lambda: dm.add_future_appointment(s.visit_id, s.week, s.reason_id)),
+        ("commit_visit",     commit_visit),
+        ("dispense",         lambda: (dm.add_or_restock_inventory({**item, "quantity": 1}),
+                                      dm.dispense(item["name"], 1))),
+        ("enqueue_reminders", lambda: dm.enqueue_reminders([
+                                 {"phone": s.phone, "message": "bench", "mode": "auto",
+                                  "appointment_date": s.week}])),
+        ("claim_next_reminder", claim_reminder),
+    ]
+    cases = [("read", n, f) for n, f in read] + [("write", n, f) for n, f in write]
+
+    # notification_manager imports PyQt5; time its fetch path when available
+    try:
+        from notification_manager import NotificationEngine
+    except ImportError:
+        pass
+    else:
+        engine = NotificationEngine(expiry_days=7)
+        def cold():
+            engine.invalidate()
+            return engine.alerts()
+        cases.append(("notifications", "NotificationManager.fetch_notifications (cold)", cold))
+        cases.append(("notifications", "NotificationManager.fetch_notifications", engine.alerts))
+    return cases
+
+
+def uncovered(cases) -> list[str]:
+    """Public db_manager functions that have no benchmark case."""
+    names = {name for _, name, _ in cases}
+    return sorted(
+        n for n, f in inspect.getmembers(db_manager, inspect.isfunction)
+        if f.__module__ == db_manager.__name__ and not n.startswith("_")
+        and n not in names and n not in NOT_BENCHMARKED
+    )
+
+
+# ── Runner ──
+
+def _stats(times: list[float]) -> dict:
+    mean = statistics.fmean(times)
+    return {
+        "min":    min(times),
+        "max":    max(times),
+        "mean":   mean,
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+        "ops":    1.0 / mean if mean else 0.0,
+    }
+
+
+def run(cases, rounds: int = 20, only: str = None) -> list[dict]:
+    results = []
+    for group, name, fn in cases:
+        if only and only not in name:
+            continue
+        entry = {"group": group, "name": name}
+        try:
+            fn()                                    # warm-up (page cache, statement cache)
+            times = []
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - t0)
+            entry["stats"] = _stats(times)
+            print(f"{name:<42} {entry['stats']['median'] * 1000:>10.3f} ms")
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            print(f"{name:<42} {'ERROR':>10}  {entry['error']}")
+        results.append(entry)
+    return results
+
+
+def _commit_info() -> dict:
+    here = os.path.dirname(os.path.abspath(__file__))
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=here, capture_output=True,
+                                  text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"id": git("rev-parse", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def _table_counts() -> dict:
+    conn = db_manager.get_connection()
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("owners", "pets", "visits", "prescriptions", "purchases",
+                        "inventory", "future_appointments")}
+    conn.close()
+    return counts
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print median change against a previous results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        before = {b["name"]: b for b in json.load(f)["benchmarks"] if "stats" in b}
+    print(f"\n{'function':<42} {'before':>10} {'after':>10} {'change':>8}")
+    for r in results:
+        old = before.get(r["name"])
+        if not old or "stats" not in r:
+            continue
+        a, b = old["stats"]["median"], r["stats"]["median"]
+        change = (b - a) / a * 100 if a else 0.0
+        print(f"{r['name']:<42} {a * 1000:>8.3f}ms {b * 1000:>8.3f}ms {change:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark db_manager against a scratch DB.")
+    ap.add_argument("db", help="scratch database built with datagen.py")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("-k", dest="only", help="only run benchmarks whose name contains this")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="previous results JSON to compare medians against")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"{args.db} not found; build it first with datagen.py")
+    db_manager.use_database(args.db)
+
+    cases = build_cases(_sample())
+    missing = uncovered(cases)
+    if missing:
+        print("warning: no benchmark for " + ", ".join(missing))
+
+    results = run(cases, args.rounds, args.only)
+    report = {
+        "datetime":     datetime.now().isoformat(timespec="seconds"),
+        "machine_info": {"python": platform.python_version(),
+                         "sqlite": db_manager.sqlite3.sqlite_version,
+                         "system": platform.platform(),
+                         "processor": platform.processor()},
+        "commit_info":  _commit_info(),
+        "database":     {"path": db_manager.DB_PATH,
+                         "schema_version": db_manager.schema_version(),
+                         "rows": _table_counts()},
+        "benchmarks":   results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
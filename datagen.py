@@ -0,0 +1,280 @@
+"""
+Synthetic clinic data generator.
+
+Fills a scratch database with realistic owners, pets, visits,
+prescriptions, purchases and future appointments so db_manager and the
+UI pages can be exercised at clinic-years scale, e.g.
+
+    python datagen.py bench.db --owners 50000 --prescriptions 1000000
+
+The real clinic.db is never touched: the target file is passed to
+db_manager.use_database(), which creates and migrates the schema first.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+import db_manager
+
+# ── Vocabulary ──
+
+FIRST_NAMES = [
+    "Ahmed", "Mohamed", "Mahmoud", "Omar", "Youssef", "Mostafa", "Ali",
+    "Hassan", "Khaled", "Tarek", "Karim", "Amr", "Hany", "Sherif", "Ibrahim",
+    "Sara", "Mona", "Nour", "Aya", "Mariam", "Salma", "Heba", "Dina",
+    "Yasmin", "Rana", "Laila", "Farida", "Hana", "Reem", "Nada",
+]
+LAST_NAMES = [
+    "Hassan", "Mahmoud", "Ibrahim", "Abdelrahman", "Saleh", "Farouk",
+    "Mansour", "Fawzy", "Nabil", "Sabry", "Zaki", "Gamal", "Adel", "Fathy",
+    "Kamal", "Shawky", "Hamdy", "Ramadan", "Bayoumi", "Khalil",
+]
+PET_NAMES = [
+    "Max", "Bella", "Luna", "Simba", "Leo", "Milo", "Coco", "Lucy", "Rocky",
+    "Nala", "Oscar", "Lily", "Tiger", "Snow", "Zeus", "Mishmish", "Loz",
+    "Bondok", "Sukkar", "Asal", "Kiki", "Shadow", "Ginger", "Oreo", "Pepper",
+]
+SPECIES = [
+    ("Cat", 45), ("Dog", 35), ("Bird", 8), ("Rabbit", 5), ("Horse", 3),
+    ("Hamster", 2), ("Turtle", 2),
+]
+DOCTORS = ["Dr. Omar", "Dr. Sara", "Dr. Khaled", "Dr. Mona"]
+NOTES = [
+    "Routine checkup", "Vaccination", "Skin allergy", "Ear infection",
+    "Vomiting and diarrhea", "Limping on front leg", "Dental cleaning",
+    "Post-surgery follow up", "Deworming", "Loss of appetite", "",
+]
+REASONS = [
+    "Vaccination booster", "Follow up", "Stitches removal", "Deworming",
+    "Rabies vaccine", "Blood test results", "Dental check", "Grooming",
+]
+# (name, category, unit, sell price)
+MEDICINES = [
+    ("Amoxicillin 250mg", "Antibiotic", "tablet", 12.0),
+    ("Doxycycline 100mg", "Antibiotic", "tablet", 15.0),
+    ("Metronidazole 500mg", "Antibiotic", "tablet", 8.0),
+    ("Meloxicam 1.5mg/ml", "Anti-inflammatory", "bottle", 95.0),
+    ("Prednisolone 5mg", "Steroid", "tablet", 6.0),
+    ("Ivermectin 1%", "Antiparasitic", "ml", 4.0),
+    ("Praziquantel 50mg", "Antiparasitic", "tablet", 18.0),
+    ("Frontline Spray", "Antiparasitic", "bottle", 320.0),
+    ("Rabies Vaccine", "Vaccine", "dose", 150.0),
+    ("DHPPi Vaccine", "Vaccine", "dose", 220.0),
+    ("Tricat Vaccine", "Vaccine", "dose", 240.0),
+    ("Vitamin B Complex", "Supplement", "ml", 3.0),
+    ("Calcium Syrup", "Supplement", "bottle", 60.0),
+    ("Ringer Lactate 500ml", "Fluids", "bag", 35.0),
+    ("Saline 500ml", "Fluids", "bag", 30.0),
+    ("Ear Drops", "Topical", "bottle", 85.0),
+    ("Eye Ointment", "Topical", "tube", 45.0),
+    ("Chlorhexidine Wash", "Topical", "bottle", 70.0),
+    ("Tramadol 50mg", "Analgesic", "tablet", 10.0),
+    ("Omeprazole 20mg", "Gastro", "capsule", 7.0),
+]
+EXTERNAL_MEDS = ["Royal Canin Recovery", "Pharmacy eye drops", "Hill's i/d"]
+
+CHUNK = 20_000
+
+
+def _chunks(rows, size=CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _insert(cur, sql, rows):
+    for part in _chunks(rows):
+        cur.executemany(sql, part)
+
+
+def generate(path: str,
+             owners: int = 5_000,
+             prescriptions: int = 100_000,
+             years: int = 5,
+             seed: int = 1,
+             verbose: bool = True) -> dict:
+    """
+    Fill `path` with synthetic data and return the row counts written.
+    Visits, pets and appointments are scaled from `owners` and
+    `prescriptions` (about 2.5 prescription lines per visit).
+    """
+    rng   = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=365 * years)
+    span  = (today - start).days
+
+    def day(offset: int) -> str:
+        return (start + timedelta(days=offset)).isoformat()
+
+    def say(msg):
+        if verbose:
+            print(msg, flush=True)
+
+    db_manager.use_database(path)
+    conn = db_manager.get_connection()
+    cur  = conn.cursor()
+    t0   = time.perf_counter()
+    counts = {}
+
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+
+        # ── Lookup tables ──
+        cur.executemany("INSERT OR IGNORE INTO species (name) VALUES (?)",
+                        [(s,) for s, _ in SPECIES])
+        cur.executemany("INSERT OR IGNORE INTO reasons (name) VALUES (?)",
+                        [(r,) for r in REASONS])
+        species_ids = {r['name']: r['id'] for r in
+                       cur.execute("SELECT id, name FROM species")}
+        reason_ids  = [r['id'] for r in cur.execute("SELECT id FROM reasons")]
+
+        # ── Owners ──
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM owners")
+        first_owner = cur.fetchone()[0] + 1
+        phones = rng.sample(range(10**7, 10**8), owners)
+        rows = [
+            (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+             f"01{rng.choice('0125')}{p}")
+            for p in phones
+        ]
+        _insert(cur, "INSERT OR IGNORE INTO owners (name, phone) VALUES (?, ?)", rows)
+        counts['owners'] = len(rows)
+        say(f"owners:        {len(rows):>10,}")
+
+        # ── Pets ──
+        names, weights = zip(*SPECIES)
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM pets")
+        first_pet = cur.fetchone()[0] + 1
+        rows = []
+        for owner_id in range(first_owner, first_owner + owners):
+            for _ in range(rng.choices((1, 2, 3, 4), (60, 25, 10, 5))[0]):
+                rows.append((
+                    owner_id,
+                    rng.choice(PET_NAMES),
+                    species_ids[rng.choices(names, weights)[0]],
+                    day(rng.randrange(span)),
+                    rng.choice(("Male", "Female")),
+                ))
+        _insert(cur, """
+            INSERT INTO pets (owner_id, pet_name, species_id, first_visit, gender)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        pet_count = len(rows)
+        first_visits = [r[3] for r in rows]
+        counts['pets'] = pet_count
+        say(f"pets:          {pet_count:>10,}")
+
+        # ── Inventory batches and their purchases ──
+        rows, purchases = [], []
+        for name, category, unit, price in MEDICINES:
+            for _ in range(rng.randint(2, 5)):
+                received = rng.randrange(span)
+                expiry   = min(received + rng.randint(180, 900), span + 720)
+                qty      = rng.randint(0, 400)
+                rows.append((name, category, qty, unit, rng.choice((5, 10, 20)),
+                             day(expiry), price))
+                cost = round(price * rng.uniform(0.45, 0.7), 2)
+                for _ in range(rng.randint(1, 6)):
+                    q = rng.randint(20, 200)
+                    purchases.append((len(rows) - 1,
+                                      day(min(received + rng.randrange(120), span)),
+                                      q, cost, round(q * cost, 2)))
+        inventory_ids = []
+        for row in rows:
+            cur.execute("""
+                INSERT OR IGNORE INTO inventory
+                  (name, category, quantity, unit, reorder_level,
+                   expiration_date, default_sell_price)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, row)
+            cur.execute("SELECT id FROM inventory WHERE name = ? AND expiration_date = ?",
+                        (row[0], row[5]))
+            inventory_ids.append((cur.fetchone()['id'], row[6]))
+        _insert(cur, """
+            INSERT INTO purchases
+              (inventory_id, purchase_date, quantity, unit_cost, total_cost)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(inventory_ids[batch][0], *p) for batch, *p in purchases])
+        counts['inventory'] = len(rows)
+        counts['purchases'] = len(purchases)
+        say(f"inventory:     {len(rows):>10,}")
+        say(f"purchases:     {len(purchases):>10,}")
+
+        # ── Visits ──
+        visits = max(1, round(prescriptions / 2.5))
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM visits")
+        first_visit = cur.fetchone()[0] + 1
+        visit_days = []
+        rows = []
+        for _ in range(visits):
+            idx = rng.randrange(pet_count)
+            off = (date.fromisoformat(first_visits[idx]) - start).days
+            off = rng.randint(off, span)
+            visit_days.append(off)
+            rows.append((first_pet + idx, day(off), rng.choice(NOTES),
+                         rng.choice(DOCTORS)))
+        _insert(cur, """
+            INSERT INTO visits (pet_id, visit_date, notes, doctor_name)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        counts['visits'] = visits
+        say(f"visits:        {visits:>10,}")
+
+        # ── Prescriptions (about 2.5 lines per visit) ──
+        rows = []
+        for i in range(prescriptions):
+            vid = first_visit + (i * visits // prescriptions)
+            if rng.random() < 0.9:
+                inv_id, price = rng.choice(inventory_ids)
+                rows.append((vid, inv_id, None, 1, rng.randint(1, 5), price))
+            else:
+                rows.append((vid, None, rng.choice(EXTERNAL_MEDS), 0,
+                             rng.randint(1, 3), round(rng.uniform(20, 400), 2)))
+        _insert(cur, """
+            INSERT INTO prescriptions
+              (visit_id, inventory_id, med_name, is_inventory, quantity, unit_price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        counts['prescriptions'] = prescriptions
+        say(f"prescriptions: {prescriptions:>10,}")
+
+        # ── Future appointments (60% of visits book a follow-up) ──
+        rows = [
+            (first_visit + i, day(off + rng.randint(7, 90)), rng.choice(reason_ids))
+            for i, off in enumerate(visit_days) if rng.random() < 0.6
+        ]
+        _insert(cur, """
+            INSERT INTO future_appointments (visit_id, appointment_date, reason_id)
+            VALUES (?, ?, ?)
+        """, rows)
+        counts['future_appointments'] = len(rows)
+        say(f"appointments:  {len(rows):>10,}")
+
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    conn = db_manager.get_connection()
+    conn.execute("ANALYZE")
+    conn.close()
+    say(f"done in {time.perf_counter() - t0:.1f}s -> {db_manager.DB_PATH}")
+    return counts
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fill a scratch clinic DB with synthetic data.")
+    ap.add_argument("path", help="database file to create or extend (not clinic.db)")
+    ap.add_argument("--owners", type=int, default=5_000)
+    ap.add_argument("--prescriptions", type=int, default=100_000)
+    ap.add_argument("--years", type=int, default=5, help="history span in years")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    if os.path.abspath(args.path) == os.path.join(os.getcwd(), "clinic.db"):
+        sys.exit("Refusing to write synthetic data into the live clinic.db")
+    generate(args.path, args.owners, args.prescriptions, args.years, args.seed)
@@ -1,20 +1,535 @@
 # db_manager.py
 
 import os
+import re
+import time
+import atexit
+import random
+import logging
 import sqlite3
+import functools
+import threading
+import weakref
+from datetime import date
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
 
-DB_PATH = os.path.join(os.getcwd(), "clinic.db")
+DB_PATH = os.environ.get("CUREVET_DB_PATH") or os.path.join(os.getcwd(), "clinic.db")
+
+log = logging.getLogger(__name__)
+
+# ── Settings ──
+
+@dataclass
+class DBSettings:
+    """
+    Connection tuning for clinic.db, in one place. Each field can be
+    overridden with an environment variable named CUREVET_DB_<FIELD>,
+    e.g. CUREVET_DB_JOURNAL_MODE=DELETE.
+    """
+    pool_size:             int   = 4                  # idle connections per thread
+    pool_max_open:         int   = 32                 # open pooled connections, all threads together
+    journal_mode:          str   = "WAL"
+    network_journal_mode:  str   = "DELETE"           # WAL needs local shared memory
+    synchronous:           str   = "NORMAL"
+    cache_size_kb:         int   = 16384              # page cache per connection
+    mmap_size:             int   = 64 * 1024 * 1024
+    temp_store:            str   = "MEMORY"
+    wal_autocheckpoint:    int   = 1000               # pages
+    busy_timeout_ms:       int   = 5000
+    busy_retries:          int   = 5
+    busy_backoff_s:        float = 0.05               # doubled on every retry
+    checkpoint_idle_s:     float = 30.0               # quiet time before a checkpoint
+    checkpoint_interval_s: float = 15.0               # how often the scheduler looks
+    reference_check_s:     float = 1.0                # how often cached lookups re-read change_log
+    write_group_ms:        float = 20.0               # db_writer: wait this long for more writes to share a commit
+    write_group_max:       int   = 32                 # db_writer: most writes per commit
+
+    @classmethod
+    def from_env(cls) -> "DBSettings":
+        cfg = cls()
+        for f in fields(cls):
+            raw = os.environ.get(f"CUREVET_DB_{f.name.upper()}")
+            if raw is not None:
+                setattr(cfg, f.name, type(getattr(cfg, f.name))(raw))
+        return cfg
+
+
+settings = DBSettings.from_env()
+
+def configure(**changes) -> DBSettings:
+    """
+    Update settings (e.g. configure(cache_size_kb=32768)). Idle pooled
+    connections are closed so the next get_connection() applies them.
+    """
+    for key, value in changes.items():
+        if not hasattr(settings, key):
+            raise AttributeError(f"Unknown database setting '{key}'")
+        setattr(settings, key, value)
+    _pool.size = max(0, int(settings.pool_size))
+    _pool.max_open = max(1, int(settings.pool_max_open))
+    _pool.close_all()
+    return settings
+
+@functools.lru_cache(maxsize=None)
+def _on_network_share(path: str) -> bool:
+    path = os.path.abspath(path)
+    if path.startswith(("\\\\", "//")):
+        return True
+    if os.name == "nt":
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4     # DRIVE_REMOTE
+    return False
+
+def _keyword(value: str) -> str:
+    if not re.fullmatch(r"[A-Za-z]+", str(value)):
+        raise ValueError(f"Invalid PRAGMA value: {value!r}")
+    return str(value).upper()
+
+def _apply_pragmas(conn: sqlite3.Connection) -> None:
+    cfg  = settings
+    mode = _keyword(cfg.journal_mode)
+    if mode == "WAL" and _on_network_share(conn.path):
+        mode = _keyword(cfg.network_journal_mode)
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].upper() != mode:
+        try:
+            conn.execute(f"PRAGMA journal_mode = {mode}")
+        except sqlite3.OperationalError as e:
+            # another terminal has the file open; the next connection retries
+            log.warning("Could not switch journal_mode to %s: %s", mode, e)
+    conn.execute(f"PRAGMA synchronous = {_keyword(cfg.synchronous)}")
+    conn.execute(f"PRAGMA cache_size = -{int(cfg.cache_size_kb)}")
+    conn.execute(f"PRAGMA mmap_size = {int(cfg.mmap_size)}")
+    conn.execute(f"PRAGMA temp_store = {_keyword(cfg.temp_store)}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(cfg.wal_autocheckpoint)}")
+
+def _is_busy(err: sqlite3.OperationalError) -> bool:
+    msg = str(err).lower()
+    return "locked" in msg or "busy" in msg
+
+def _retry_on_busy(fn):
+    """
+    Re-run a write when SQLite reports the database as locked/busy
+    after busy_timeout, backing off exponentially with jitter.
+    Safe because every writer runs in one transaction that is rolled
+    back before the retry.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.busy_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt == settings.busy_retries or not _is_busy(e):
+                    raise
+                delay = settings.busy_backoff_s * (2 ** attempt)
+                time.sleep(delay * (1 + random.random()))
+    return wrapper
+
+# ── Connection Pool ──
+
+
+class _PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to the pool
+    instead of closing the database handle.
+    """
+    def close(self):
+        if getattr(_group, "conn", None) is self:
+            return          # still inside group_transaction()
+        _pool.release(self)
+
+    def _close(self):
+        super().close()
+
+
+class _ThreadConnections:
+    """One thread's connections; dropped with its thread-local at thread exit."""
+    __slots__ = ('idle', 'owned', '__weakref__')
+
+    def __init__(self):
+        self.idle  = []         # released, ready for reuse
+        self.owned = set()      # every open connection this thread created
+
+
+class ConnectionPool:
+    """
+    Thread-local pool of SQLite connections.
+
+    Every thread keeps up to `size` idle connections. acquire() reuses
+    one after a health check (hit) or opens a new one (miss); release()
+    rolls back anything left uncommitted and keeps it for the next call.
+
+    When a thread exits (a QThreadPool worker expiring, a finished
+    report or export thread), the connections it opened are closed.
+    At most `max_open` connections are open at once: past that, acquire()
+    closes another thread's idle connection, or waits up to busy_timeout
+    for one to be closed.
+    """
+    def __init__(self, size: int, max_open: int):
+        self.size     = size
+        self.max_open = max_open
+        self._local   = threading.local()
+        self._lock    = threading.Condition()
+        self._live    = set()                   # every open connection, for shutdown
+        self._threads = weakref.WeakSet()       # _ThreadConnections of running threads
+        self._opening = 0                       # connects in progress, counted against max_open
+        self.trace    = None                    # sqlite3 trace callback applied on acquire
+        self._stats   = dict.fromkeys(
+            ('hits', 'misses', 'opens', 'closes', 'discards', 'reclaims', 'waits'), 0
+        )
+
+    def _mine(self) -> _ThreadConnections:
+        mine = getattr(self._local, 'conns', None)
+        if mine is None:
+            mine = self._local.conns = _ThreadConnections()
+            with self._lock:
+                self._threads.add(mine)
+            weakref.finalize(mine, self._reclaim, mine.owned)
+        return mine
+
+    def _reclaim(self, owned: set):
+        """Close the connections of a thread that has exited."""
+        with self._lock:
+            conns = list(owned)
+            self._stats['reclaims'] += len(conns)
+        for conn in conns:
+            self._shut(conn)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _reserve(self):
+        """Make room for one more connection under max_open."""
+        deadline = time.monotonic() + settings.busy_timeout_ms / 1000
+        with self._lock:
+            while len(self._live) + self._opening >= self.max_open:
+                victim = next((t.idle.pop(0) for t in self._threads if t.idle), None)
+                if victim is not None:
+                    self._shut(victim)
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted: {len(self._live)} connections in use"
+                    )
+                self._stats['waits'] += 1
+                self._lock.wait(remaining)
+            self._opening += 1
+
+    def _open(self, mine: _ThreadConnections) -> _PooledConnection:
+        self._reserve()
+        try:
+            conn = sqlite3.connect(
+                DB_PATH,
+                timeout=settings.busy_timeout_ms / 1000,
+                factory=_PooledConnection,
+                check_same_thread=False
+            )
+            conn.path = DB_PATH
+            conn.trace = None
+            conn.owned = mine.owned
+            try:
+                _apply_pragmas(conn)
+            except BaseException:
+                conn._close()
+                raise
+            conn.row_factory = sqlite3.Row
+        finally:
+            with self._lock:
+                self._opening -= 1
+                self._lock.notify()
+        with self._lock:
+            self._live.add(conn)
+            mine.owned.add(conn)
+            self._stats['opens'] += 1
+        return conn
+
+    def _shut(self, conn: _PooledConnection):
+        with self._lock:
+            if conn not in self._live:
+                return
+            self._live.discard(conn)
+            conn.owned.discard(conn)
+            self._stats['closes'] += 1
+            self._lock.notify()
+        try:
+            conn._close()
+        except sqlite3.Error:
+            pass
+
+    def _healthy(self, conn: _PooledConnection) -> bool:
+        if conn.path != DB_PATH or conn not in self._live:
+            return False
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _pop_idle(self, mine: _ThreadConnections):
+        with self._lock:
+            return mine.idle.pop() if mine.idle else None
+
+    def acquire(self) -> _PooledConnection:
+        mine = self._mine()
+        while True:
+            conn = self._pop_idle(mine)
+            if conn is None:
+                self._count('misses')
+                conn = self._open(mine)
+                break
+            if self._healthy(conn):
+                conn.row_factory = sqlite3.Row
+                self._count('hits')
+                break
+            self._count('discards')
+            self._shut(conn)
+        if conn.trace is not self.trace:
+            conn.set_trace_callback(self.trace)
+            conn.trace = self.trace
+        return conn
+
+    def release(self, conn: _PooledConnection):
+        mine = self._mine()
+        with self._lock:
+            if conn in mine.idle:
+                return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._shut(conn)
+            return
+        with self._lock:
+            keep = (len(mine.idle) < self.size and conn.path == DB_PATH
+                    and conn in self._live)
+            if keep:
+                mine.idle.append(conn)
+        if not keep:
+            self._shut(conn)
+
+    def close_all(self):
+        """Close every connection the pool has opened, in any thread."""
+        with self._lock:
+            live = list(self._live)
+            for t in self._threads:
+                t.idle.clear()
+        for conn in live:
+            self._shut(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, open=len(self._live))
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+_pool = ConnectionPool(settings.pool_size, settings.pool_max_open)
 
 def get_connection():
     """
-    Return a new SQLite connection with row_factory set to sqlite3.Row.
+    Return a pooled SQLite connection with row_factory set to sqlite3.Row.
+    Calling close() on it returns it to the pool.
+    """
+    if _schema_ready != DB_PATH:
+        _ensure_schema()
+    group = getattr(_group, "conn", None)
+    if group is not None:
+        return group        # reads inside a group see its uncommitted writes
+    return _pool.acquire()
+
+_schema_ready = None            # DB_PATH whose schema has been created/migrated
+_schema_lock  = threading.Lock()
+
+def _ensure_schema() -> None:
+    """
+    Create and migrate the schema of DB_PATH once, on the first
+    connection rather than at import, so importing db_manager stays cheap.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready != DB_PATH:
+            _initialize_database()
+            _schema_ready = DB_PATH
+
+def open_read_only() -> sqlite3.Connection:
+    """
+    A dedicated, unpooled read-only connection (e.g. for a report worker
+    thread). Its PRAGMA data_version moves whenever any other connection
+    commits, which makes it a cheap "has anything been written?" check.
+    The caller closes it.
     """
-    conn = sqlite3.connect(DB_PATH)
+    get_connection().close()        # make sure the schema exists first
+    conn = sqlite3.connect(
+        f"file:{DB_PATH}?mode=ro", uri=True,
+        timeout=settings.busy_timeout_ms / 1000,
+        check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA cache_size = -{int(settings.cache_size_kb)}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings.mmap_size)}")
+    conn.execute(f"PRAGMA temp_store = {_keyword(settings.temp_store)}")
+    conn.execute("PRAGMA query_only = ON")
+    conn.set_trace_callback(_pool.trace)
     return conn
 
-def _initialize_database():
+def configure_pool(size: int) -> None:
+    """Set how many idle connections each thread may keep."""
+    configure(pool_size=size)
+
+def pool_stats() -> dict:
+    """
+    Return the pool counters: hits (reused), misses (had to open),
+    opens, closes, discards (failed health check), reclaims (closed
+    after their thread exited), waits (acquire() blocked at
+    pool_max_open) and open (connections open right now).
+    """
+    return _pool.stats()
+
+def reset_pool_stats() -> None:
+    _pool.reset_stats()
+
+def close_pool() -> None:
+    """Close all pooled connections."""
+    _pool.close_all()
+
+_last_write = 0.0          # time.monotonic() of the latest commit
+_dirty      = False        # committed since the last checkpoint
+_group      = threading.local()     # .conn/.keys while group_transaction() is open
+
+@contextmanager
+def _transaction():
+    """
+    Yield a cursor inside one BEGIN IMMEDIATE transaction.
+    Commits once on success and rolls everything back on error.
+    Taking the write lock up front avoids the read→write upgrade that
+    busy_timeout cannot wait out in WAL mode.
+
+    Inside group_transaction() it is a SAVEPOINT instead, so a failing
+    writer undoes only its own changes and the group commits the rest.
+    """
+    global _last_write, _dirty
+    group = getattr(_group, "conn", None)
+    if group is not None:
+        cur = group.cursor()
+        cur.execute("SAVEPOINT writer")
+        try:
+            yield cur
+        except BaseException:
+            cur.execute("ROLLBACK TO writer")
+            raise
+        finally:
+            cur.execute("RELEASE writer")
+        return
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn.cursor()
+        conn.commit()
+        _last_write, _dirty = time.monotonic(), True
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@contextmanager
+def group_transaction():
+    """
+    Run several writers as one transaction with a single commit (used by
+    db_writer to batch writes that arrive together). Writers called on
+    this thread inside the block become savepoints, and get_connection()
+    returns the group's connection so reads see the pending writes.
+    Cache entries the writers drop are dropped again after the commit.
+    """
+    global _last_write, _dirty
+    if getattr(_group, "conn", None) is not None:
+        yield               # already grouped
+        return
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _group.conn, _group.keys = conn, set()
+        try:
+            yield
+        finally:
+            _group.conn = None
+        conn.commit()
+        _last_write, _dirty = time.monotonic(), True
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        keys, _group.keys = getattr(_group, "keys", set()), set()
+        _reference.invalidate(*keys)
+
+# ── WAL Checkpoints ──
+
+def checkpoint(mode: str = "PASSIVE") -> tuple:
+    """
+    Copy WAL frames back into clinic.db. Returns SQLite's
+    (busy, wal_pages, checkpointed_pages).
+    """
+    global _dirty
     conn = get_connection()
+    row = tuple(conn.execute(f"PRAGMA wal_checkpoint({_keyword(mode)})").fetchone())
+    conn.close()
+    if not row[0]:
+        _dirty = False
+    return row
+
+
+class _CheckpointScheduler(threading.Thread):
+    """
+    Background thread that checkpoints the WAL once no write has been
+    committed for settings.checkpoint_idle_s, so saves never pay for
+    a large checkpoint.
+    """
+    def __init__(self):
+        super().__init__(name="db-checkpoint", daemon=True)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(settings.checkpoint_interval_s):
+            idle = time.monotonic() - _last_write
+            if _dirty and idle >= settings.checkpoint_idle_s:
+                try:
+                    checkpoint()
+                except sqlite3.Error as e:
+                    log.warning("Idle checkpoint failed: %s", e)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+
+def start_checkpoint_scheduler() -> None:
+    """Start the idle checkpoint thread (no-op if already running)."""
+    global _scheduler
+    if _scheduler is None or not _scheduler.is_alive():
+        _scheduler = _CheckpointScheduler()
+        _scheduler.start()
+
+def shutdown() -> None:
+    """Stop the checkpoint thread and close all connections; run on app exit."""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+    close_pool()
+
+atexit.register(shutdown)
+
+def _initialize_database():
+    conn = _pool.acquire()      # not get_connection(): that would re-enter _ensure_schema
     cur  = conn.cursor()
 
     # ── Owners ──
@@ -122,10 +637,478 @@ def _initialize_database():
     """)
 
     conn.commit()
+    _migrate(conn)
     conn.close()
 
-# initialize on import
-_initialize_database()
+# ── Schema Migrations ──
+# Each step upgrades the schema by one version; PRAGMA user_version
+# records how far a database file has been migrated. Append new steps
+# to the end of _MIGRATIONS, never edit or reorder existing ones.
+
+def _m1_hot_query_indexes(cur):
+    """Secondary indexes for every WHERE / JOIN / ORDER BY hot path."""
+    # inventory.name lookups already use the UNIQUE(name, expiration_date) index
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_pets_owner ON pets(owner_id, pet_name)",
+        "CREATE INDEX IF NOT EXISTS idx_visits_pet_date ON visits(pet_id, visit_date)",
+        "CREATE INDEX IF NOT EXISTS idx_visits_date ON visits(visit_date, pet_id)",
+        "CREATE INDEX IF NOT EXISTS idx_prescriptions_visit ON prescriptions(visit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases(purchase_date)",
+        "CREATE INDEX IF NOT EXISTS idx_future_appointments_date"
+        "    ON future_appointments(appointment_date)",
+        "CREATE INDEX IF NOT EXISTS idx_future_appointments_visit"
+        "    ON future_appointments(visit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_expiry ON inventory(expiration_date)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_low_stock"
+        "    ON inventory(name) WHERE quantity <= reorder_level",
+    ):
+        cur.execute(sql)
+
+def _m2_owner_search(cur):
+    """
+    Trigram FTS5 index over owner name, phone and pet names for the live
+    search boxes; rowid is owners.id and triggers keep it in sync. SQLite
+    builds without FTS5 skip it and search_owners() falls back to LIKE.
+    """
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_owners_name ON owners(name COLLATE NOCASE)")
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS owner_search
+              USING fts5(name, phone, pets, tokenize = 'trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        log.warning("owner_search index unavailable (%s); using LIKE search", e)
+        return
+
+    pets_of = "(SELECT group_concat(pet_name, ' ') FROM pets WHERE owner_id = {})"
+    cur.execute(f"""
+        INSERT INTO owner_search (rowid, name, phone, pets)
+        SELECT o.id, o.name, o.phone, {pets_of.format("o.id")}
+          FROM owners o
+    """)
+    for sql in (
+        """CREATE TRIGGER IF NOT EXISTS owner_search_ai AFTER INSERT ON owners BEGIN
+             INSERT INTO owner_search (rowid, name, phone) VALUES (new.id, new.name, new.phone);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS owner_search_au AFTER UPDATE OF name, phone ON owners BEGIN
+             UPDATE owner_search SET name = new.name, phone = new.phone WHERE rowid = new.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS owner_search_ad AFTER DELETE ON owners BEGIN
+             DELETE FROM owner_search WHERE rowid = old.id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS owner_search_pets_ai AFTER INSERT ON pets BEGIN
+             UPDATE owner_search SET pets = {pets_of.format("new.owner_id")}
+              WHERE rowid = new.owner_id;
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS owner_search_pets_au
+             AFTER UPDATE OF pet_name, owner_id ON pets BEGIN
+             UPDATE owner_search SET pets = {pets_of.format("owner_search.rowid")}
+              WHERE rowid IN (old.owner_id, new.owner_id);
+           END""",
+        f"""CREATE TRIGGER IF NOT EXISTS owner_search_pets_ad AFTER DELETE ON pets BEGIN
+             UPDATE owner_search SET pets = {pets_of.format("old.owner_id")}
+              WHERE rowid = old.owner_id;
+           END""",
+    ):
+        cur.execute(sql)
+
+def _change_triggers(cur, category: str, table: str, update_of: str = None,
+                     events: tuple = ("INSERT", "UPDATE", "DELETE")):
+    """Triggers that bump change_log[category] on every write to table."""
+    for event in events:
+        when = f"UPDATE OF {update_of}" if event == "UPDATE" and update_of else event
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS change_{category}_{table}_{event.lower()}
+              AFTER {when} ON {table} BEGIN
+                UPDATE change_log SET version = version + 1 WHERE category = '{category}';
+              END
+        """)
+
+def _m3_change_log(cur):
+    """
+    Per-category change counters bumped by triggers, so in-memory caches
+    (e.g. the notification engine) can tell whether their data changed,
+    from this or any other process, with one tiny read.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+          category TEXT PRIMARY KEY,
+          version  INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cur.executemany("INSERT OR IGNORE INTO change_log (category) VALUES (?)",
+                    [("inventory",), ("appointments",)])
+    _change_triggers(cur, "inventory", "inventory")
+    _change_triggers(cur, "appointments", "future_appointments")
+    # appointment alerts show the pet's name
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS change_appointments_pets_update
+          AFTER UPDATE OF pet_name ON pets BEGIN
+            UPDATE change_log SET version = version + 1 WHERE category = 'appointments';
+          END
+    """)
+
+# ── Daily Summary Rollup ──
+# daily_summary holds one row per day (revenue split by is_inventory,
+# purchase cost, visit count) and daily_reason_revenue the revenue of
+# visits per follow-up reason, so range reports sum O(days) rows instead
+# of joining every prescription. Triggers apply each write as a signed
+# delta; _rebuild_daily_summary() recomputes both from scratch.
+
+_RX_AMOUNT = "COALESCE({p}.quantity * {p}.unit_price, 0)"
+
+def _visit_rx_total(visit_id: str, only: str = "") -> str:
+    """SQL scalar: prescription revenue of one visit (optionally filtered)."""
+    return (f"(SELECT COALESCE(SUM({_RX_AMOUNT.format(p='rx')}), 0) FROM prescriptions rx"
+            f" WHERE rx.visit_id = {visit_id} {only})")
+
+def _summary_deltas(ref: str, sign: str) -> dict[str, list[str]]:
+    """
+    Per-table trigger bodies that add (sign '+') or remove (sign '-')
+    the row `ref` (new / old) from the rollup tables.
+    """
+    amount = _RX_AMOUNT.format(p=ref)
+    reason_upsert = ("ON CONFLICT(day, reason_id) DO UPDATE"
+                     " SET revenue = revenue + excluded.revenue")
+    return {
+        "visits": [f"""
+            INSERT INTO daily_summary (day, visit_count, inventory_revenue, external_revenue)
+            SELECT {ref}.visit_date, {sign}1,
+                   {sign}{_visit_rx_total(f"{ref}.id", "AND rx.is_inventory = 1")},
+                   {sign}{_visit_rx_total(f"{ref}.id", "AND rx.is_inventory IS NOT 1")}
+             WHERE {ref}.visit_date IS NOT NULL
+            ON CONFLICT(day) DO UPDATE
+               SET visit_count       = visit_count + excluded.visit_count,
+                   inventory_revenue = inventory_revenue + excluded.inventory_revenue,
+                   external_revenue  = external_revenue + excluded.external_revenue;
+        """, f"""
+            INSERT INTO daily_reason_revenue (day, reason_id, revenue)
+            SELECT {ref}.visit_date, fa.reason_id, {sign}{_visit_rx_total(f"{ref}.id")}
+              FROM future_appointments fa
+             WHERE fa.visit_id = {ref}.id AND fa.reason_id IS NOT NULL
+               AND {ref}.visit_date IS NOT NULL
+            {reason_upsert};
+        """],
+        "prescriptions": [f"""
+            INSERT INTO daily_summary (day, inventory_revenue, external_revenue)
+            SELECT v.visit_date,
+                   CASE WHEN {ref}.is_inventory = 1 THEN {sign}{amount} ELSE 0 END,
+                   CASE WHEN {ref}.is_inventory = 1 THEN 0 ELSE {sign}{amount} END
+              FROM visits v
+             WHERE v.id = {ref}.visit_id AND v.visit_date IS NOT NULL
+            ON CONFLICT(day) DO UPDATE
+               SET inventory_revenue = inventory_revenue + excluded.inventory_revenue,
+                   external_revenue  = external_revenue + excluded.external_revenue;
+        """, f"""
+            INSERT INTO daily_reason_revenue (day, reason_id, revenue)
+            SELECT v.visit_date, fa.reason_id, {sign}{amount}
+              FROM visits v
+              JOIN future_appointments fa ON fa.visit_id = v.id
+             WHERE v.id = {ref}.visit_id AND v.visit_date IS NOT NULL
+               AND fa.reason_id IS NOT NULL
+            {reason_upsert};
+        """],
+        "future_appointments": [f"""
+            INSERT INTO daily_reason_revenue (day, reason_id, revenue)
+            SELECT v.visit_date, {ref}.reason_id, {sign}{_visit_rx_total("v.id")}
+              FROM visits v
+             WHERE v.id = {ref}.visit_id AND v.visit_date IS NOT NULL
+               AND {ref}.reason_id IS NOT NULL
+            {reason_upsert};
+        """],
+        "purchases": [f"""
+            INSERT INTO daily_summary (day, cost)
+            SELECT {ref}.purchase_date, {sign}COALESCE({ref}.total_cost, 0)
+             WHERE {ref}.purchase_date IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET cost = cost + excluded.cost;
+        """],
+    }
+
+def _rebuild_daily_summary(cur):
+    """Recompute both rollup tables from the base tables (inside a transaction)."""
+    cur.execute("DELETE FROM daily_summary")
+    cur.execute("DELETE FROM daily_reason_revenue")
+    amount = _RX_AMOUNT.format(p="p")
+    cur.execute(f"""
+        INSERT INTO daily_summary
+          (day, visit_count, inventory_revenue, external_revenue, cost)
+        WITH rx AS (
+          SELECT visit_id,
+                 SUM(CASE WHEN is_inventory = 1 THEN {amount} ELSE 0 END) AS inv,
+                 SUM(CASE WHEN is_inventory = 1 THEN 0 ELSE {amount} END) AS ext
+            FROM prescriptions p
+           GROUP BY visit_id
+        )
+        SELECT day, SUM(visits), SUM(inv), SUM(ext), SUM(cost)
+          FROM (
+            SELECT v.visit_date AS day, 1 AS visits,
+                   COALESCE(rx.inv, 0) AS inv, COALESCE(rx.ext, 0) AS ext, 0 AS cost
+              FROM visits v
+              LEFT JOIN rx ON rx.visit_id = v.id
+             WHERE v.visit_date IS NOT NULL
+            UNION ALL
+            SELECT purchase_date, 0, 0, 0, COALESCE(total_cost, 0)
+              FROM purchases
+             WHERE purchase_date IS NOT NULL
+          )
+         GROUP BY day
+    """)
+    cur.execute(f"""
+        INSERT INTO daily_reason_revenue (day, reason_id, revenue)
+        WITH rx AS (
+          SELECT visit_id, SUM({amount}) AS total
+            FROM prescriptions p
+           GROUP BY visit_id
+        )
+        SELECT v.visit_date, fa.reason_id, SUM(rx.total)
+          FROM future_appointments fa
+          JOIN visits v ON v.id = fa.visit_id
+          JOIN rx ON rx.visit_id = v.id
+         WHERE v.visit_date IS NOT NULL AND fa.reason_id IS NOT NULL
+         GROUP BY v.visit_date, fa.reason_id
+    """)
+
+def _m4_daily_summary(cur):
+    """Daily financial rollup tables, their triggers, and a backfill."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_summary (
+          day                TEXT PRIMARY KEY,       -- YYYY-MM-DD
+          inventory_revenue  REAL    NOT NULL DEFAULT 0,
+          external_revenue   REAL    NOT NULL DEFAULT 0,
+          cost               REAL    NOT NULL DEFAULT 0,
+          visit_count        INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_reason_revenue (
+          day        TEXT    NOT NULL,
+          reason_id  INTEGER NOT NULL,
+          revenue    REAL    NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, reason_id)
+        ) WITHOUT ROWID
+    """)
+    add, remove = _summary_deltas("new", "+"), _summary_deltas("old", "-")
+    moves = {"visits": "visit_date",
+             "prescriptions": "visit_id, is_inventory, quantity, unit_price",
+             "future_appointments": "visit_id, reason_id",
+             "purchases": "purchase_date, total_cost"}
+    for table, columns in moves.items():
+        for name, when, body in (
+            ("ai", "INSERT", add[table]),
+            ("ad", "DELETE", remove[table]),
+            ("au", f"UPDATE OF {columns}", remove[table] + add[table]),
+        ):
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS summary_{table}_{name}
+                  AFTER {when} ON {table} BEGIN
+                    {"".join(body)}
+                  END
+            """)
+    _rebuild_daily_summary(cur)
+
+def _m5_calendar_change_triggers(cur):
+    """
+    Calendar records also show owner, species and doctor: bump the
+    appointments version when those change so cached months reload.
+    """
+    _change_triggers(cur, "appointments", "owners", update_of="name, phone",
+                     events=("UPDATE",))
+    _change_triggers(cur, "appointments", "visits", update_of="pet_id, doctor_name",
+                     events=("UPDATE", "DELETE"))
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS change_appointments_pets_moved
+          AFTER UPDATE OF species_id, owner_id ON pets BEGIN
+            UPDATE change_log SET version = version + 1 WHERE category = 'appointments';
+          END
+    """)
+
+def _m6_reminder_outbox(cur):
+    """Persistent queue of composed WhatsApp reminders (see reminder_outbox.py)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_outbox (
+          id               INTEGER PRIMARY KEY AUTOINCREMENT,
+          phone            TEXT    NOT NULL,
+          message          TEXT    NOT NULL,
+          mode             TEXT    NOT NULL DEFAULT 'auto',
+          appointment_date TEXT,
+          status           TEXT    NOT NULL DEFAULT 'queued'
+                           CHECK (status IN ('queued', 'sending', 'sent', 'failed')),
+          attempts         INTEGER NOT NULL DEFAULT 0,
+          next_attempt_at  REAL    NOT NULL DEFAULT 0,    -- unix time
+          last_error       TEXT,
+          created_at       TEXT    DEFAULT CURRENT_TIMESTAMP,
+          sent_at          TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminder_outbox_due
+            ON reminder_outbox(status, next_attempt_at)
+    """)
+
+def _m7_reference_change_log(cur):
+    """Version the lookup tables behind the reference-data cache."""
+    cur.execute("INSERT OR IGNORE INTO change_log (category) VALUES ('reference')")
+    _change_triggers(cur, "reference", "species")
+    _change_triggers(cur, "reference", "reasons")
+
+def _m8_prescription_batches(cur):
+    """
+    Which batches each inventory prescription consumed (see dispense()),
+    backfilled with the single batch older prescriptions were taken from.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS prescription_batches (
+          prescription_id INTEGER NOT NULL REFERENCES prescriptions(id),
+          inventory_id    INTEGER NOT NULL REFERENCES inventory(id),
+          quantity        INTEGER NOT NULL,
+          PRIMARY KEY (prescription_id, inventory_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        INSERT OR IGNORE INTO prescription_batches (prescription_id, inventory_id, quantity)
+        SELECT id, inventory_id, quantity
+          FROM prescriptions
+         WHERE is_inventory = 1 AND inventory_id IS NOT NULL AND quantity > 0
+    """)
+
+def _m10_outbox_claims(cur):
+    """
+    Who claimed each 'sending' reminder and when, so a terminal starting
+    up only requeues its own or long-stale claims; and a dismissed flag
+    for failures the user has acknowledged.
+    """
+    have = {r[1] for r in cur.execute("PRAGMA table_info(reminder_outbox)")}
+    for column, decl in (("claimed_by", "TEXT"),
+                         ("claimed_at", "REAL"),                        # unix time
+                         ("dismissed",  "INTEGER NOT NULL DEFAULT 0")):
+        if column not in have:
+            cur.execute(f"ALTER TABLE reminder_outbox ADD COLUMN {column} {decl}")
+
+def _m9_inventory_page_index(cur):
+    """Keyset index for get_inventory_page(), NULL expiry sorting as ''."""
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventory_page
+            ON inventory(name, COALESCE(expiration_date, ''), id)
+         WHERE quantity > 0
+    """)
+
+def _m11_inventory_page_nonzero(cur):
+    """
+    get_inventory_page() lists negative stock again (only quantity 0 is
+    hidden, as before paging), so its index covers quantity <> 0.
+    """
+    cur.execute("DROP INDEX IF EXISTS idx_inventory_page")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventory_page_nonzero
+            ON inventory(name, COALESCE(expiration_date, ''), id)
+         WHERE quantity <> 0
+    """)
+
+_MIGRATIONS = [
+    _m1_hot_query_indexes,      # → user_version 1
+    _m2_owner_search,           # → user_version 2
+    _m3_change_log,             # → user_version 3
+    _m4_daily_summary,          # → user_version 4
+    _m5_calendar_change_triggers,  # → user_version 5
+    _m6_reminder_outbox,        # → user_version 6
+    _m7_reference_change_log,   # → user_version 7
+    _m8_prescription_batches,   # → user_version 8
+    _m9_inventory_page_index,   # → user_version 9
+    _m10_outbox_claims,         # → user_version 10
+    _m11_inventory_page_nonzero,  # → user_version 11
+]
+
+def _migrate(conn):
+    """Apply every migration newer than the file's user_version."""
+    for target, step in enumerate(_MIGRATIONS, start=1):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another terminal may have migrated while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] < target:
+                step(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def schema_version() -> int:
+    conn = get_connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return version
+
+def get_change_versions() -> dict[str, int]:
+    """{category: version} from change_log; a version moves on every write."""
+    conn = get_connection()
+    rows = {r['category']: r['version']
+            for r in conn.execute("SELECT category, version FROM change_log")}
+    conn.close()
+    return rows
+
+def use_database(path: str) -> None:
+    """
+    Point db_manager at another database file (e.g. a scratch DB for
+    benchmarks), creating and migrating its schema.
+    """
+    global DB_PATH
+    close_pool()
+    DB_PATH = os.path.abspath(path)
+    _reference.clear()
+    _ensure_schema()
+
+# ── Reference Data Cache ──
+
+class _ReferenceCache:
+    """
+    Species, reasons and the inventory list, kept in memory between calls.
+
+    Each entry remembers the change_log version of its category when it
+    was loaded. Writers in this module drop the entries they touch, so
+    local changes show up at once. change_log is re-read at most every
+    settings.reference_check_s, which catches writes from other
+    terminals. Every other lookup is a dictionary hit.
+    """
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self._entries  = {}     # key → (version, value)
+        self._versions = {}
+        self._checked  = float("-inf")
+
+    def get(self, key: str, category: str, load):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked >= settings.reference_check_s:
+                self._versions = get_change_versions()
+                self._checked  = now
+            version = self._versions.get(category)
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == version:
+                return hit[1]
+        # load outside the lock; a write racing the load leaves the entry
+        # tagged with the older version, so the next check reloads it
+        value = load()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self, *keys: str):
+        pending = getattr(_group, "keys", None)
+        if getattr(_group, "conn", None) is not None and pending is not None:
+            pending.update(keys)    # drop them again once the group commits
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._checked = float("-inf")
+
+_reference = _ReferenceCache()
+_INVENTORY_KEYS = ("inventory", "inventory_names", "stock")
 
 # ── Owners ──
 
@@ -135,37 +1118,43 @@ def get_owner_by_phone(phone: str):
     row = cur.fetchone(); conn.close()
     return dict(row) if row else None
 
+@_retry_on_busy
 def add_owner(owner_data: dict) -> int:
     """
     owner_data = { 'name': str, 'phone': str }
     """
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute(
-        "INSERT OR IGNORE INTO owners (name, phone) VALUES (?, ?)",
-        (owner_data['name'], owner_data['phone'])
-    )
-    conn.commit()
-    cur.execute("SELECT id FROM owners WHERE phone = ?", (owner_data['phone'],))
-    owner_id = cur.fetchone()['id']
-    conn.close()
+    with _transaction() as cur:
+        cur.execute(
+            "INSERT OR IGNORE INTO owners (name, phone) VALUES (?, ?)",
+            (owner_data['name'], owner_data['phone'])
+        )
+        cur.execute("SELECT id FROM owners WHERE phone = ?", (owner_data['phone'],))
+        owner_id = cur.fetchone()['id']
     return owner_id
 
 # ── Species ──
 
-def get_all_species() -> list[str]:
+def _load_species() -> list[str]:
     conn = get_connection(); cur = conn.cursor()
     cur.execute("SELECT name FROM species ORDER BY name")
     rows = [r['name'] for r in cur.fetchall()]
     conn.close()
     return rows
 
-def add_species(name: str) -> int:
-    conn = get_connection(); cur = conn.cursor()
+def get_all_species() -> list[str]:
+    return list(_reference.get("species", "reference", _load_species))
+
+def _species_id(cur, name: str) -> int:
+    """Return the id for a species name, adding it if new (inside a transaction)."""
     cur.execute("INSERT OR IGNORE INTO species (name) VALUES (?)", (name,))
-    conn.commit()
     cur.execute("SELECT id FROM species WHERE name = ?", (name,))
-    sp_id = cur.fetchone()['id']
-    conn.close()
+    return cur.fetchone()['id']
+
+@_retry_on_busy
+def add_species(name: str) -> int:
+    with _transaction() as cur:
+        sp_id = _species_id(cur, name)
+    _reference.invalidate("species")
     return sp_id
 
 # ── Pets ──
@@ -185,6 +1174,7 @@ def get_pets_by_owner(owner_id: int) -> list[tuple[str,str]]:
     conn.close()
     return rows
 
+@_retry_on_busy
 def add_pet(pet_data: dict) -> int:
     """
     pet_data = {
@@ -195,26 +1185,23 @@ def add_pet(pet_data: dict) -> int:
       'gender': str
     }
     """
-    conn = get_connection(); cur = conn.cursor()
-    # ensure species exists
-    cur.execute("SELECT id FROM species WHERE name = ?", (pet_data['species'],))
-    sp = cur.fetchone()
-    species_id = sp['id'] if sp else add_species(pet_data['species'])
-
-    cur.execute("""
-        INSERT INTO pets
-          (owner_id, pet_name, species_id, first_visit, gender)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        pet_data['owner_id'],
-        pet_data['pet_name'],
-        species_id,
-        pet_data['first_visit'],
-        pet_data['gender']
-    ))
-    conn.commit()
-    pet_id = cur.lastrowid
-    conn.close()
+    with _transaction() as cur:
+        # ensure species exists
+        species_id = _species_id(cur, pet_data['species'])
+
+        cur.execute("""
+            INSERT INTO pets
+              (owner_id, pet_name, species_id, first_visit, gender)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            pet_data['owner_id'],
+            pet_data['pet_name'],
+            species_id,
+            pet_data['first_visit'],
+            pet_data['gender']
+        ))
+        pet_id = cur.lastrowid
+    _reference.invalidate("species")
     return pet_id
 
 def find_pet(owner_id: int, species: str, pet_name: str):
@@ -231,38 +1218,106 @@ def find_pet(owner_id: int, species: str, pet_name: str):
     row = cur.fetchone(); conn.close()
     return dict(row) if row else None
 
+@_retry_on_busy
 def update_pet(pet_id: int, pet_data: dict) -> None:
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("SELECT id FROM species WHERE name = ?", (pet_data['species'],))
-    sp = cur.fetchone()
-    species_id = sp['id'] if sp else add_species(pet_data['species'])
-
-    cur.execute("""
-        UPDATE pets
-           SET pet_name   = ?,
-               species_id = ?,
-               first_visit= ?,
-               gender     = ?
-         WHERE id = ?
-    """, (
-        pet_data['pet_name'],
-        species_id,
-        pet_data['first_visit'],
-        pet_data['gender'],
-        pet_id
-    ))
-    conn.commit()
-    conn.close()
+    with _transaction() as cur:
+        species_id = _species_id(cur, pet_data['species'])
+
+        cur.execute("""
+            UPDATE pets
+               SET pet_name   = ?,
+                   species_id = ?,
+                   first_visit= ?,
+                   gender     = ?
+             WHERE id = ?
+        """, (
+            pet_data['pet_name'],
+            species_id,
+            pet_data['first_visit'],
+            pet_data['gender'],
+            pet_id
+        ))
+    _reference.invalidate("species")
 
 # ── Inventory ──
 
-def get_all_inventory() -> list[dict]:
+def _load_inventory() -> list[dict]:
     conn = get_connection(); cur = conn.cursor()
     cur.execute("SELECT * FROM inventory ORDER BY name, expiration_date")
     rows = [dict(r) for r in cur.fetchall()]
     conn.close()
     return rows
 
+def get_all_inventory() -> list[dict]:
+    """Every batch, served from the reference cache (do not mutate the dicts)."""
+    return list(_reference.get("inventory", "inventory", _load_inventory))
+
+def get_inventory_names() -> list[str]:
+    """Distinct names of medicines with stock left, from the reference cache."""
+    def load():
+        return sorted({r['name'] for r in get_all_inventory() if r['quantity'] > 0})
+    return list(_reference.get("inventory_names", "inventory", load))
+
+def get_stock_snapshot() -> dict[str, dict]:
+    """
+    Dispensable stock (in stock and not expired), from the reference cache:
+      { name: { 'available': total quantity,
+                'batches':   [batch, ...] in the order dispense() uses them } }
+    ordered by name. The same object is returned until inventory changes
+    or the day rolls over, so treat it as read-only.
+    """
+    today = date.today().isoformat()
+    def load():
+        stock = {}
+        batches = sorted((r for r in get_all_inventory()
+                          if r['quantity'] > 0 and _expiry(r) >= today),
+                         key=lambda r: (r['name'], _expiry(r), r['id']))
+        for r in batches:
+            entry = stock.setdefault(r['name'], {'available': 0, 'batches': []})
+            entry['available'] += r['quantity']
+            entry['batches'].append(r)
+        return today, stock
+    day, stock = _reference.get("stock", "inventory", load)
+    if day != today:
+        _reference.invalidate("stock")
+        day, stock = _reference.get("stock", "inventory", load)
+    return stock
+
+def _expiry(batch: dict) -> str:
+    # batches without an expiry date never expire and are used last
+    return batch['expiration_date'] or _NO_EXPIRY
+
+def get_inventory_page(after: tuple = None, limit: int = 200) -> list[dict]:
+    """
+    One page of batches with a non-zero quantity (negative stock is a
+    miscount the user needs to see), ordered by (name, expiration_date,
+    id). `after` is that key of the previous page's last row; keyset
+    paging keeps every page an index seek on idx_inventory_page_nonzero.
+    A batch with no expiration_date sorts as '' so the row-value
+    comparison never meets a NULL and skips the rest of the list.
+    """
+    conn = get_connection(); cur = conn.cursor()
+    if after is None:
+        cur.execute("""
+            SELECT * FROM inventory
+             WHERE quantity <> 0
+             ORDER BY name, COALESCE(expiration_date, ''), id
+             LIMIT ?
+        """, (limit,))
+    else:
+        name, expiry, item_id = after
+        cur.execute("""
+            SELECT * FROM inventory
+             WHERE quantity <> 0
+               AND (name, COALESCE(expiration_date, ''), id) > (?, ?, ?)
+             ORDER BY name, COALESCE(expiration_date, ''), id
+             LIMIT ?
+        """, (name, expiry or '', item_id, limit))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+@_retry_on_busy
 def add_or_restock_inventory(batch: dict) -> int:
     """
     batch = {
@@ -275,72 +1330,214 @@ def add_or_restock_inventory(batch: dict) -> int:
       'default_sell_price': float
     }
     """
-    conn = get_connection(); cur = conn.cursor()
-    # look for existing batch
-    cur.execute("""
-      SELECT id, quantity
-        FROM inventory
-       WHERE name = ?
-         AND expiration_date = ?
-    """, (batch['name'], batch['expiration_date']))
-    existing = cur.fetchone()
-
-    if existing:
-        inv_id  = existing['id']
-        new_qty = existing['quantity'] + batch['quantity']
+    with _transaction() as cur:
+        # look for existing batch
         cur.execute("""
-          UPDATE inventory
-             SET quantity          = ?,
-                 default_sell_price = ?
-           WHERE id = ?
-        """, (new_qty, batch['default_sell_price'], inv_id))
-    else:
+          SELECT id, quantity
+            FROM inventory
+           WHERE name = ?
+             AND expiration_date = ?
+        """, (batch['name'], batch['expiration_date']))
+        existing = cur.fetchone()
+
+        if existing:
+            inv_id  = existing['id']
+            new_qty = existing['quantity'] + batch['quantity']
+            cur.execute("""
+              UPDATE inventory
+                 SET quantity          = ?,
+                     default_sell_price = ?
+               WHERE id = ?
+            """, (new_qty, batch['default_sell_price'], inv_id))
+        else:
+            cur.execute("""
+              INSERT INTO inventory
+                (name, category, quantity, unit,
+                 reorder_level, expiration_date,
+                 default_sell_price)
+              VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+              batch['name'],
+              batch['category'],
+              batch['quantity'],
+              batch['unit'],
+              batch['reorder_level'],
+              batch['expiration_date'],
+              batch['default_sell_price']
+            ))
+            inv_id = cur.lastrowid
+    _reference.invalidate(*_INVENTORY_KEYS)
+    return inv_id
+
+@_retry_on_busy
+def bulk_restock(lines: list[dict]) -> int:
+    """
+    Restock many batches and record their purchases in one transaction
+    (a supplier invoice). Each line is an add_or_restock_inventory()
+    batch plus 'purchase_date' and 'unit_cost'; lines must already be
+    validated (see inventory_import). Lines for the same batch add up.
+    Returns the number of lines written.
+    """
+    with _transaction() as cur:
+        cur.executemany("""
+            INSERT INTO inventory
+              (name, category, quantity, unit,
+               reorder_level, expiration_date, default_sell_price)
+            VALUES (:name, :category, :quantity, :unit,
+                    :reorder_level, :expiration_date, :default_sell_price)
+            ON CONFLICT(name, expiration_date) DO UPDATE
+               SET quantity           = quantity + excluded.quantity,
+                   default_sell_price = excluded.default_sell_price
+        """, lines)
+        cur.executemany("""
+            INSERT INTO purchases
+              (inventory_id, purchase_date, quantity, unit_cost, total_cost)
+            VALUES ((SELECT id FROM inventory
+                      WHERE name = :name AND expiration_date = :expiration_date),
+                    :purchase_date, :quantity, :unit_cost, :quantity * :unit_cost)
+        """, lines)
+    _reference.invalidate(*_INVENTORY_KEYS)
+    return len(lines)
+
+@_retry_on_busy
+def update_inventory_item(item_id: int, item: dict) -> None:
+    with _transaction() as cur:
         cur.execute("""
-          INSERT INTO inventory
-            (name, category, quantity, unit,
-             reorder_level, expiration_date,
-             default_sell_price)
-          VALUES (?, ?, ?, ?, ?, ?, ?)
+            UPDATE inventory
+               SET name               = ?,
+                   category           = ?,
+                   quantity           = ?,
+                   unit               = ?,
+                   reorder_level      = ?,
+                   expiration_date    = ?,
+                   default_sell_price = ?
+             WHERE id = ?
         """, (
-          batch['name'],
-          batch['category'],
-          batch['quantity'],
-          batch['unit'],
-          batch['reorder_level'],
-          batch['expiration_date'],
-          batch['default_sell_price']
+            item['name'], item['category'], item['quantity'],
+            item['unit'], item['reorder_level'], item['expiration_date'],
+            item['default_sell_price'], item_id
         ))
-        inv_id = cur.lastrowid
+    _reference.invalidate(*_INVENTORY_KEYS)
 
-    conn.commit()
-    conn.close()
-    return inv_id
+@_retry_on_busy
+def set_reorder_level(item_id: int, level: int) -> None:
+    """Change one batch's reorder_level, leaving its stock untouched."""
+    with _transaction() as cur:
+        cur.execute("UPDATE inventory SET reorder_level = ? WHERE id = ?", (level, item_id))
+    _reference.invalidate(*_INVENTORY_KEYS)
 
-def update_inventory_item(item_id: int, item: dict) -> None:
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
+@_retry_on_busy
+def delete_inventory_item(item_id: int) -> None:
+    with _transaction() as cur:
+        cur.execute("DELETE FROM inventory WHERE id = ?", (item_id,))
+    _reference.invalidate(*_INVENTORY_KEYS)
+
+# ── Dispensing (FEFO) ──
+# Inventory prescriptions name a medicine, not a batch. Stock is taken
+# first-expired-first-out across its unexpired batches, and
+# prescription_batches records what each prescription consumed.
+
+_NO_EXPIRY = "9999-12-31"
+_EXPIRY    = f"COALESCE(NULLIF(expiration_date, ''), '{_NO_EXPIRY}')"
+
+_FEFO_ALLOCATION = f"""
+    SELECT id, MIN(quantity, :qty - before) AS take
+      FROM (SELECT id, quantity,
+                   SUM(quantity) OVER (ORDER BY {_EXPIRY}, id) - quantity AS before
+              FROM inventory
+             WHERE name = :name AND quantity > 0 AND {_EXPIRY} >= :today)
+     WHERE before < :qty
+     ORDER BY before
+"""
+
+def _check_stock(cur, needs: dict[str, int], today: str) -> None:
+    """Validate a whole visit's inventory needs {name: qty} in one query."""
+    if not needs:
+        return
+    cur.execute(f"""
+        WITH need(name, qty) AS (VALUES {','.join(['(?, ?)'] * len(needs))})
+        SELECT need.name, need.qty, COALESCE(SUM(i.quantity), 0) AS available
+          FROM need
+          LEFT JOIN inventory i
+            ON i.name = need.name AND i.quantity > 0
+           AND COALESCE(NULLIF(i.expiration_date, ''), '{_NO_EXPIRY}') >= ?
+         GROUP BY need.name, need.qty
+        HAVING available < need.qty
+    """, [*(v for item in needs.items() for v in item), today])
+    short = cur.fetchall()
+    if short:
+        raise ValueError("Insufficient stock: " + ", ".join(
+            f"{r['name']} (need {r['qty']}, have {r['available']})" for r in short
+        ))
+
+def _plan_fefo(cur, name: str, qty: int, today: str) -> list[tuple[int, int]]:
+    """[(inventory_id, take), ...] covering `qty` of `name`, soonest expiry first."""
+    if qty <= 0:
+        return []
+    alloc = [(r['id'], r['take']) for r in
+             cur.execute(_FEFO_ALLOCATION, {'name': name, 'qty': qty, 'today': today})]
+    have = sum(take for _, take in alloc)
+    if have < qty:
+        raise ValueError(f"Insufficient stock for {name}: need {qty}, have {have}")
+    return alloc
+
+def _apply_fefo(cur, name: str, alloc: list, prescription_id: int = None) -> list[dict]:
+    """
+    Apply a _plan_fefo() plan in one UPDATE ... RETURNING, with a
+    `quantity >= take` guard on every batch, and record it against the
+    prescription.
+    """
+    if not alloc:
+        return []
+    cur.execute(f"""
         UPDATE inventory
-           SET name               = ?,
-               category           = ?,
-               quantity           = ?,
-               unit               = ?,
-               reorder_level      = ?,
-               expiration_date    = ?,
-               default_sell_price = ?
-         WHERE id = ?
-    """, (
-        item['name'], item['category'], item['quantity'],
-        item['unit'], item['reorder_level'], item['expiration_date'],
-        item['default_sell_price'], item_id
-    ))
-    conn.commit()
-    conn.close()
+           SET quantity = quantity - a.column2
+          FROM (VALUES {','.join(['(?, ?)'] * len(alloc))}) AS a
+         WHERE inventory.id = a.column1 AND inventory.quantity >= a.column2
+        RETURNING inventory.id
+    """, [v for pair in alloc for v in pair])
+    if len(cur.fetchall()) != len(alloc):
+        raise ValueError(f"Stock of {name} changed while dispensing; please retry.")
+    if prescription_id is not None:
+        cur.executemany(
+            "INSERT INTO prescription_batches (prescription_id, inventory_id, quantity)"
+            " VALUES (?, ?, ?)",
+            [(prescription_id, inv_id, take) for inv_id, take in alloc]
+        )
+    return [{'inventory_id': inv_id, 'quantity': take} for inv_id, take in alloc]
 
-def delete_inventory_item(item_id: int) -> None:
+def _dispense(cur, name: str, qty: int, today: str, prescription_id: int = None) -> list[dict]:
+    """Take `qty` of `name` FEFO inside the caller's transaction."""
+    return _apply_fefo(cur, name, _plan_fefo(cur, name, qty, today), prescription_id)
+
+@_retry_on_busy
+def dispense(name: str, qty: int) -> list[dict]:
+    """
+    Take `qty` of medicine `name` from stock, first-expired-first-out
+    across unexpired batches, in one transaction. Returns the batches
+    used: [ { 'inventory_id', 'quantity' }, ... ]. Raises ValueError if
+    there is not enough stock (nothing is taken then).
+    """
+    with _transaction() as cur:
+        used = _dispense(cur, name, qty, date.today().isoformat())
+    _reference.invalidate(*_INVENTORY_KEYS)
+    return used
+
+def get_dispensed_batches(visit_id: int) -> list[dict]:
+    """Batches consumed by a visit's inventory prescriptions."""
     conn = get_connection(); cur = conn.cursor()
-    cur.execute("DELETE FROM inventory WHERE id = ?", (item_id,))
-    conn.commit()
+    cur.execute("""
+        SELECT pb.prescription_id, pb.inventory_id, i.name,
+               i.expiration_date, pb.quantity
+          FROM prescriptions p
+          JOIN prescription_batches pb ON pb.prescription_id = p.id
+          JOIN inventory i             ON i.id = pb.inventory_id
+         WHERE p.visit_id = ?
+         ORDER BY pb.prescription_id, i.expiration_date
+    """, (visit_id,))
+    rows = [dict(r) for r in cur.fetchall()]
     conn.close()
+    return rows
 
 def get_low_stock_items() -> list[dict]:
     conn = get_connection(); cur = conn.cursor()
@@ -349,6 +1546,24 @@ def get_low_stock_items() -> list[dict]:
     conn.close()
     return rows
 
+def get_expiring_items(cutoff: str) -> list[dict]:
+    """
+    Return (name, expiration_date) for every batch expiring on or before
+    cutoff ('YYYY-MM-DD'). The plain comparison keeps idx_inventory_expiry
+    usable ('~' sorts after any time suffix); DATE() then applies the
+    original test, so '' and malformed dates still never count as expiring.
+    """
+    conn = get_connection(); cur = conn.cursor()
+    cur.execute("""
+      SELECT name, expiration_date
+        FROM inventory
+       WHERE expiration_date <= ? || '~'
+         AND DATE(expiration_date) <= ?
+    """, (cutoff, cutoff))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
 def get_inventory_batches(name: str) -> list[dict]:
     """
     Return all batches for a given medicine name,
@@ -382,28 +1597,27 @@ def get_visits_by_pet(pet_id: int) -> list[dict]:
 
 
 
+@_retry_on_busy
 def add_visit(data: dict) -> int:
     """
     data must include:
       'pet_id', 'visit_date', 'notes', 'next_appointment', 'doctor_name'
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-      INSERT INTO visits
-        (pet_id, visit_date, notes, doctor_name)
-      VALUES (?, ?, ?, ?)
-    """, (
-      data['pet_id'],
-      data['visit_date'],
-      data['notes'],
-      data['doctor_name']
-    ))
-    vid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with _transaction() as cur:
+        cur.execute("""
+          INSERT INTO visits
+            (pet_id, visit_date, notes, doctor_name)
+          VALUES (?, ?, ?, ?)
+        """, (
+          data['pet_id'],
+          data['visit_date'],
+          data['notes'],
+          data['doctor_name']
+        ))
+        vid = cur.lastrowid
     return vid
 
+@_retry_on_busy
 def add_prescription(presc: dict) -> int:
     """
     presc must include:
@@ -411,23 +1625,20 @@ def add_prescription(presc: dict) -> int:
       'med_name' or None, 'is_inventory',
       'quantity', 'unit_price'
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-      INSERT INTO prescriptions
-        (visit_id, inventory_id, med_name, is_inventory, quantity, unit_price)
-      VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-      presc['visit_id'],
-      presc.get('inventory_id'),
-      presc.get('med_name'),
-      presc['is_inventory'],
-      presc['quantity'],
-      presc['unit_price']
-    ))
-    pid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with _transaction() as cur:
+        cur.execute("""
+          INSERT INTO prescriptions
+            (visit_id, inventory_id, med_name, is_inventory, quantity, unit_price)
+          VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+          presc['visit_id'],
+          presc.get('inventory_id'),
+          presc.get('med_name'),
+          presc['is_inventory'],
+          presc['quantity'],
+          presc['unit_price']
+        ))
+        pid = cur.lastrowid
     return pid
 
 def get_prescriptions_by_visit(visit_id: int) -> list[dict]:
@@ -462,10 +1673,73 @@ def find_owners_by_name(name: str) -> list[dict]:
     conn.close()
     return rows
 
+_owner_search_ready: dict[str, bool] = {}
+
+def _has_owner_search(cur) -> bool:
+    """Whether this DB file has the FTS5 owner_search table (checked once per path)."""
+    if DB_PATH not in _owner_search_ready:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'owner_search'")
+        _owner_search_ready[DB_PATH] = cur.fetchone() is not None
+    return _owner_search_ready[DB_PATH]
+
+def search_owners(term: str, limit: int = 50) -> list[dict]:
+    """
+    Ranked owner lookup for the live search boxes, best matches first:
+    phone prefix, name prefix, then trigram substring hits on name or
+    phone, then on pet names. Each tier is an index lookup with its own
+    LIMIT, so common terms stop early instead of ranking every match.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    conn = get_connection(); cur = conn.cursor()
+    tiers = []
+    if term.isdigit():
+        # half-open range on the UNIQUE(phone) index == "phone LIKE 'term%'"
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        tiers.append(("""
+            SELECT id, name, phone FROM owners
+             WHERE phone >= ? AND phone < ?
+             ORDER BY phone LIMIT ?
+        """, (term, upper)))
+    else:
+        tiers.append(("""
+            SELECT id, name, phone FROM owners
+             WHERE name LIKE ?
+             ORDER BY name COLLATE NOCASE LIMIT ?
+        """, (f"{term}%",)))
+    if len(term) >= 3:
+        if _has_owner_search(cur):
+            phrase = '"' + term.replace('"', '""') + '"'
+            for columns in ("{name phone}", "pets"):
+                tiers.append(("""
+                    SELECT rowid AS id, name, phone FROM owner_search
+                     WHERE owner_search MATCH ? LIMIT ?
+                """, (f"{columns} : {phrase}",)))
+        else:
+            tiers.append(("""
+                SELECT id, name, phone FROM owners
+                 WHERE name LIKE ? OR phone LIKE ? LIMIT ?
+            """, (f"%{term}%", f"%{term}%")))
+
+    rows, seen = [], set()
+    for sql, params in tiers:
+        cur.execute(sql, (*params, limit + len(seen)))
+        for r in cur.fetchall():
+            if r['id'] not in seen:
+                seen.add(r['id'])
+                rows.append(dict(r))
+        if len(rows) >= limit:
+            break
+    conn.close()
+    return rows[:limit]
+
 def get_patient_history(owner_id: int) -> list[dict]:
     """
     Returns every visit (across all pets) for this owner,
     with fields: id, visit_date, pet_name, notes, doctor_name, next_appointment.
+    next_appointment is the earliest follow-up booked at that visit
+    (future_appointments), or None.
     """
     conn = get_connection()
     cur = conn.cursor()
@@ -476,7 +1750,9 @@ def get_patient_history(owner_id: int) -> list[dict]:
         p.pet_name,
         v.notes,
         v.doctor_name,
-        v.next_appointment
+        (SELECT MIN(fa.appointment_date)
+           FROM future_appointments fa
+          WHERE fa.visit_id = v.id) AS next_appointment
       FROM visits v
       JOIN pets    p ON v.pet_id = p.id
       WHERE p.owner_id = ?
@@ -486,38 +1762,31 @@ def get_patient_history(owner_id: int) -> list[dict]:
     conn.close()
     return rows
 
-def update_inventory_quantity(item_id: int, new_quantity: int) -> None:
+def get_financial_summary(start_date: str, end_date: str, conn=None) -> dict:
     """
-    Decrement-only updater: if new_quantity > 0, update the quantity;
-    otherwise delete the batch entirely.
+    Revenue, purchase cost and visit count for a date range, summed from
+    the daily_summary rollup (one row per day) in a single query.
+    `conn` lets a report worker use its own open_read_only() connection.
     """
-    conn = get_connection()
-    cur  = conn.cursor()
-    if new_quantity >= 0:
-        cur.execute(
-            "UPDATE inventory SET quantity = ? WHERE id = ?",
-            (new_quantity, item_id)
-        )
-
-    conn.commit()
-    conn.close()
-
-def get_revenue_and_cost(start_date: str, end_date: str) -> dict:
-    conn = get_connection(); cur = conn.cursor()
-    # revenue
+    own = conn is None
+    if own:
+        conn = get_connection()
+    cur = conn.cursor()
     cur.execute("""
-      SELECT COALESCE(SUM(p.unit_price * p.quantity),0) AS revenue
-        FROM prescriptions p
-        JOIN visits v ON p.visit_id = v.id
-       WHERE v.visit_date BETWEEN ? AND ?
+      SELECT COALESCE(SUM(inventory_revenue + external_revenue), 0) AS revenue,
+             COALESCE(SUM(cost), 0)                                 AS cost,
+             COALESCE(SUM(visit_count), 0)                          AS visits
+        FROM daily_summary
+       WHERE day BETWEEN ? AND ?
     """, (start_date, end_date))
-    rev = cur.fetchone()['revenue']
-    conn.close()
-
-    # cost from purchases
-    cost = get_total_cost(start_date, end_date)
+    row = dict(cur.fetchone())
+    if own:
+        conn.close()
+    return row
 
-    return {'revenue': rev, 'cost': cost}
+def get_revenue_and_cost(start_date: str, end_date: str) -> dict:
+    summary = get_financial_summary(start_date, end_date)
+    return {'revenue': summary['revenue'], 'cost': summary['cost']}
 
 
 
@@ -525,47 +1794,33 @@ def get_appointment_count(start_date: str, end_date: str) -> int:
     """
     Returns the number of visits whose visit_date is between start_date and end_date.
     """
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-      SELECT COUNT(*) AS cnt
-        FROM visits
-       WHERE visit_date BETWEEN ? AND ?
-    """, (start_date, end_date))
-    cnt = cur.fetchone()['cnt'] or 0
-    conn.close()
-    return cnt
+    return get_financial_summary(start_date, end_date)['visits']
 
+@_retry_on_busy
 def add_purchase(inventory_id: int,
                  purchase_date: str,
                  quantity: int,
                  unit_cost: float) -> int:
     total = quantity * unit_cost
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-      INSERT INTO purchases
-        (inventory_id, purchase_date, quantity, unit_cost, total_cost)
-      VALUES (?, ?, ?, ?, ?)
-    """, (inventory_id, purchase_date, quantity, unit_cost, total))
-    pid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with _transaction() as cur:
+        cur.execute("""
+          INSERT INTO purchases
+            (inventory_id, purchase_date, quantity, unit_cost, total_cost)
+          VALUES (?, ?, ?, ?, ?)
+        """, (inventory_id, purchase_date, quantity, unit_cost, total))
+        pid = cur.lastrowid
     return pid
 
 def get_total_cost(start_date: str, end_date: str) -> float:
-    conn = get_connection(); cur = conn.cursor()
-    cur.execute("""
-      SELECT COALESCE(SUM(total_cost),0) AS cost
-        FROM purchases
-       WHERE purchase_date BETWEEN ? AND ?
-    """, (start_date, end_date))
-    cost = cur.fetchone()['cost']
-    conn.close()
-    return cost
+    return get_financial_summary(start_date, end_date)['cost']
 
 def get_all_reasons() -> list[str]:
     """
     Return a list of all saved future‐appointment reasons, ordered alphabetically.
     """
+    return list(_reference.get("reasons", "reference", _load_reasons))
+
+def _load_reasons() -> list[str]:
     conn = get_connection()
     cur  = conn.cursor()
     cur.execute("SELECT name FROM reasons ORDER BY name")
@@ -573,34 +1828,31 @@ def get_all_reasons() -> list[str]:
     conn.close()
     return rows
 
+@_retry_on_busy
 def add_reason(reason: str) -> int:
     """
     Insert a new reason (if not already present) and return its ID.
     """
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute("INSERT OR IGNORE INTO reasons (name) VALUES (?)", (reason,))
-    conn.commit()
-    # fetch the id back
-    cur.execute("SELECT id FROM reasons WHERE name = ?", (reason,))
-    rid = cur.fetchone()["id"]
-    conn.close()
+    with _transaction() as cur:
+        cur.execute("INSERT OR IGNORE INTO reasons (name) VALUES (?)", (reason,))
+        # fetch the id back
+        cur.execute("SELECT id FROM reasons WHERE name = ?", (reason,))
+        rid = cur.fetchone()["id"]
+    _reference.invalidate("reasons")
     return rid
 
+@_retry_on_busy
 def add_future_appointment(visit_id: int, appointment_date: str, reason_id: int) -> int:
     """
     Insert one future‐appointment row linking to a visit and a reason.
     Returns the new future_appointments.id.
     """
-    conn = get_connection()
-    cur  = conn.cursor()
-    cur.execute(
-        "INSERT INTO future_appointments (visit_id, appointment_date, reason_id) VALUES (?,?,?)",
-        (visit_id, appointment_date, reason_id)
-    )
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
+    with _transaction() as cur:
+        cur.execute(
+            "INSERT INTO future_appointments (visit_id, appointment_date, reason_id) VALUES (?,?,?)",
+            (visit_id, appointment_date, reason_id)
+        )
+        new_id = cur.lastrowid
     return new_id
 
 def get_future_appointments_by_visit(visit_id: int) -> list[dict]:
@@ -620,48 +1872,237 @@ def get_future_appointments_by_visit(visit_id: int) -> list[dict]:
     conn.close()
     return rows
 
+_CALENDAR_SELECT = """
+    SELECT
+        v.id                  AS visit_id,
+        fa.appointment_date   AS next_appointment,
+        p.id                  AS pet_id,
+        p.pet_name,
+        p.species_id,
+        s.name                AS species,
+        o.id                  AS owner_id,
+        o.name                AS owner_name,
+        o.phone,
+        v.doctor_name,
+        r.name                AS reason
+    FROM future_appointments fa
+    JOIN visits          v  ON fa.visit_id    = v.id
+    JOIN pets            p  ON v.pet_id       = p.id
+    JOIN species         s  ON p.species_id   = s.id
+    JOIN owners          o  ON p.owner_id     = o.id
+    LEFT JOIN reasons    r  ON fa.reason_id   = r.id
+"""
+
+def get_upcoming_appointments(from_date: str) -> list[dict]:
+    """
+    Return every future appointment on or after from_date, ordered by
+    date, with the pet, owner, doctor and reason needed by the calendar.
+    """
+    conn = get_connection()
+    cur  = conn.cursor()
+    cur.execute(_CALENDAR_SELECT + """
+        WHERE fa.appointment_date >= ?
+        ORDER BY fa.appointment_date
+    """, (from_date,))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+def get_appointments_between(start_date: str, end_date: str) -> list[dict]:
+    """Calendar records (as get_upcoming_appointments) for one date range."""
+    conn = get_connection()
+    cur  = conn.cursor()
+    cur.execute(_CALENDAR_SELECT + """
+        WHERE fa.appointment_date BETWEEN ? AND ?
+        ORDER BY fa.appointment_date
+    """, (start_date, end_date))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+def get_appointment_counts(start_date: str, end_date: str) -> dict[str, int]:
+    """{date: number of appointments} for the calendar's day markers."""
+    conn = get_connection()
+    cur  = conn.cursor()
+    cur.execute("""
+        SELECT appointment_date, COUNT(*) AS n
+          FROM future_appointments
+         WHERE appointment_date BETWEEN ? AND ?
+         GROUP BY appointment_date
+    """, (start_date, end_date))
+    counts = {r['appointment_date']: r['n'] for r in cur.fetchall()}
+    conn.close()
+    return counts
+
+def get_appointments_on(day: str) -> list[dict]:
+    """
+    Return (pet_name, appointment_date) for appointments on one day.
+    """
+    conn = get_connection()
+    cur  = conn.cursor()
+    cur.execute("""
+      SELECT p.pet_name, fa.appointment_date
+        FROM future_appointments fa
+        JOIN visits v ON fa.visit_id = v.id
+        JOIN pets   p ON v.pet_id    = p.id
+       WHERE fa.appointment_date = ?
+    """, (day,))
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    return rows
+
+# ── Visit Commit ──
+
+@_retry_on_busy
+def commit_visit(visit: dict, appointments: list[dict], prescriptions: list[dict]) -> dict:
+    """
+    Save a whole visit in one transaction: the visit row, its future
+    appointments (adding new reasons) and its prescriptions, deducting
+    stock for inventory items. If any step fails nothing is written.
+
+    visit         = { 'pet_id', 'visit_date', 'notes', 'doctor_name' }
+    appointments  = [ { 'date': 'YYYY-MM-DD', 'reason': str or None }, ... ]
+    prescriptions = [ { 'inventory_id' or None, 'med_name' or None,
+                        'is_inventory', 'quantity', 'unit_price' }, ... ]
+
+    Inventory prescriptions are dispensed FEFO by medicine name
+    ('med_name', or the name of 'inventory_id'); the whole visit's stock
+    is validated in one query first.
+
+    Returns { 'visit_id': int, 'appointment_ids': [...], 'prescription_ids': [...] }
+    """
+    today = date.today().isoformat()
+    with _transaction() as cur:
+        # inventory rows: resolve medicine names, then check all stock at once
+        by_id = [p['inventory_id'] for p in prescriptions
+                 if p['is_inventory'] and not p.get('med_name') and p.get('inventory_id')]
+        names = {}
+        if by_id:
+            cur.execute(
+                f"SELECT id, name FROM inventory WHERE id IN ({','.join('?' * len(by_id))})",
+                by_id
+            )
+            names = {r['id']: r['name'] for r in cur.fetchall()}
+        needs = {}
+        for p in prescriptions:
+            if p['is_inventory'] and p['quantity'] > 0:
+                name = p.get('med_name') or names.get(p.get('inventory_id'))
+                needs[name] = needs.get(name, 0) + p['quantity']
+        _check_stock(cur, needs, today)
+
+        cur.execute("""
+          INSERT INTO visits
+            (pet_id, visit_date, notes, doctor_name)
+          VALUES (?, ?, ?, ?)
+        """, (
+          visit['pet_id'],
+          visit['visit_date'],
+          visit['notes'],
+          visit['doctor_name']
+        ))
+        vid = cur.lastrowid
+
+        # reasons: add any new ones, then map name → id
+        reasons = sorted({a['reason'] for a in appointments if a.get('reason')})
+        reason_ids = {}
+        if reasons:
+            cur.executemany(
+                "INSERT OR IGNORE INTO reasons (name) VALUES (?)",
+                [(r,) for r in reasons]
+            )
+            cur.execute(
+                f"SELECT id, name FROM reasons WHERE name IN ({','.join('?' * len(reasons))})",
+                reasons
+            )
+            reason_ids = {r['name']: r['id'] for r in cur.fetchall()}
+
+        cur.executemany(
+            "INSERT INTO future_appointments (visit_id, appointment_date, reason_id) VALUES (?,?,?)",
+            [(vid, a['date'], reason_ids.get(a.get('reason'))) for a in appointments]
+        )
+        pres_ids = []
+        for p in prescriptions:
+            inv_id, med_name = p.get('inventory_id'), p.get('med_name')
+            name  = None
+            alloc = []
+            if p['is_inventory']:
+                name = med_name or names.get(inv_id)
+                med_name = None     # inventory rows are named through inventory_id
+                alloc = _plan_fefo(cur, name, p['quantity'], today)
+                if alloc:
+                    inv_id = alloc[0][0]    # the first batch used; all are in prescription_batches
+            cur.execute("""
+              INSERT INTO prescriptions
+                (visit_id, inventory_id, med_name, is_inventory, quantity, unit_price)
+              VALUES (?, ?, ?, ?, ?, ?)
+            """, (vid, inv_id, med_name, p['is_inventory'], p['quantity'], p['unit_price']))
+            pres_ids.append(cur.lastrowid)
+            _apply_fefo(cur, name, alloc, cur.lastrowid)
+
+        cur.execute("SELECT id FROM future_appointments WHERE visit_id = ? ORDER BY id", (vid,))
+        app_ids = [r['id'] for r in cur.fetchall()]
+
+    _reference.invalidate("reasons", *_INVENTORY_KEYS)
+    return {'visit_id': vid, 'appointment_ids': app_ids, 'prescription_ids': pres_ids}
+
 
 def get_report_details(start_date, end_date):
-    from db_manager import get_connection
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
-    cost_rows = cur.execute("""
-        SELECT
-            CASE WHEN is_inventory = 1 THEN 'Inventory' ELSE 'Pharmacy' END AS label,
-            SUM(quantity * unit_price) AS total
-        FROM prescriptions
-        JOIN visits ON prescriptions.visit_id = visits.id
-        WHERE visit_date BETWEEN ? AND ?
-        GROUP BY is_inventory
-    """, (start_date, end_date)).fetchall()
+    totals = cur.execute("""
+        SELECT COALESCE(SUM(inventory_revenue), 0) AS inventory,
+               COALESCE(SUM(external_revenue), 0)  AS pharmacy
+          FROM daily_summary
+         WHERE day BETWEEN ? AND ?
+    """, (start_date, end_date)).fetchone()
 
+    # a zero total may still stand for prescriptions that were sold at
+    # 0; like the base-table query, list a row whenever any exist
     cost_details = [
-        {"type": "Cost", "label": row["label"], "amount": row["total"] or 0.0}
-        for row in cost_rows
+        {"type": "Cost", "label": label, "amount": totals[key]}
+        for label, key, inventory in (("Pharmacy", "pharmacy", 0), ("Inventory", "inventory", 1))
+        if totals[key] or cur.execute("""
+            SELECT EXISTS (
+              SELECT 1 FROM visits
+                JOIN prescriptions ON prescriptions.visit_id = visits.id
+               WHERE visit_date BETWEEN ? AND ?
+                 AND (is_inventory IS 1) = ?
+            )
+        """, (start_date, end_date, inventory)).fetchone()[0]
     ]
 
     revenue_rows = cur.execute("""
-        SELECT
-            reasons.name AS label,
-            SUM(prescriptions.quantity * prescriptions.unit_price) AS total
-        FROM prescriptions
-        JOIN visits ON prescriptions.visit_id = visits.id
-        JOIN future_appointments ON visits.id = future_appointments.visit_id
-        JOIN reasons ON future_appointments.reason_id = reasons.id
-        WHERE visit_date BETWEEN ? AND ?
-        GROUP BY reasons.name
+        SELECT reasons.name AS label, SUM(d.revenue) AS total
+          FROM daily_reason_revenue d
+          JOIN reasons ON d.reason_id = reasons.id
+         WHERE d.day BETWEEN ? AND ?
+         GROUP BY reasons.name
     """, (start_date, end_date)).fetchall()
 
     revenue_details = [
         {"type": "Revenue", "label": row["label"], "amount": row["total"] or 0.0}
         for row in revenue_rows
+        if row["total"] or cur.execute("""
+            SELECT EXISTS (
+              SELECT 1 FROM visits
+                JOIN prescriptions       ON prescriptions.visit_id = visits.id
+                JOIN future_appointments ON future_appointments.visit_id = visits.id
+                JOIN reasons             ON reasons.id = future_appointments.reason_id
+               WHERE visit_date BETWEEN ? AND ? AND reasons.name = ?
+            )
+        """, (start_date, end_date, row["label"])).fetchone()[0]
     ]
 
     conn.close()
     return revenue_details + cost_details
 
+@_retry_on_busy
+def rebuild_daily_summary() -> None:
+    """Recompute the daily rollup from visits, prescriptions and purchases."""
+    with _transaction() as cur:
+        _rebuild_daily_summary(cur)
+
 
 def get_purchase_details(start_date: str, end_date: str) -> list[dict]:
     conn = get_connection()
@@ -730,3 +2171,391 @@ def get_visit_report_details(start_date, end_date):
     rows = [dict(r) for r in cur.fetchall()]
     conn.close()
     return rows
+
+
+# ── Report Pages ──
+# Keyset-paginated versions of the detail reports, newest first. Each
+# page is its own short query that seeks past the previous page's last
+# key, so a year of rows never sits in memory at once. The keys follow
+# idx_purchases_date (purchase_date, rowid) and idx_visits_date
+# (visit_date, pet_id, rowid), so no page needs a sort.
+
+_REPORT_SQL = {
+    "purchases": """
+        SELECT p.id, i.name AS item, p.quantity, p.unit_cost, p.total_cost, p.purchase_date
+          FROM purchases p
+          JOIN inventory i ON p.inventory_id = i.id
+         WHERE p.purchase_date BETWEEN ? AND ?
+           AND (p.purchase_date, p.id) < (?, ?)
+         ORDER BY p.purchase_date DESC, p.id DESC
+         LIMIT ?
+    """,
+    "sales": """
+        SELECT p.id, v.id AS visit_id, v.pet_id,
+               COALESCE(i.name, p.med_name) AS service,
+               o.name AS owner,
+               p.quantity,
+               (p.quantity * p.unit_price) AS total,
+               v.visit_date
+          FROM visits v
+          JOIN prescriptions p ON p.visit_id = v.id
+          JOIN pets pt         ON v.pet_id = pt.id
+          JOIN owners o        ON pt.owner_id = o.id
+          LEFT JOIN inventory i ON p.inventory_id = i.id
+         WHERE v.visit_date BETWEEN ? AND ?
+           AND (v.visit_date, v.pet_id, v.id, p.id) < (?, ?, ?, ?)
+         ORDER BY v.visit_date DESC, v.pet_id DESC, v.id DESC, p.id DESC
+         LIMIT ?
+    """,
+    "visits": """
+        SELECT v.id, v.pet_id, p.pet_name, o.name AS owner,
+               v.visit_date, v.doctor_name, v.notes
+          FROM visits v
+          JOIN pets p   ON v.pet_id = p.id
+          JOIN owners o ON p.owner_id = o.id
+         WHERE v.visit_date BETWEEN ? AND ?
+           AND (v.visit_date, v.pet_id, v.id) < (?, ?, ?)
+         ORDER BY v.visit_date DESC, v.pet_id DESC, v.id DESC
+         LIMIT ?
+    """,
+}
+
+REPORT_KEYS = {
+    # report → key of a row, passed as the next page's `after`
+    "purchases": lambda r: (r['purchase_date'], r['id']),
+    "sales":     lambda r: (r['visit_date'], r['pet_id'], r['visit_id'], r['id']),
+    "visits":    lambda r: (r['visit_date'], r['pet_id'], r['id']),
+}
+
+def _first_key(report: str, end_date: str) -> tuple:
+    # "~" sorts after any date, so the first page starts at end_date;
+    # the key is every placeholder but the range bounds and LIMIT
+    return (end_date + "~",) + (0,) * (_REPORT_SQL[report].count("?") - 4)
+
+def get_report_page(report: str, start_date: str, end_date: str, after: tuple = None,
+                    limit: int = 500, conn=None) -> list[dict]:
+    """
+    One page of a detail report ("purchases", "sales" or "visits").
+    `after` is REPORT_KEYS[report] of the previous page's last row;
+    `conn` defaults to a pooled connection.
+    """
+    if after is None:
+        after = _first_key(report, end_date)
+    own = conn is None
+    if own:
+        conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(_REPORT_SQL[report], (start_date, end_date, *after, limit))
+    rows = [dict(r) for r in cur.fetchall()]
+    if own:
+        conn.close()
+    return rows
+
+def get_purchase_page(start_date: str, end_date: str, after: tuple = None,
+                      limit: int = 500) -> list[dict]:
+    """`after` = (purchase_date, id) of the previous page's last row."""
+    return get_report_page("purchases", start_date, end_date, after, limit)
+
+def get_sales_page(start_date: str, end_date: str, after: tuple = None,
+                   limit: int = 500) -> list[dict]:
+    """`after` = (visit_date, pet_id, visit_id, id) of the previous page's last row."""
+    return get_report_page("sales", start_date, end_date, after, limit)
+
+def get_visit_report_page(start_date: str, end_date: str, after: tuple = None,
+                          limit: int = 500) -> list[dict]:
+    """`after` = (visit_date, pet_id, id) of the previous page's last row."""
+    return get_report_page("visits", start_date, end_date, after, limit)
+
+def iter_report_pages(report: str, start_date: str, end_date: str,
+                      page_size: int = 500, conn=None):
+    """
+    Yield one report ("purchases", "sales" or "visits") a page (list of
+    dicts) at a time. No pooled connection is held between pages.
+    """
+    key   = REPORT_KEYS[report]
+    after = None
+    while True:
+        page = get_report_page(report, start_date, end_date, after, page_size, conn)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = key(page[-1])
+
+def iter_report_rows(report: str, start_date: str, end_date: str,
+                     page_size: int = 500):
+    """Like iter_report_pages, one row at a time."""
+    for page in iter_report_pages(report, start_date, end_date, page_size):
+        yield from page
+
+def stream_report(report: str, start_date: str, end_date: str, conn=None):
+    """
+    Every row of a detail report as sqlite3.Row, straight off one cursor
+    with nothing collected (for exports). The connection stays in use
+    until the generator is exhausted or closed, so long exports should
+    pass their own open_read_only() connection.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        # LIMIT -1: no limit
+        yield from conn.execute(
+            _REPORT_SQL[report], (start_date, end_date, *_first_key(report, end_date), -1)
+        )
+    finally:
+        if own:
+            conn.close()
+
+def stream_daily_summary(start_date: str, end_date: str, conn=None):
+    """Day-by-day revenue, cost, profit and visits from daily_summary, oldest first."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        yield from conn.execute("""
+            SELECT day,
+                   inventory_revenue + external_revenue        AS revenue,
+                   cost,
+                   inventory_revenue + external_revenue - cost AS profit,
+                   visit_count                                 AS visits
+              FROM daily_summary
+             WHERE day BETWEEN ? AND ?
+             ORDER BY day
+        """, (start_date, end_date))
+    finally:
+        if own:
+            conn.close()
+
+# ── Reminder Outbox ──
+# Rows move queued → sending → sent, or back to queued with a later
+# next_attempt_at after a failed try, or to failed once retries run out.
+
+@_retry_on_busy
+def enqueue_reminders(reminders: list[dict]) -> list[int]:
+    """
+    reminders = [{ 'phone', 'message', 'mode', 'appointment_date' }, …]
+    Queue them for the dispatcher and return their outbox ids.
+    """
+    ids = []
+    with _transaction() as cur:
+        for r in reminders:
+            cur.execute("""
+                INSERT INTO reminder_outbox (phone, message, mode, appointment_date)
+                VALUES (?, ?, ?, ?)
+            """, (r['phone'], r['message'], r.get('mode', 'auto'), r.get('appointment_date')))
+            ids.append(cur.lastrowid)
+    return ids
+
+_NEXT_REMINDER_SQL = """
+    SELECT * FROM reminder_outbox
+     WHERE status = 'queued' AND next_attempt_at <= ?
+     ORDER BY next_attempt_at, id
+     LIMIT 1
+"""
+
+@_retry_on_busy
+def claim_next_reminder(now: float, claimant: str = None) -> dict | None:
+    """
+    Mark the oldest due queued reminder as sending, claimed by `claimant`
+    (the terminal sending it) at `now`, and return it (or None).
+    """
+    with _transaction() as cur:
+        cur.execute(_NEXT_REMINDER_SQL, (now,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute("""
+            UPDATE reminder_outbox
+               SET status = 'sending', attempts = attempts + 1,
+                   claimed_by = ?, claimed_at = ?
+             WHERE id = ?
+        """, (claimant, now, row['id']))
+    item = dict(row)
+    item['attempts'] += 1
+    item['status'] = 'sending'
+    item['claimed_by'] = claimant
+    item['claimed_at'] = now
+    return item
+
+@_retry_on_busy
+def mark_reminder_sent(outbox_id: int) -> None:
+    with _transaction() as cur:
+        cur.execute("""
+            UPDATE reminder_outbox
+               SET status = 'sent', last_error = NULL, sent_at = CURRENT_TIMESTAMP
+             WHERE id = ?
+        """, (outbox_id,))
+
+@_retry_on_busy
+def mark_reminder_failed(outbox_id: int, error: str, retry_at: float = None) -> None:
+    """Re-queue for retry_at, or give up (status 'failed') when retry_at is None."""
+    with _transaction() as cur:
+        if retry_at is None:
+            cur.execute("""
+                UPDATE reminder_outbox SET status = 'failed', last_error = ? WHERE id = ?
+            """, (error, outbox_id))
+        else:
+            cur.execute("""
+                UPDATE reminder_outbox
+                   SET status = 'queued', last_error = ?, next_attempt_at = ?
+                 WHERE id = ?
+            """, (error, retry_at, outbox_id))
+
+@_retry_on_busy
+def requeue_interrupted_reminders(claimant: str, stale_before: float) -> int:
+    """
+    Put reminders left in 'sending' back in the queue: those `claimant`
+    claimed (this terminal stopped mid-send) and any claimed before
+    `stale_before` (their terminal is gone). Another terminal's recent
+    claims are left alone, it may be sending them right now. A message
+    may still go out twice; losing it is worse.
+    """
+    with _transaction() as cur:
+        cur.execute("""
+            UPDATE reminder_outbox SET status = 'queued'
+             WHERE status = 'sending'
+               AND (claimed_by IS ? OR claimed_at IS NULL OR claimed_at < ?)
+        """, (claimant, stale_before))
+        count = cur.rowcount
+    return count
+
+@_retry_on_busy
+def retry_failed_reminders() -> int:
+    """Give every failed (not dismissed) reminder a fresh set of attempts."""
+    with _transaction() as cur:
+        cur.execute("""
+            UPDATE reminder_outbox
+               SET status = 'queued', attempts = 0, next_attempt_at = 0
+             WHERE status = 'failed' AND dismissed = 0
+        """)
+        count = cur.rowcount
+    return count
+
+@_retry_on_busy
+def dismiss_failed_reminders() -> int:
+    """Acknowledge every failed reminder: get_outbox_counts() stops counting them."""
+    with _transaction() as cur:
+        cur.execute("""
+            UPDATE reminder_outbox SET dismissed = 1
+             WHERE status = 'failed' AND dismissed = 0
+        """)
+        count = cur.rowcount
+    return count
+
+def get_outbox_counts() -> dict[str, int]:
+    """{status: count} over the whole outbox, every status present; dismissed failures are left out."""
+    conn = get_connection(); cur = conn.cursor()
+    cur.execute("SELECT status, COUNT(*) AS n FROM reminder_outbox WHERE dismissed = 0 GROUP BY status")
+    counts = {'queued': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+    counts.update({r['status']: r['n'] for r in cur.fetchall()})
+    conn.close()
+    return counts
+
+def get_next_reminder_due() -> float | None:
+    """Unix time the next queued reminder becomes due, or None if none are queued."""
+    conn = get_connection(); cur = conn.cursor()
+    cur.execute("SELECT MIN(next_attempt_at) AS due FROM reminder_outbox WHERE status = 'queued'")
+    due = cur.fetchone()['due']
+    conn.close()
+    return due
+
+
+# ── Query Plan Check ──
+
+def _hot_queries() -> list[tuple]:
+    """
+    (name, call) for every query on a hot path, where call is a reader to
+    run and trace, or the (sql, params) of a writer's SELECT: writers are
+    never run by the check. Full listings (get_all_*) and
+    find_owners_by_name's LIKE '%term%' are left out: they read the whole
+    table by design.
+    """
+    day = "2000-01-01"
+    return [
+        ("get_owner_by_phone",               lambda: get_owner_by_phone("0")),
+        ("search_owners (phone)",            lambda: search_owners("0100")),
+        ("search_owners (name)",             lambda: search_owners("Ahm")),
+        ("search_owners (prefix)",           lambda: search_owners("A")),
+        ("get_pets_by_owner",                lambda: get_pets_by_owner(0)),
+        ("find_pet",                         lambda: find_pet(0, "", "")),
+        ("get_inventory_batches",            lambda: get_inventory_batches("")),
+        ("get_inventory_page",               lambda: get_inventory_page(("", "", 0))),
+        ("get_low_stock_items",              get_low_stock_items),
+        ("get_expiring_items",               lambda: get_expiring_items(day)),
+        ("get_visits_by_pet",                lambda: get_visits_by_pet(0)),
+        ("get_prescriptions_by_visit",       lambda: get_prescriptions_by_visit(0)),
+        ("get_dispensed_batches",            lambda: get_dispensed_batches(0)),
+        ("get_financial_summary",            lambda: get_financial_summary(day, day)),
+        ("get_revenue_and_cost",             lambda: get_revenue_and_cost(day, day)),
+        ("get_appointment_count",            lambda: get_appointment_count(day, day)),
+        ("get_future_appointments_by_visit", lambda: get_future_appointments_by_visit(0)),
+        ("get_upcoming_appointments",        lambda: get_upcoming_appointments(day)),
+        ("get_appointments_between",         lambda: get_appointments_between(day, day)),
+        ("get_appointment_counts",           lambda: get_appointment_counts(day, day)),
+        ("get_appointments_on",              lambda: get_appointments_on(day)),
+        ("claim_next_reminder",              (_NEXT_REMINDER_SQL, (0,))),
+        ("get_next_reminder_due",            get_next_reminder_due),
+        ("get_report_details",               lambda: get_report_details(day, day)),
+        ("get_purchase_details",             lambda: get_purchase_details(day, day)),
+        ("get_sales_details",                lambda: get_sales_details(day, day)),
+        ("get_visit_details",                lambda: get_visit_details(day, day)),
+        ("get_visit_report_details",         lambda: get_visit_report_details(day, day)),
+        ("get_purchase_page",                lambda: get_purchase_page(day, day, (day, 0))),
+        ("get_sales_page",                   lambda: get_sales_page(day, day, (day, 0, 0, 0))),
+        ("get_visit_report_page",            lambda: get_visit_report_page(day, day, (day, 0, 0))),
+        ("stream_report",                    lambda: list(stream_report("sales", day, day))),
+        ("stream_daily_summary",             lambda: list(stream_daily_summary(day, day))),
+    ]
+
+def _is_table_scan(detail: str) -> bool:
+    return (
+        detail.startswith("SCAN ")
+        and "USING" not in detail
+        and "VIRTUAL TABLE" not in detail
+        and detail != "SCAN CONSTANT ROW"
+    )
+
+def check_query_plans() -> list[tuple[str, str, str]]:
+    """
+    Capture the SQL each hot query runs and EXPLAIN QUERY PLAN it.
+    Returns (function, sql, plan step) for every full table scan found;
+    an empty list means all of them are served by an index.
+    """
+    scans = []
+    for name, call in _hot_queries():
+        if callable(call):
+            call()  # warm up: one-time probes (schema checks, FTS5 config) aren't hot
+            captured = []
+            previous, _pool.trace = _pool.trace, captured.append
+            try:
+                call()
+            finally:
+                _pool.trace = previous
+            statements = [(sql, ()) for sql in captured]
+        else:
+            statements = [call]
+
+        conn = get_connection()
+        for sql, params in statements:
+            # nested statements run by SQLite itself are prefixed with "--"
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+                if _is_table_scan(row[3]):
+                    scans.append((name, " ".join(sql.split()), row[3]))
+        conn.close()
+    return scans
+
+
+if __name__ == "__main__":
+    import sys
+    if "--rebuild-summary" in sys.argv:
+        rebuild_daily_summary()
+        print("daily_summary rebuilt.")
+        sys.exit(0)
+    found = check_query_plans()
+    for func, sql, step in found:
+        print(f"{func}: {step}\n    {sql}")
+    print(f"{len(found)} full table scan(s) in hot queries.")
+    sys.exit(1 if found else 0)
@@ -0,0 +1,337 @@
+# db_profiler.py
+"""
+Opt-in profiling of db_manager. enable() wraps every public db_manager
+function and installs a sqlite3 trace callback on the pooled
+connections, then collects:
+
+  * per function:  calls, errors, total time, p50/p95/p99, rows returned
+  * per statement: the same, keyed by the SQL with its literals replaced
+                   by "?", plus which functions ran it
+  * a slow-statement log, EXPLAIN QUERY PLAN'd when exported
+
+Run the app with CUREVET_DB_PROFILE=profile.json to profile a session;
+the JSON is written on exit. Print an export as a table with:
+
+    python db_profiler.py profile.json [--top 20]
+
+SQLite's trace callback only reports when a statement starts, so a
+statement is timed until the next one starts on the same thread or its
+function returns. That includes stepping through its rows in Python,
+which is usually what you want to know. Function times are inclusive of
+any other db_manager function they call.
+"""
+import os
+import re
+import json
+import time
+import inspect
+import functools
+import threading
+from collections import deque
+
+import db_manager
+
+PROFILE_PATH = os.environ.get("CUREVET_DB_PROFILE") or None
+
+SAMPLES   = 2048        # latency samples kept per function/statement
+SLOW_KEEP = 100         # slow-log entries kept
+SQL_KEEP  = 2000        # characters of SQL kept per slow-log entry
+
+_lock      = threading.Lock()
+_local     = threading.local()
+_originals = {}         # name → unwrapped db_manager function
+_functions = {}         # name → _Stat
+_statements = {}        # normalized SQL → _Stat
+_slow      = deque(maxlen=SLOW_KEEP)
+_slow_ms   = 50.0
+_started   = None
+
+
+class _Stat:
+    __slots__ = ("calls", "errors", "total", "rows", "samples", "callers")
+
+    def __init__(self):
+        self.calls   = 0
+        self.errors  = 0
+        self.total   = 0.0                  # seconds
+        self.rows    = 0
+        self.samples = deque(maxlen=SAMPLES)
+        self.callers = {}                   # function → calls (statements only)
+
+    def add(self, seconds: float, rows: int = 0, error: bool = False):
+        self.calls  += 1
+        self.errors += error
+        self.total  += seconds
+        self.rows   += rows
+        self.samples.append(seconds)
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+        out = {
+            "calls":    self.calls,
+            "errors":   self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms":  self.total / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms":   pct(50),
+            "p95_ms":   pct(95),
+            "p99_ms":   pct(99),
+            "rows":     self.rows,
+        }
+        if self.callers:                    # a statement: rows aren't traced
+            del out["rows"]
+            out["callers"] = dict(self.callers)
+        return out
+
+
+# ── SQL normalization ──
+
+_STRING  = re.compile(r"'(?:[^']|'')*'")
+_NUMBER  = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LIST    = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES  = re.compile(r"\(\?…\)(?:\s*,\s*\(\?…\))+")
+
+def normalize(sql: str) -> str:
+    """
+    The statement with literals replaced by "?", so one query with
+    different arguments counts as one statement. Runs of "?" in
+    parentheses (IN lists, VALUES rows) collapse to "(?…)".
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = " ".join(sql.split())
+    sql = _LIST.sub("(?…)", sql)
+    sql = _VALUES.sub("(?…)", sql)
+    return sql
+
+
+def _rows(result) -> int:
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0 if result is None else 1
+
+
+# ── Recording ──
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+        _local.open = None
+        _local.paused = False
+    return stack
+
+def _close_statement(now: float):
+    """Stop timing the statement running on this thread, if any."""
+    current = getattr(_local, "open", None)
+    if current is None:
+        return
+    _local.open = None
+    sql, norm, func, t0 = current
+    seconds = now - t0
+    with _lock:
+        stat = _statements.get(norm)
+        if stat is None:
+            stat = _statements[norm] = _Stat()
+        stat.add(seconds)
+        stat.callers[func] = stat.callers.get(func, 0) + 1
+        if seconds * 1000 >= _slow_ms:
+            _slow.append({
+                "when":     time.time(),
+                "function": func,
+                "ms":       seconds * 1000,
+                "sql":      sql[:SQL_KEEP],
+                "statement": norm,
+            })
+
+def _on_statement(sql: str):
+    """sqlite3 trace callback: a statement is starting on this thread."""
+    stack = _stack()
+    if _local.paused or sql.lstrip().startswith("--"):
+        return      # "--" marks statements run by triggers inside another one
+    now = time.perf_counter()
+    _close_statement(now)
+    func = stack[-1] if stack else "(outside db_manager)"
+    _local.open = (sql, normalize(sql), func, now)
+
+def _record(name: str, seconds: float, rows: int, error: bool):
+    with _lock:
+        stat = _functions.get(name)
+        if stat is None:
+            stat = _functions[name] = _Stat()
+        stat.add(seconds, rows, error)
+
+
+def _wrap(name: str, fn):
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            # timed only while the generator runs, not while its consumer does
+            it, spent, rows, error = fn(*args, **kwargs), 0.0, 0, False
+            try:
+                while True:
+                    stack = _stack()
+                    stack.append(name)
+                    t0 = time.perf_counter()
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    except BaseException:
+                        error = True
+                        raise
+                    finally:
+                        _close_statement(time.perf_counter())
+                        stack.pop()
+                        spent += time.perf_counter() - t0
+                    rows += _rows(item)
+                    yield item
+            finally:
+                it.close()
+                _record(name, spent, rows, error)
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        stack.append(name)
+        t0 = time.perf_counter()
+        result, error = None, True
+        try:
+            result = fn(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            now = time.perf_counter()
+            _close_statement(now)
+            stack.pop()
+            _record(name, now - t0, _rows(result), error)
+    return wrapper
+
+
+# ── Control ──
+
+def enabled() -> bool:
+    return bool(_originals)
+
+def enable(slow_ms: float = 50.0) -> None:
+    """
+    Start profiling: wrap db_manager's public functions and trace every
+    pooled connection. Enable before importing modules that do
+    `from db_manager import ...`, or their copies stay unwrapped.
+    """
+    global _slow_ms, _started
+    _slow_ms = slow_ms
+    if _originals:
+        return
+    for name, fn in inspect.getmembers(db_manager, inspect.isfunction):
+        if fn.__module__ == db_manager.__name__ and not name.startswith("_"):
+            _originals[name] = fn
+            setattr(db_manager, name, _wrap(name, fn))
+    db_manager._pool.trace = _on_statement
+    _started = time.time()
+
+def disable() -> None:
+    """Restore the original functions and stop tracing."""
+    for name, fn in _originals.items():
+        setattr(db_manager, name, fn)
+    _originals.clear()
+    if db_manager._pool.trace is _on_statement:
+        db_manager._pool.trace = None
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _functions.clear()
+        _statements.clear()
+        _slow.clear()
+        _started = time.time()
+
+
+# ── Reports ──
+
+def _plans(entries: list[dict]) -> None:
+    """Add EXPLAIN QUERY PLAN to slow-log entries, on a read-only connection."""
+    _stack()
+    _local.paused = True
+    try:
+        conn = _originals.get("open_read_only", db_manager.open_read_only)()
+    except Exception:
+        _local.paused = False
+        return
+    plans = {}
+    try:
+        for entry in entries:
+            sql = entry["sql"]
+            if not sql.lstrip().upper().startswith(
+                    ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+                continue
+            if sql not in plans:
+                try:
+                    plans[sql] = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                except Exception as e:
+                    plans[sql] = [f"(no plan: {e})"]
+            entry["plan"] = plans[sql]
+    finally:
+        conn.close()
+        _local.paused = False
+
+def snapshot(plans: bool = True) -> dict:
+    """Everything collected so far, as plain JSON-ready data."""
+    with _lock:
+        functions  = {n: s.to_dict() for n, s in _functions.items()}
+        statements = [dict(s.to_dict(), sql=n) for n, s in _statements.items()]
+        slow       = [dict(e) for e in _slow]
+    statements.sort(key=lambda s: s["total_ms"], reverse=True)
+    if plans and slow:
+        _plans(slow)
+    return {
+        "started":    _started,
+        "captured":   time.time(),
+        "slow_ms":    _slow_ms,
+        "functions":  dict(sorted(functions.items(),
+                                  key=lambda kv: kv[1]["total_ms"], reverse=True)),
+        "statements": statements,
+        "slow":       slow,
+    }
+
+def export_json(path: str) -> str:
+    data = snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return path
+
+def format_report(data: dict, top: int = 20) -> str:
+    """A snapshot()/export as text tables, heaviest first."""
+    head = f"{'':<44} {'calls':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows':>8}"
+
+    def line(label, s):
+        return (f"{label[:44]:<44} {s['calls']:>7} {s['total_ms']:>10.1f} "
+                f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s.get('rows', ''):>8}")
+
+    out = ["── functions ──", head]
+    out += [line(n, s) for n, s in list(data["functions"].items())[:top]]
+    out += ["", "── statements ──", head]
+    for s in data["statements"][:top]:
+        out.append(line(s["sql"], s))
+        out.append(f"    {s['sql'][:160]}")
+    out += ["", f"── slow statements (≥ {data['slow_ms']:g} ms) ──"]
+    for e in data["slow"][-top:]:
+        out.append(f"{e['ms']:8.1f} ms  {e['function']}: {e['statement'][:120]}")
+        out += [f"            {step}" for step in e.get("plan", [])]
+    return "\n".join(out)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Print a db_profiler JSON export.")
+    ap.add_argument("profile", help="JSON written by export_json / CUREVET_DB_PROFILE")
+    ap.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+    with open(args.profile, encoding="utf-8") as f:
+        print(format_report(json.load(f), args.top))
@@ -0,0 +1,132 @@
+# db_writer.py
+"""
+The single writer thread. Pages hand their saves to submit() instead of
+calling db_manager on the GUI thread, and get a Future back (or use
+ui.db_write.run_write for a callback on the GUI thread).
+
+Writes that arrive within settings.write_group_ms of each other (up to
+settings.write_group_max) share one db_manager.group_transaction(), so
+they pay for a single commit. Each write is its own savepoint: one that
+raises fails only its own Future. If the group cannot commit at all
+(e.g. the database stayed locked), its writes are retried one by one,
+each in its own transaction with the usual busy retries.
+
+Futures are resolved only after the commit, so a caller that sees a
+result knows the data is on disk.
+"""
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+import db_manager
+
+log = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """A command queue drained by one thread, started on first submit()."""
+    def __init__(self):
+        self._queue  = queue.Queue()
+        self._thread = None
+        self._lock   = threading.Lock()
+        self.stats   = {'writes': 0, 'commits': 0, 'fallbacks': 0}
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for the writer thread."""
+        future = Future()
+        if threading.current_thread() is self._thread:
+            # a write that queues another write: run it in place
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_thread()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def stop(self, timeout: float = 10.0):
+        """Finish what is queued, then end the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self, first) -> tuple[list, bool]:
+        """The first command plus any that arrive within the group window."""
+        batch, stopping = [first], False
+        window = db_manager.settings.write_group_ms / 1000
+        while len(batch) < db_manager.settings.write_group_max:
+            try:
+                item = self._queue.get(timeout=window) if window > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        return batch, stopping
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, stopping = self._next_batch(item)
+            batch = [b for b in batch if b[0].set_running_or_notify_cancel()]
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: list):
+        outcomes = []       # (future, result, exception)
+        try:
+            with db_manager.group_transaction():
+                for future, fn, args, kwargs in batch:
+                    try:
+                        outcomes.append((future, fn(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception:
+            log.exception("Group commit of %d writes failed; retrying them one by one", len(batch))
+            self.stats['fallbacks'] += 1
+            outcomes = []
+            for future, fn, args, kwargs in batch:
+                try:
+                    outcomes.append((future, fn(*args, **kwargs), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+        else:
+            self.stats['commits'] += 1
+        self.stats['writes'] += len(batch)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writer = WriteQueue()
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Run a db_manager write (or a function of several) on the writer thread."""
+    return _writer.submit(fn, *args, **kwargs)
+
+def call(fn, *args, **kwargs):
+    """submit() and wait for the result, for code already off the GUI thread."""
+    return _writer.submit(fn, *args, **kwargs).result()
+
+def stop():
+    _writer.stop()
+
+def stats() -> dict:
+    return dict(_writer.stats)
@@ -0,0 +1,157 @@
+# inventory_import.py
+"""
+Bulk stock import from a supplier invoice, as CSV (one line per row,
+header row required) or JSON (a list of objects, or {"lines": [...]}).
+
+Columns, with the names AddInventoryPage uses:
+
+    name, category, unit, quantity, expiration_date (YYYY-MM-DD),
+    default_sell_price, unit_cost, purchase_date (default today),
+    reorder_level (default 0)
+
+qty, expiry, sell_price and cost are accepted as short names. Every
+line is validated first; bad lines are reported with their line number
+and skipped, and the rest go to db_manager.bulk_restock() in one
+transaction.
+
+    python inventory_import.py invoice.csv [--dry-run]
+"""
+import os
+import csv
+import json
+import math
+from datetime import date
+
+import db_manager
+
+ALIASES = {
+    "qty":        "quantity",
+    "expiry":     "expiration_date",
+    "sell_price": "default_sell_price",
+    "price":      "default_sell_price",
+    "cost":       "unit_cost",
+}
+
+REQUIRED = ("name", "category", "unit", "quantity", "expiration_date",
+            "default_sell_price", "unit_cost")
+
+
+class ImportResult:
+    def __init__(self, lines: list[dict], errors: list[tuple[int, str]]):
+        self.lines    = lines           # validated, ready for bulk_restock
+        self.errors   = errors          # (line number, message)
+        self.imported = 0
+
+    def summary(self) -> str:
+        text = f"{self.imported} line(s) imported"
+        if self.errors:
+            text += f", {len(self.errors)} skipped:\n" + "\n".join(
+                f"  line {n}: {msg}" for n, msg in self.errors[:20])
+            if len(self.errors) > 20:
+                text += f"\n  … and {len(self.errors) - 20} more"
+        return text
+
+
+# ── Reading ──
+
+def _read_csv(path: str):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        # line 1 is the header
+        for n, row in enumerate(csv.DictReader(f), start=2):
+            yield n, row
+
+def _read_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("lines", [])
+    if not isinstance(data, list):
+        raise ValueError("JSON import must be a list of lines or {\"lines\": [...]}")
+    for n, row in enumerate(data, start=1):
+        yield n, row if isinstance(row, dict) else {}
+
+def read_lines(path: str):
+    """(line number, raw dict) for every line of a .csv or .json file."""
+    if os.path.splitext(path)[1].lower() == ".json":
+        return _read_json(path)
+    return _read_csv(path)
+
+
+# ── Validation ──
+
+def _text(raw: dict, key: str) -> str:
+    value = raw.get(key)
+    return "" if value is None else str(value).strip()
+
+def _date(value: str, field: str) -> str:
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{field} must be YYYY-MM-DD, got {value!r}") from None
+
+def _number(value: str, field: str, kind=float, minimum=0):
+    try:
+        n = kind(float(value)) if kind is int else kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{field} must be a number, got {value!r}") from None
+    if not math.isfinite(n):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if kind is int and float(value) != n:
+        raise ValueError(f"{field} must be a whole number, got {value!r}")
+    if n < minimum:
+        raise ValueError(f"{field} must be at least {minimum}, got {value!r}")
+    return n
+
+def validate_line(raw: dict, today: str) -> dict:
+    """One raw line as a bulk_restock() line; raises ValueError if it is not valid."""
+    raw = {ALIASES.get(k.strip().lower(), k.strip().lower()): v
+           for k, v in raw.items() if k is not None}
+    missing = [k for k in REQUIRED if not _text(raw, k)]
+    if missing:
+        raise ValueError("missing " + ", ".join(missing))
+    return {
+        'name':               _text(raw, 'name'),
+        'category':           _text(raw, 'category'),
+        'unit':               _text(raw, 'unit'),
+        'quantity':           _number(_text(raw, 'quantity'), 'quantity', int, 1),
+        'reorder_level':      _number(_text(raw, 'reorder_level') or 0, 'reorder_level', int),
+        'expiration_date':    _date(_text(raw, 'expiration_date'), 'expiration_date'),
+        'default_sell_price': _number(_text(raw, 'default_sell_price'), 'default_sell_price'),
+        'unit_cost':          _number(_text(raw, 'unit_cost'), 'unit_cost'),
+        'purchase_date':      _date(_text(raw, 'purchase_date') or today, 'purchase_date'),
+    }
+
+def load(path: str) -> ImportResult:
+    """Read and validate a file without touching the database."""
+    today = date.today().isoformat()
+    lines, errors = [], []
+    for n, raw in read_lines(path):
+        try:
+            lines.append(validate_line(raw, today))
+        except ValueError as e:
+            errors.append((n, str(e)))
+    return ImportResult(lines, errors)
+
+def import_file(path: str, dry_run: bool = False) -> ImportResult:
+    """load() the file, then write its valid lines in one transaction."""
+    result = load(path)
+    if result.lines and not dry_run:
+        result.imported = db_manager.bulk_restock(result.lines)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    ap = argparse.ArgumentParser(description="Import a supplier invoice into inventory.")
+    ap.add_argument("file", help=".csv or .json invoice")
+    ap.add_argument("--dry-run", action="store_true", help="validate only")
+    args = ap.parse_args()
+    res = import_file(args.file, args.dry_run)
+    if args.dry_run:
+        print(f"{len(res.lines)} valid line(s), {len(res.errors)} with errors")
+        for n, msg in res.errors:
+            print(f"  line {n}: {msg}")
+    else:
+        print(res.summary())
+    sys.exit(1 if res.errors else 0)
@@ -1,20 +1,30 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QStackedWidget
-from PyQt5.QtCore import Qt
-from PyQt5.QtCore import QEvent, Qt, QTimer
-
-
-from ui.splash            import SplashScreen
-from ui.welcome           import WelcomeWidget
-from ui.dashboard         import DashboardWidget
-from ui.add_patient       import AddPatientPage
-from ui.add_inventory     import AddInventoryPage
-from ui.inventory_list    import InventoryListPage
-from ui.add_visit         import AddVisitPage
-from ui.show_history      import ShowHistoryPage
-from ui.calendar_page     import CalendarPage
-from ui.report            import ReportPage
-from notification_manager import NotificationManager,NotificationPage
+import importlib
+import startup_timing
+from startup_timing import timed
+
+with timed("import", "PyQt5"):
+    from PyQt5.QtWidgets import QApplication, QMainWindow, QStackedWidget
+    from PyQt5.QtCore import QEvent, Qt, QTimer
+
+with timed("import", "db_manager"):
+    import db_manager
+    import db_writer
+import db_profiler
+if db_profiler.PROFILE_PATH:
+    # before any page module does `from db_manager import ...`
+    db_profiler.enable()
+with timed("import", "ui.splash"):
+    from ui.splash            import SplashScreen
+with timed("import", "ui.welcome"):
+    from ui.welcome           import WelcomeWidget
+with timed("import", "ui.dashboard"):
+    from ui.dashboard         import DashboardWidget
+with timed("import", "notification_manager"):
+    from notification_manager import NotificationManager
+with timed("import", "reminder_outbox"):
+    import reminder_outbox
+from stall_watchdog import StallWatchdog
 
 
 
@@ -30,67 +40,69 @@ class MainApp(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
-        # Pages
-        self.welcome          = WelcomeWidget(on_start=self.show_dashboard)
-        self.dashboard = DashboardWidget(
-            on_back               = self.show_welcome,
-            on_book_appointment   = self.show_add_visit,
-            on_show_history       = self.show_history_search,
-            on_add_patient        = self.show_add_patient,
-            on_manage_inventory   = self.show_inventory_list,
-            on_show_calendar      = self.show_calendar_page,
-            on_show_report        = self.show_report_page,
-            on_show_notifications = self.show_notifications,    # ← new callback
-            notif_manager         = self.notif_manager         # ← new manager
-        )
-
-
-        self.report_page      = ReportPage(on_back=self.show_dashboard)
-        self.calendar_page    = CalendarPage(
-            on_back=self.show_dashboard,
-            on_show_history=self.show_history
-        )
-        self.add_patient      = AddPatientPage(on_back=self.show_dashboard)
-        self.inventory_list   = InventoryListPage(
-            on_back=self.show_dashboard,
-            on_add=self.show_add_inventory
-        )
-        self.add_inventory    = AddInventoryPage(on_back=self.show_inventory_list)
-        self.add_visit        = AddVisitPage(
-            on_back=self.show_dashboard,
-            on_show_history=self.show_history
-        )
-        self.show_history_page = ShowHistoryPage(
-            on_back      = self.show_dashboard,
-            on_add_visit = self.show_add_visit_for_pet
-        )
-
-        # ── NEW: Notification settings page ──────────────────────────────
-        self.notification_page = NotificationPage(
-            parent=self,
-            notif_manager=self.notif_manager,
-            on_back=self.show_dashboard
-        )
-
-
-        # Add pages to the stack
-        for w in (
-            self.welcome,
-            self.dashboard,
-            self.add_patient,
-            self.inventory_list,
-            self.add_inventory,
-            self.add_visit,
-            self.show_history_page,
-            self.calendar_page,
-            self.report_page,
-            self.notification_page
-        ):
+        # Pages: welcome and dashboard are needed at once, the rest are
+        # built (and their modules imported) on first navigation
+        with timed("page", "welcome"):
+            self.welcome          = WelcomeWidget(on_start=self.show_dashboard)
+        with timed("page", "dashboard"):
+            self.dashboard = DashboardWidget(
+                on_back               = self.show_welcome,
+                on_book_appointment   = self.show_add_visit,
+                on_show_history       = self.show_history_search,
+                on_add_patient        = self.show_add_patient,
+                on_manage_inventory   = self.show_inventory_list,
+                on_show_calendar      = self.show_calendar_page,
+                on_show_report        = self.show_report_page,
+                on_show_notifications = self.show_notifications,    # ← new callback
+                notif_manager         = self.notif_manager         # ← new manager
+            )
+
+        # name → (module, class, constructor kwargs)
+        self._factories = {
+            "report_page":       ("ui.report", "ReportPage",
+                                  lambda: dict(on_back=self.show_dashboard)),
+            "calendar_page":     ("ui.calendar_page", "CalendarPage",
+                                  lambda: dict(on_back=self.show_dashboard,
+                                               on_show_history=self.show_history)),
+            "add_patient":       ("ui.add_patient", "AddPatientPage",
+                                  lambda: dict(on_back=self.show_dashboard)),
+            "inventory_list":    ("ui.inventory_list", "InventoryListPage",
+                                  lambda: dict(on_back=self.show_dashboard,
+                                               on_add=self.show_add_inventory)),
+            "add_inventory":     ("ui.add_inventory", "AddInventoryPage",
+                                  lambda: dict(on_back=self.show_inventory_list)),
+            "add_visit":         ("ui.add_visit", "AddVisitPage",
+                                  lambda: dict(on_back=self.show_dashboard,
+                                               on_show_history=self.show_history)),
+            "show_history_page": ("ui.show_history", "ShowHistoryPage",
+                                  lambda: dict(on_back=self.show_dashboard,
+                                               on_add_visit=self.show_add_visit_for_pet)),
+            "notification_page": ("notification_manager", "NotificationPage",
+                                  lambda: dict(parent=self,
+                                               notif_manager=self.notif_manager,
+                                               on_back=self.show_dashboard)),
+        }
+        self._pages = {}
+
+        for w in (self.welcome, self.dashboard):
             self.stack.addWidget(w)
 
         # start on welcome
         self.stack.setCurrentWidget(self.welcome)
 
+    def page(self, name: str):
+        """The page registered as `name`, constructed on first use."""
+        w = self._pages.get(name)
+        if w is None:
+            module, cls, kwargs = self._factories[name]
+            with timed("import", module):
+                mod = importlib.import_module(module)
+            with timed("page", name):
+                w = getattr(mod, cls)(**kwargs())
+            self.stack.addWidget(w)
+            self._pages[name] = w
+        return w
+
     def keyPressEvent(self, event):
         # ESC toggles full-screen/windowed
         if event.key() == Qt.Key_Escape:
@@ -127,26 +139,27 @@ class MainApp(QMainWindow):
         self.stack.setCurrentWidget(self.welcome)
 
     def show_add_patient(self):
-        self.stack.setCurrentWidget(self.add_patient)
+        self.stack.setCurrentWidget(self.page("add_patient"))
 
     def show_inventory_list(self):
-        self.stack.setCurrentWidget(self.inventory_list)
+        self.stack.setCurrentWidget(self.page("inventory_list"))
 
     def show_add_inventory(self):
-        self.stack.setCurrentWidget(self.add_inventory)
+        self.stack.setCurrentWidget(self.page("add_inventory"))
 
         
     # ─── Add these navigation methods near the others ───────────────────────────
 
     def show_add_visit(self):
         """Dashboard → AddVisitPage with blank search."""
-        self.add_visit.reset_visit_forms()
-        self.stack.setCurrentWidget(self.add_visit)
+        page = self.page("add_visit")
+        page.reset_visit_forms()
+        self.stack.setCurrentWidget(page)
 
     def show_history_search(self):
         """Dashboard → ShowHistoryPage in search mode."""
         # reset fields
-        sh = self.show_history_page
+        sh = self.page("show_history_page")
         sh.search_input.clear()
         sh.owner_list.clear()
         sh.pet_list.clear()
@@ -160,13 +173,16 @@ class MainApp(QMainWindow):
         Dashboard → ShowHistoryPage for this (owner,pet)
         (without needing a show_history() method on the page itself)
         """
-        page = self.show_history_page
+        page = self.page("show_history_page")
 
         # 1) Bring up the History page
         self.stack.setCurrentWidget(page)
 
         # 2) Run the owner‐search logic
-        page.search_input.setText(owner['name'])          # triggers on_search_owner :contentReference[oaicite:0]{index=0}
+        # (by phone: the exact number ranks first however common the name is;
+        #  search_now fills owner_list synchronously instead of after the debounce)
+        page.search_input.setText(owner['phone'])
+        page.owner_search.search_now(owner['phone'])
         # 3) Find & select the exact owner item
         for i in range(page.owner_list.count()):
             itm = page.owner_list.item(i)
@@ -190,36 +206,65 @@ class MainApp(QMainWindow):
 
     def show_add_visit_for_pet(self, owner, pet):
         """ShowHistoryPage → AddVisitPage pre-filled for this (owner,pet)."""
-        self.add_visit.set_context(owner, pet)
-        self.stack.setCurrentWidget(self.add_visit)
+        page = self.page("add_visit")
+        page.set_context(owner, pet)
+        self.stack.setCurrentWidget(page)
 
     def show_calendar_page(self):
         """
-        Switch to the CalendarPage, reloading its data first.
+        Switch to the CalendarPage (its showEvent loads the visible month).
         """
-        # reload appointments in case anything changed
-        self.calendar_page._load_appointments()
-        # show it
-        self.stack.setCurrentWidget(self.calendar_page)
+        self.stack.setCurrentWidget(self.page("calendar_page"))
     
     def show_report_page(self):
-        self.stack.setCurrentWidget(self.report_page)
+        self.stack.setCurrentWidget(self.page("report_page"))
 
     def show_notifications(self):
-        self.stack.setCurrentWidget(self.notification_page)
+        self.stack.setCurrentWidget(self.page("notification_page"))
 
 
     
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(reminder_outbox.stop_dispatcher)   # before the pool closes
+    app.aboutToQuit.connect(db_writer.stop)                    # drains queued saves
+    if db_profiler.PROFILE_PATH:
+        app.aboutToQuit.connect(lambda: db_profiler.export_json(db_profiler.PROFILE_PATH))
+    app.aboutToQuit.connect(db_manager.shutdown)
+    db_manager.start_checkpoint_scheduler()
         # 1) start notifications
-    notif_manager = NotificationManager(parent=None)
+    with timed("page", "notification_manager"):
+        notif_manager = NotificationManager(parent=None)
     main_win = MainApp(notif_manager)
 
-    # Splash
-    splash = SplashScreen(duration_ms=1500)
+    # log GUI freezes with the page on screen and where the GUI thread was
+    watchdog = StallWatchdog(
+        page=lambda: type(main_win.stack.currentWidget()).__name__, parent=main_win
+    )
+    watchdog.start()
+    app.aboutToQuit.connect(watchdog.stop)
+
+    # Splash: stays up exactly as long as the startup work takes
+    splash = SplashScreen(
+        tasks=[
+            ("Opening database",          db_manager.schema_version),   # creates/migrates
+            ("Loading species & reasons", lambda: (db_manager.get_all_species(),
+                                                   db_manager.get_all_reasons())),
+            ("Loading inventory",         db_manager.get_stock_snapshot),  # fills the inventory cache too
+            ("Checking notifications",    notif_manager.engine.alerts),
+        ],
+        gui_tasks=[
+            # the two pages opened many times a day; the rest stay lazy
+            ("Preparing visits",          lambda: main_win.page("add_visit")),
+            ("Preparing history",         lambda: main_win.page("show_history_page")),
+        ],
+    )
     splash.finished.connect(main_win.showFullScreen)
     splash.finished.connect(splash.close)
+    splash.finished.connect(startup_timing.report)
+    # reminders left in the outbox by the last session go out without
+    # waiting for the calendar page to be opened
+    splash.finished.connect(reminder_outbox.resume_pending)
     splash.show()
 
     sys.exit(app.exec_())
@@ -22,8 +22,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QFont, QIcon
 from PyQt5.QtCore import Qt, QTimer, QSettings, QDate
-from datetime import timedelta
-from db_manager import get_connection
+from datetime import date, timedelta
+import db_manager
 
 # CSS for report‐style tables
 _report_table_css = """
@@ -41,6 +41,77 @@ QHeaderView::section {
 }
 """
 
+class NotificationEngine:
+    """
+    The current alert set, kept in memory. Each group is recomputed only
+    when one of its inputs moves: the change_log version of the data it
+    reads (bumped by triggers on every write), today's date, or the
+    user's settings. Checking is one tiny query, so callers may ask as
+    often as they like.
+    """
+    GROUPS = ("expiry", "reorder", "appointments")
+
+    def __init__(self, expiry_days=1, reorder_enable=True, appointments_enable=True):
+        self.expiry_days         = expiry_days
+        self.reorder_enable      = reorder_enable
+        self.appointments_enable = appointments_enable
+        self._inputs = {}   # group → inputs its cached alerts were computed from
+        self._alerts = {g: [] for g in self.GROUPS}
+
+    def invalidate(self):
+        self._inputs.clear()
+
+    def refresh(self) -> bool:
+        """Recompute stale groups only; True if any alert changed."""
+        versions = db_manager.get_change_versions()
+        today    = date.today()
+        inputs = {
+            "expiry":       (versions.get("inventory"), today, self.expiry_days),
+            "reorder":      (versions.get("inventory"), self.reorder_enable),
+            "appointments": (versions.get("appointments"), today, self.appointments_enable),
+        }
+        changed = False
+        for group, key in inputs.items():
+            if self._inputs.get(group) == key:
+                continue
+            alerts = getattr(self, f"_{group}_alerts")(today)
+            changed |= alerts != self._alerts[group]
+            self._alerts[group] = alerts
+            self._inputs[group] = key
+        return changed
+
+    def alerts(self) -> list:
+        self.refresh()
+        return [a for g in self.GROUPS for a in self._alerts[g]]
+
+    def count(self) -> int:
+        self.refresh()
+        return sum(len(self._alerts[g]) for g in self.GROUPS)
+
+    def _expiry_alerts(self, today):
+        if self.expiry_days <= 0:
+            return []
+        cutoff = (today + timedelta(days=self.expiry_days)).isoformat()
+        return [("Expiry", (r['name'], r['expiration_date']))
+                for r in db_manager.get_expiring_items(cutoff)]
+
+    def _reorder_alerts(self, today):
+        if not self.reorder_enable:
+            return []
+        return [("Reorder", (r['name'], f"{r['quantity']} ≤ {r['reorder_level']}"))
+                for r in db_manager.get_low_stock_items()]
+
+    def _appointments_alerts(self, today):
+        if not self.appointments_enable:
+            return []
+        notes = []
+        for offset, label in ((1, "Tomorrow"), (2, "Day After")):
+            day = (today + timedelta(days=offset)).isoformat()
+            for r in db_manager.get_appointments_on(day):
+                notes.append((label, (r['pet_name'], r['appointment_date'])))
+        return notes
+
+
 class NotificationManager:
     """Handles persistence of settings, periodic checks, and tray alerts."""
     def __init__(self, parent: QWidget = None):
@@ -49,10 +120,14 @@ class NotificationManager:
         self.expiry_days         = self.settings.value("expiry_days", 1, type=int)
         self.reorder_enable      = self.settings.value("reorder_enable", True, type=bool)
         self.appointments_enable = self.settings.value("appointments_enable", True, type=bool)
+        self.engine = NotificationEngine(
+            self.expiry_days, self.reorder_enable, self.appointments_enable
+        )
 
         self.tray = QSystemTrayIcon(QIcon("assets/icon.png"), parent)
         self.tray.show()
 
+        # cheap tick: only categories whose change_log version moved are re-queried
         self.timer = QTimer(parent)
         self.timer.timeout.connect(self._show_tray_notifications)
         self.timer.start(60 * 1000)
@@ -61,6 +136,9 @@ class NotificationManager:
         self.expiry_days         = expiry_days
         self.reorder_enable      = reorder
         self.appointments_enable = appointments
+        self.engine.expiry_days         = expiry_days
+        self.engine.reorder_enable      = reorder
+        self.engine.appointments_enable = appointments
         self.settings.setValue("expiry_days", expiry_days)
         self.settings.setValue("reorder_enable", reorder)
         self.settings.setValue("appointments_enable", appointments)
@@ -71,46 +149,11 @@ class NotificationManager:
         - For Expiry/Reorder: payload is (item_name, detail)
         - For Tomorrow/Day After: payload is (pet_name, date_str)
         """
-        notes = []
-        conn = get_connection()
-        cur = conn.cursor()
-        today = QDate.currentDate().toPyDate()
-
-        # Expiry
-        if self.expiry_days > 0:
-            cutoff = (today + timedelta(days=self.expiry_days)).isoformat()
-            cur.execute(
-                "SELECT name, expiration_date FROM inventory WHERE DATE(expiration_date) <= ?",
-                (cutoff,)
-            )
-            for name, exp in cur.fetchall():
-                notes.append(("Expiry", (name, exp)))
+        return self.engine.alerts()
 
-        # Reorder
-        if self.reorder_enable:
-            cur.execute(
-                "SELECT name, quantity, reorder_level FROM inventory WHERE quantity <= reorder_level"
-            )
-            for name, qty, lvl in cur.fetchall():
-                notes.append(("Reorder", (name, f"{qty} ≤ {lvl}")))
-
-        # Appointments
-        if self.appointments_enable:
-            for offset, label in ((1, "Tomorrow"), (2, "Day After")):
-                day = (today + timedelta(days=offset)).isoformat()
-                cur.execute(
-                    "SELECT p.pet_name, fa.appointment_date "
-                    "FROM future_appointments fa "
-                    "JOIN visits v ON fa.visit_id=v.id "
-                    "JOIN pets p ON v.pet_id=p.id "
-                    "WHERE DATE(fa.appointment_date)=?",
-                    (day,)
-                )
-                for pet, dt in cur.fetchall():
-                    notes.append((label, (pet, dt)))
-
-        conn.close()
-        return notes
+    def notification_count(self) -> int:
+        """Badge count, served from the engine's cached alert set."""
+        return self.engine.count()
 
     def _show_tray_notifications(self):
         for cat, payload in self.fetch_notifications():
@@ -0,0 +1,215 @@
+# reminder_outbox.py
+
+import sys
+import time
+import random
+import socket
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+
+import db_manager
+import db_writer
+
+
+# ── Messages ──
+
+def compose_reminder(v: dict) -> tuple[str, str]:
+    """
+    Build (number, message) for one appointment dict with keys:
+      - phone:            recipient phone number (string)
+      - owner_name:       name of the recipient
+      - pet_name:         pet’s name(s)
+      - next_appointment: date string (yyyy-MM-dd)
+      - reason:           appointment reason/text
+    """
+    number = v.get("phone", "")
+    # ensure country code
+    if number.startswith("0"):
+        number = "2" + number
+
+    name   = v.get("owner_name", "")
+    pet    = v.get("pet_name", "")
+    date   = v.get("next_appointment", "")
+    reason = v.get("reason", "")  # ← newly extracted
+
+    ts   = int(time.time())
+    link = f"https://www.facebook.com/share/1CdXFXvpQP/?_={ts}"
+    message = (
+        f"مرحبا {name} ,\n"
+        f"عيادة Cure تذكركم بموعد الزيارة القادمة لمتابعة سلامة {pet}\n"
+        f"بتاريخ {date}\n"
+        f"وذلك لإجراء موعد {reason}\n\n"  # ← inserted reason line
+        "و متنسوش تتابعوا نصايحنا و عروضنا على صفحة الفيسبوك:\n"
+        f"{link}"
+    )
+    return number, message
+
+
+# ── Transports ──
+
+class Transport:
+    """Delivers one composed reminder; raise to report a failed attempt."""
+    timeout_s = 0.0     # longest one send() can block
+
+    def send(self, phone: str, message: str, mode: str, idx: int) -> None:
+        raise NotImplementedError
+
+    def interrupt(self) -> None:
+        """Make a send in progress give up soon (the app is closing)."""
+
+    def stats(self) -> dict:
+        """Per-step latency summary, if the transport keeps one."""
+        return {}
+
+
+class WhatsAppTransport(Transport):
+    """The real sender: drives WhatsApp Desktop/Web through wp.py."""
+    timeout_s = 110.0   # "auto": a desktop attempt, then the web fallback
+
+    def send(self, phone, message, mode, idx):
+        import wp   # pyautogui & win32 are only needed once something is sent
+        wp.send_whatsapp(phone, message, idx, mode)
+
+    def interrupt(self):
+        wp = sys.modules.get("wp")     # nothing to interrupt if never imported
+        if wp is not None:
+            wp.abort_sends()
+
+    def stats(self):
+        import wp
+        return wp.latency_stats()
+
+
+class FakeTransport(Transport):
+    """
+    Records messages instead of sending them, for tests and demos.
+    fail_first=N makes the first N attempts raise, to exercise retries.
+    """
+    def __init__(self, fail_first: int = 0, delay: float = 0.0):
+        self.fail_first = fail_first
+        self.delay      = delay
+        self.timeout_s  = delay
+        self.attempts   = 0
+        self.sent       = []    # (phone, message, mode)
+
+    def send(self, phone, message, mode, idx):
+        self.attempts += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.attempts <= self.fail_first:
+            raise RuntimeError(f"fake failure {self.attempts}")
+        self.sent.append((phone, message, mode))
+
+
+# ── Dispatcher ──
+
+# Terminals sharing clinic.db tell their claims apart by this name.
+TERMINAL      = socket.gethostname()
+# A claim older than this belongs to a terminal that stopped mid-send;
+# well above the longest send (WhatsAppTransport.timeout_s).
+CLAIM_LEASE_S = 600.0
+
+class ReminderDispatcher(QThread):
+    """
+    Drains reminder_outbox on its own thread so the GUI never waits on
+    WhatsApp. Failed attempts are re-queued with exponential backoff
+    (backoff_s, 2×, 4×, … plus jitter) until max_attempts, then marked
+    failed. Signals report progress back to the UI. Its writes go
+    through db_writer, like every other write in the app.
+    """
+    progress = pyqtSignal(dict)        # outbox counts by status
+    sent     = pyqtSignal(int)         # outbox id
+    failed   = pyqtSignal(int, str)    # outbox id, last error (no retries left)
+
+    def __init__(self, transport: Transport = None, max_attempts: int = 4,
+                 backoff_s: float = 30.0, delay_s: float = 0.5, parent=None):
+        super().__init__(parent)
+        self.transport    = transport or WhatsAppTransport()
+        self.max_attempts = max_attempts
+        self.backoff_s    = backoff_s
+        self.delay_s      = delay_s
+        self._wake        = threading.Event()
+        self._stopping    = False
+
+    def wake(self):
+        """New reminders were queued: stop idling."""
+        self._wake.set()
+
+    def stop(self, wait_ms: int = 5000):
+        """
+        End the thread. A send in progress is interrupted, and the wait
+        also covers the transport's whole timeout in case it cannot be,
+        so the pool is never closed under a running send.
+        """
+        self._stopping = True
+        self._wake.set()
+        self.transport.interrupt()
+        self.wait(wait_ms + int(self.transport.timeout_s * 1000))
+
+    def _sleep(self, seconds: float):
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def run(self):
+        db_writer.call(db_manager.requeue_interrupted_reminders,
+                       TERMINAL, time.time() - CLAIM_LEASE_S)
+        self.progress.emit(db_manager.get_outbox_counts())
+        idx = 0     # position in the current burst (wp waits longer for the first)
+        while not self._stopping:
+            item = db_writer.call(db_manager.claim_next_reminder, time.time(), TERMINAL)
+            if item is None:
+                idx = 0
+                due = db_manager.get_next_reminder_due()
+                self._sleep(60.0 if due is None else min(60.0, max(0.1, due - time.time())))
+                continue
+
+            idx += 1
+            try:
+                self.transport.send(item['phone'], item['message'], item['mode'], idx)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if item['attempts'] >= self.max_attempts:
+                    db_writer.call(db_manager.mark_reminder_failed, item['id'], error)
+                    self.failed.emit(item['id'], error)
+                else:
+                    backoff = self.backoff_s * 2 ** (item['attempts'] - 1)
+                    retry_at = time.time() + backoff * random.uniform(1.0, 1.25)
+                    db_writer.call(db_manager.mark_reminder_failed, item['id'], error, retry_at)
+            else:
+                db_writer.call(db_manager.mark_reminder_sent, item['id'])
+                self.sent.emit(item['id'])
+            self.progress.emit(db_manager.get_outbox_counts())
+            if not self._stopping:
+                self._sleep(self.delay_s)
+
+
+_dispatcher = None
+
+def dispatcher() -> ReminderDispatcher:
+    """The app-wide dispatcher, started on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = ReminderDispatcher()
+        _dispatcher.start()
+    return _dispatcher
+
+def stop_dispatcher():
+    if _dispatcher is not None:
+        _dispatcher.stop()
+
+def resume_pending():
+    """Start the dispatcher if the outbox still holds unsent reminders."""
+    counts = db_manager.get_outbox_counts()
+    if counts['queued'] or counts['sending']:
+        dispatcher()
+
+def queue_reminders(reminders: list[dict]):
+    """
+    Persist composed reminders on the writer thread and wake the
+    dispatcher once they are committed. Returns the Future of their ids.
+    """
+    d = dispatcher()
+    future = db_writer.submit(db_manager.enqueue_reminders, reminders)
+    future.add_done_callback(lambda f: d.wake())
+    return future
+
@@ -0,0 +1,226 @@
+# report_export.py
+"""
+CSV and XLSX export of the report tables, streamed: rows go from the
+cursor (db_manager.stream_report / stream_daily_summary) to the file one
+at a time, so memory stays flat however long the date range.
+
+The XLSX writer needs nothing but zipfile: the sheet XML is written
+straight into its zip entry with inline strings (no shared-string table
+to hold in memory), and rolls over to a new sheet at Excel's row limit.
+
+    export("sales", "2023-01-01", "2025-12-31", "sales.xlsx")
+"""
+import os
+import re
+import csv
+import zipfile
+import itertools
+from xml.sax.saxutils import escape
+
+import db_manager
+
+# report → [(row key, header)]
+COLUMNS = {
+    "purchases": [("item", "Item"), ("quantity", "Qty"), ("unit_cost", "Unit Cost"),
+                  ("total_cost", "Total"), ("purchase_date", "Date")],
+    "sales":     [("service", "Service"), ("owner", "Owner"), ("quantity", "Qty"),
+                  ("total", "Total"), ("visit_date", "Date")],
+    "visits":    [("pet_name", "Pet"), ("owner", "Owner"), ("visit_date", "Date"),
+                  ("doctor_name", "Doctor"), ("notes", "Notes")],
+    "summary":   [("day", "Date"), ("revenue", "Revenue"), ("cost", "Cost"),
+                  ("profit", "Profit"), ("visits", "Visits")],
+}
+
+PROGRESS_EVERY = 1000       # rows between progress() calls
+XLSX_MAX_ROWS  = 1_048_576  # per sheet, header included
+
+
+class Cancelled(Exception):
+    """progress() asked the export to stop."""
+
+
+def rows(report: str, start_date: str, end_date: str, conn=None):
+    """Tuples in COLUMNS[report] order, streamed from the database."""
+    keys = [k for k, _ in COLUMNS[report]]
+    if report == "summary":
+        source = db_manager.stream_daily_summary(start_date, end_date, conn)
+    else:
+        source = db_manager.stream_report(report, start_date, end_date, conn)
+    for r in source:
+        yield tuple(r[k] for k in keys)
+
+
+def _counted(rows, progress):
+    """Pass rows through, calling progress(n) every PROGRESS_EVERY rows."""
+    n = 0
+    for row in rows:
+        yield row
+        n += 1
+        if progress and n % PROGRESS_EVERY == 0 and progress(n):
+            raise Cancelled()
+
+
+# ── CSV ──
+
+def write_csv(f, headers, rows) -> int:
+    w = csv.writer(f)
+    w.writerow(headers)
+    n = 0
+    for row in rows:
+        w.writerow(row)
+        n += 1
+    return n
+
+
+# ── XLSX ──
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+{sheets}</Types>"""
+
+_SHEET_TYPE = ('<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType='
+               '"application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>\n')
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{sheets}</sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{rels}<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# style 0 = default, 1 = bold header
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+</styleSheet>"""
+
+_SHEET_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>
+<cols><col min="1" max="{ncols}" width="20" customWidth="1"/></cols>
+<sheetData>
+"""
+_SHEET_TAIL = "</sheetData>\n</worksheet>"
+
+# characters XML 1.0 does not allow, even escaped
+_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _column_letters(n: int) -> list[str]:
+    out = []
+    for i in range(1, n + 1):
+        s = ""
+        while i:
+            i, r = divmod(i - 1, 26)
+            s = chr(65 + r) + s
+        out.append(s)
+    return out
+
+
+def _row_xml(index: int, values, letters, style: str = "") -> str:
+    cells = []
+    for col, v in zip(letters, values):
+        ref = f"{col}{index}"
+        if v is None:
+            continue
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            cells.append(f'<c r="{ref}"{style}><v>{v!r}</v></c>')
+        else:
+            text = escape(_ILLEGAL.sub("", str(v)))
+            cells.append(f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{index}">{"".join(cells)}</row>\n'
+
+
+def write_xlsx(path: str, headers, rows, sheet_name: str = "Report",
+               max_rows: int = XLSX_MAX_ROWS) -> int:
+    """Write one workbook; past max_rows the rows continue on "<name> 2", … sheets."""
+    letters = _column_letters(len(headers))
+    header  = _row_xml(1, headers, letters, ' s="1"')
+    total, sheets = 0, 0
+    rows = iter(rows)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        more = True
+        while more:
+            if sheets:
+                first = next(rows, None)    # the limit fell on the last row
+                if first is None:
+                    break
+                rows = itertools.chain((first,), rows)
+            sheets += 1
+            with zf.open(f"xl/worksheets/sheet{sheets}.xml", "w", force_zip64=True) as f:
+                f.write(_SHEET_HEAD.format(ncols=len(headers)).encode())
+                f.write(header.encode())
+                buf, index = [], 1
+                more = False
+                for row in rows:
+                    index += 1
+                    buf.append(_row_xml(index, row, letters))
+                    if len(buf) >= 500:
+                        f.write("".join(buf).encode())
+                        buf.clear()
+                    if index == max_rows:
+                        more = True
+                        break
+                f.write("".join(buf).encode())
+                f.write(_SHEET_TAIL.encode())
+                total += index - 1
+
+        names = [sheet_name] + [f"{sheet_name} {i}" for i in range(2, sheets + 1)]
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_SHEET_TYPE.format(n=i) for i in range(1, sheets + 1))))
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            f'<sheet name="{escape(name[:31])}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(names, 1))))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(rels="".join(
+            f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/'
+            f'2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>\n'
+            for i in range(1, sheets + 1))))
+        zf.writestr("xl/styles.xml", _STYLES)
+    return total
+
+
+# ── Entry point ──
+
+def export(report: str, start_date: str, end_date: str, path: str,
+           conn=None, progress=None) -> int:
+    """
+    Export one report ("purchases", "sales", "visits" or "summary") for a
+    date range to `path`; .xlsx gives a workbook, anything else CSV.
+    progress(rows_written) is called every PROGRESS_EVERY rows and may
+    return True to cancel (raises Cancelled). The file appears only when
+    complete. Returns the number of rows written.
+    """
+    headers = [h for _, h in COLUMNS[report]]
+    source  = _counted(rows(report, start_date, end_date, conn), progress)
+    part    = path + ".part"
+    try:
+        if path.lower().endswith(".xlsx"):
+            n = write_xlsx(part, headers, source, sheet_name=report.title())
+        else:
+            # utf-8-sig: Excel needs the BOM to read non-ASCII names
+            with open(part, "w", newline="", encoding="utf-8-sig") as f:
+                n = write_csv(f, headers, source)
+        os.replace(part, path)
+    except BaseException:
+        source.close()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return n
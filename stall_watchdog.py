@@ -0,0 +1,131 @@
+# stall_watchdog.py
+"""
+Records GUI freezes. A QTimer on the GUI thread stamps a heartbeat every
+`interval_ms`; a watchdog thread checks it, and once the heartbeat is
+older than `threshold_ms` it samples the GUI thread's Python stack
+(sys._current_frames) until the event loop runs again. Each stall is
+then written to a rotating log with its duration, the page that was on
+screen and the distinct stacks seen, e.g.
+
+    STALL 1840 ms on AddVisitPage (3 samples)
+      ×3  File "ui/add_visit.py", line 612, in on_save_prescriptions
+            <the full GUI-thread stack, outermost first>
+
+CUREVET_STALL_MS sets the threshold (default 500, 0 turns the watchdog
+off) and CUREVET_STALL_LOG the log file (default stalls.log in the
+working directory).
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from PyQt5.QtCore import QObject, QTimer
+
+THRESHOLD_MS = int(os.environ.get("CUREVET_STALL_MS", "500"))
+LOG_PATH     = os.environ.get("CUREVET_STALL_LOG") or os.path.join(os.getcwd(), "stalls.log")
+
+log = logging.getLogger("curevet.stalls")
+
+
+def _stall_log(path: str) -> logging.Logger:
+    """The stall logger, writing to `path` (1 MB × 3 files)."""
+    if not any(getattr(h, "baseFilename", None) == os.path.abspath(path) for h in log.handlers):
+        handler = RotatingFileHandler(path, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+class StallWatchdog(QObject):
+    """
+    Create and start() on the GUI thread. `page` is a callable returning
+    the name of what is on screen; it is read on each heartbeat, so the
+    watchdog thread never touches a widget.
+    """
+    def __init__(self, page=None, threshold_ms: int = THRESHOLD_MS,
+                 interval_ms: int = 100, log_path: str = LOG_PATH,
+                 max_samples: int = 10, parent=None):
+        super().__init__(parent)
+        self.page         = page
+        self.threshold    = threshold_ms / 1000
+        self.max_samples  = max_samples
+        self.log_path     = log_path
+        self.recent       = deque(maxlen=50)    # recorded stalls, newest last
+        self._gui_ident   = threading.get_ident()
+        self._beat        = time.monotonic()
+        self._page_name   = ""
+        self._stop        = threading.Event()
+        self._thread      = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._heartbeat)
+
+    def start(self):
+        if self._thread is not None or self.threshold <= 0:
+            return
+        _stall_log(self.log_path)
+        self._heartbeat()
+        self._timer.start()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    # ── GUI thread ──
+
+    def _heartbeat(self):
+        if self.page is not None:
+            try:
+                self._page_name = self.page()
+            except Exception:
+                self._page_name = "?"
+        self._beat = time.monotonic()
+
+    # ── watchdog thread ──
+
+    def _sample(self) -> str:
+        frame = sys._current_frames().get(self._gui_ident)
+        return "".join(traceback.format_stack(frame)) if frame is not None else "(no frame)\n"
+
+    def _watch(self):
+        check = min(self.threshold / 2, 0.1)
+        while not self._stop.wait(check):
+            beat = self._beat
+            if time.monotonic() - beat < self.threshold:
+                continue
+            # stalled: sample every `threshold` until the heartbeat moves
+            page, samples = self._page_name, []
+            while self._beat == beat and not self._stop.is_set():
+                if len(samples) < self.max_samples:
+                    samples.append(self._sample())
+                self._stop.wait(self.threshold)
+            end = self._beat if self._beat != beat else time.monotonic()
+            self._record((end - beat) * 1000, page, samples)
+
+    def _record(self, ms: float, page: str, samples: list[str]):
+        stacks = {}                         # stack → times seen, in first-seen order
+        for s in samples:
+            stacks[s] = stacks.get(s, 0) + 1
+        self.recent.append({
+            "when": time.time(), "ms": ms, "page": page,
+            "stacks": [{"count": n, "stack": s} for s, n in stacks.items()],
+        })
+        lines = [f"STALL {ms:.0f} ms on {page or '?'} ({len(samples)} samples)"]
+        for s, n in stacks.items():
+            body = s.rstrip("\n").splitlines()
+            frames = [line.strip() for line in body if line.startswith("  File ")]
+            lines.append(f"  ×{n}  {frames[-1] if frames else body[0]}")
+            lines += ["      " + line for line in body]
+        log.info("\n".join(lines))
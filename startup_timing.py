@@ -0,0 +1,59 @@
+# startup_timing.py
+"""
+Startup timing report. Set CUREVET_STARTUP_TIMING=1 to print how long
+each import and page construction took:
+
+    CUREVET_STARTUP_TIMING=1 python main.py
+
+Steps timed before report() are collected into one table. Steps timed
+afterwards (pages built on first navigation) are printed as they happen.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("CUREVET_STARTUP_TIMING", "") not in ("", "0")
+
+_t0       = time.perf_counter()
+_steps    = []          # (kind, label, ms)
+_reported = False
+
+
+@contextmanager
+def timed(kind: str, label: str):
+    """Time the block as one step, e.g. timed("import", "ui.report")."""
+    if not ENABLED:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        _steps.append((kind, label, ms))
+        if _reported:
+            print(f"[startup] {kind:<7} {label:<32} {ms:8.1f} ms", file=sys.stderr)
+
+
+def steps() -> list[tuple[str, str, float]]:
+    return list(_steps)
+
+
+def report() -> None:
+    """Print the steps collected so far and the time since process start."""
+    global _reported
+    if not ENABLED or _reported:
+        return
+    _reported = True
+    out = sys.stderr
+    print("[startup] ── timing ──", file=out)
+    for kind, label, ms in _steps:
+        print(f"[startup] {kind:<7} {label:<32} {ms:8.1f} ms", file=out)
+    total = {}
+    for kind, _, ms in _steps:
+        total[kind] = total.get(kind, 0.0) + ms
+    for kind, ms in total.items():
+        print(f"[startup] {kind:<7} {'(total)':<32} {ms:8.1f} ms", file=out)
+    print(f"[startup] {'ready':<7} {'since process start':<32} "
+          f"{(time.perf_counter() - _t0) * 1000:8.1f} ms", file=out)
@@ -5,13 +5,27 @@ from PyQt5.QtWidgets import (
     QWidget, QLabel, QLineEdit, QDateEdit, QSpinBox, QDoubleSpinBox,
     QPushButton, QFormLayout, QVBoxLayout, QHBoxLayout, QMessageBox,
     QFrame, QSizePolicy, QToolButton, QGraphicsDropShadowEffect,
-    QApplication, QCalendarWidget, QDialog
+    QApplication, QCalendarWidget, QDialog, QFileDialog
 )
 from PyQt5.QtGui import QFont, QPainter, QLinearGradient, QColor,QIcon
 from PyQt5.QtCore import Qt, QDate
 
 import db_manager
 from db_manager import add_or_restock_inventory, add_purchase
+from ui.db_write import run_write
+import inventory_import
+
+
+def _restock(batch: dict, purchase_date: str, unit_cost: float) -> int:
+    """Runs on the db_writer thread: the batch, then its purchase record."""
+    inv_id = add_or_restock_inventory(batch)
+    add_purchase(
+        inventory_id=inv_id,
+        purchase_date=purchase_date,
+        quantity=batch['quantity'],
+        unit_cost=unit_cost
+    )
+    return inv_id
 
 class StyledDialog(QDialog):
     # …
@@ -265,6 +279,7 @@ class AddInventoryPage(QWidget):
             "QPushButton:hover{background:#008080}"
         )
         save.clicked.connect(self._save)
+        self.save_btn = save
         cancel = QPushButton("✖ Cancel"); cancel.setFont(QFont("Segoe UI",18))
         cancel.setCursor(Qt.PointingHandCursor); cancel.setFixedSize(140,45)
         cancel.setStyleSheet(
@@ -272,6 +287,16 @@ class AddInventoryPage(QWidget):
             "QPushButton:hover{background:#8a0000}"
         )
         cancel.clicked.connect(self.on_back)
+        imp = QPushButton("📥 Import…"); imp.setFont(QFont("Segoe UI",18))
+        imp.setCursor(Qt.PointingHandCursor); imp.setFixedSize(160,45)
+        imp.setToolTip("Restock from a supplier invoice (.csv or .json)")
+        imp.setStyleSheet(
+            "QPushButton{background:#006666;color:white;border-radius:4px;}"
+            "QPushButton:hover{background:#004c4c}"
+        )
+        imp.clicked.connect(self._import)
+        self.import_btn = imp
+        btn_h.addWidget(imp)
         btn_h.addStretch(); btn_h.addWidget(save); btn_h.addWidget(cancel)
         content.addLayout(btn_h)
 
@@ -311,27 +336,67 @@ class AddInventoryPage(QWidget):
             'default_sell_price': sell
         }
 
-        # 2) Database operations
+        # 2) Database operations, on the writer thread
+        self.save_btn.setEnabled(False)
+        run_write(self, _restock, batch, pdate, cost,
+                  on_done=self._on_saved, on_error=self._on_save_error)
+
+    def _import(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Supplier Invoice", "", "Invoice (*.csv *.json)"
+        )
+        if not path:
+            return
         try:
-            inv_id = add_or_restock_inventory(batch)
-            add_purchase(
-                inventory_id=inv_id,
-                purchase_date=pdate,
-                quantity=qty,
-                unit_cost=cost
-            )
-        except Exception as e:
-            dlg = StyledDialog(
-                title="Error",
-                message=str(e),
+            result = inventory_import.load(path)
+        except (OSError, ValueError) as e:
+            self._on_save_error(e)
+            return
+        if not result.lines:
+            StyledDialog(
+                title="Nothing Imported",
+                message=result.summary(),
                 dialog_type=StyledDialog.WARNING,
                 buttons=[("OK", True)],
                 parent=self
-            )
-            dlg.exec_()
+            ).exec_()
             return
 
+        # every valid line in one transaction, on the writer thread
+        self.import_btn.setEnabled(False)
+
+        def done(n):
+            self.import_btn.setEnabled(True)
+            result.imported = n
+            StyledDialog(
+                title="Import Finished",
+                message=result.summary(),
+                dialog_type=StyledDialog.WARNING if result.errors else StyledDialog.INFO,
+                buttons=[("OK", True)],
+                parent=self
+            ).exec_()
+
+        def failed(e):
+            self.import_btn.setEnabled(True)
+            self._on_save_error(e)
+
+        run_write(self, db_manager.bulk_restock, result.lines,
+                  on_done=done, on_error=failed)
+
+    def _on_save_error(self, e):
+        self.save_btn.setEnabled(True)
+        dlg = StyledDialog(
+            title="Error",
+            message=str(e),
+            dialog_type=StyledDialog.WARNING,
+            buttons=[("OK", True)],
+            parent=self
+        )
+        dlg.exec_()
+
+    def _on_saved(self, inv_id):
         # 3) Success
+        self.save_btn.setEnabled(True)
         dlg = StyledDialog(
             title="Success",
             message="Inventory updated.",
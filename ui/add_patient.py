@@ -14,6 +14,18 @@ from db_manager import (
     get_owner_by_phone, add_owner, add_pet,
     find_pet, update_pet
 )
+from ui.db_write import run_write
+
+
+def _save_owner(owner: str, phone: str, species: str, pet: str):
+    """
+    Runs on the db_writer thread: make sure the species and owner exist,
+    and return (owner_id, the owner's existing pet of that name or None).
+    """
+    if species not in get_all_species():
+        add_species(species)
+    owner_id = add_owner({'name': owner, 'phone': phone})
+    return owner_id, find_pet(owner_id, species, pet)
 
 class StyledDialog(QDialog):
     INFO, WARNING, QUESTION = range(3)
@@ -308,6 +320,7 @@ class AddPatientPage(QWidget):
             "QPushButton:hover{background:#008080}"
         )
         save.clicked.connect(self._save)
+        self.save_btn = save
 
         cancel = QPushButton("✖ Cancel")
         cancel.setFont(QFont("Segoe UI", 18))
@@ -379,15 +392,23 @@ class AddPatientPage(QWidget):
             dlg.exec_()
             return
 
-        # ensure species/color exist
-        if species not in get_all_species():
-            add_species(species)
-
+        pet_data = {
+            'pet_name': pet,
+            'species': species,
+            'first_visit': first_visit,
+            'gender': gender
+        }
+        # owner (and species) are written on the db_writer thread
+        self.save_btn.setEnabled(False)
+        run_write(self, _save_owner, owner, phone, species, pet,
+                  on_done=lambda res: self._on_owner_saved(pet_data, *res),
+                  on_error=self._on_save_error)
 
-        owner_id = add_owner({'name': owner, 'phone': phone})
+    def _on_owner_saved(self, pet_data: dict, owner_id: int, existing):
+        pet_data['owner_id'] = owner_id
+        species, pet = pet_data['species'], pet_data['pet_name']
 
         # duplicate?
-        existing = find_pet(owner_id, species, pet)
         if existing:
             dlg = StyledDialog(
                 title="Pet Already Exists",
@@ -397,53 +418,34 @@ class AddPatientPage(QWidget):
                 parent=self
             )
             if dlg.exec_() == QDialog.Accepted:
-                pet_data = {
-                    'owner_id': owner_id,
-                    'pet_name': pet,
-                    'species': species,
-                    'first_visit': first_visit,
-                    'gender': gender
-                }
-                update_pet(existing['id'], pet_data)
-                dlg = StyledDialog(
-                    title="Updated",
-                    message="Pet record updated.",
-                    dialog_type=StyledDialog.INFO,
-                    buttons=[("OK", True)],
-                    parent=self
-                )
-                dlg.exec_()
-                self._clear_form()
-                self.on_back()
-                return
-
+                run_write(self, update_pet, existing['id'], pet_data,
+                          on_done=lambda _: self._on_saved("Updated", "Pet record updated."),
+                          on_error=self._on_save_error)
             else:
-                return
+                self.save_btn.setEnabled(True)
+            return
 
         # insert new
-        pet_data = {
-            'owner_id': owner_id,
-            'pet_name': pet,
-            'species': species,
-            'first_visit': first_visit,
-            'gender': gender
-        }
-        try:
-            add_pet(pet_data)
-        except Exception as e:
-            dlg = StyledDialog(
-                title="Database Error",
-                message=str(e),
-                dialog_type=StyledDialog.WARNING,
-                buttons=[("OK", True)],
-                parent=self
-            )
-            dlg.exec_()
-            return
+        run_write(self, add_pet, pet_data,
+                  on_done=lambda _: self._on_saved("Success", "Patient added."),
+                  on_error=self._on_save_error)
 
+    def _on_save_error(self, e):
+        self.save_btn.setEnabled(True)
         dlg = StyledDialog(
-            title="Success",
-            message="Patient added.",
+            title="Database Error",
+            message=str(e),
+            dialog_type=StyledDialog.WARNING,
+            buttons=[("OK", True)],
+            parent=self
+        )
+        dlg.exec_()
+
+    def _on_saved(self, title: str, message: str):
+        self.save_btn.setEnabled(True)
+        dlg = StyledDialog(
+            title=title,
+            message=message,
             dialog_type=StyledDialog.INFO,
             buttons=[("OK", True)],
             parent=self
@@ -452,7 +454,6 @@ class AddPatientPage(QWidget):
         self._clear_form()
         self.on_back()
 
-
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     page = AddPatientPage(on_back=app.quit)
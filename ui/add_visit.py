@@ -10,6 +10,8 @@ from PyQt5.QtGui import QFont, QPainter, QLinearGradient, QColor
 from PyQt5.QtCore import Qt, QDate
 
 import db_manager
+from ui.owner_search import OwnerSearchController, search_metrics
+from ui.db_write import run_write
 
 class ConfirmDialog(QDialog):
     def __init__(self, title: str, message: str, parent=None):
@@ -139,6 +141,7 @@ class AddVisitPage(QWidget):
         self.selected_owner = None
         self.selected_pet   = None
         self.visit_id       = None
+        self._stock         = {}    # db_manager.get_stock_snapshot()
 
         self._build_ui()
         self.reset_visit_forms()
@@ -239,7 +242,11 @@ class AddVisitPage(QWidget):
         p0.addWidget(QLabel("Search Owner:"))
         self.search_input = mk_lineedit(QLineEdit())
         self.search_input.setPlaceholderText("Name or phone…")
-        self.search_input.textChanged.connect(self.on_search_owner)
+        self.owner_search = OwnerSearchController(
+            self.search_input, self, metrics_hook=search_metrics.record
+        )
+        self.owner_search.results.connect(self.on_owner_results)
+        self.owner_search.failed.connect(self.on_owner_search_failed)
         p0.addWidget(self.search_input)
 
         p0.addWidget(QLabel("Owners:"))
@@ -497,22 +504,22 @@ class AddVisitPage(QWidget):
         self._goto(4)
 
 
-    def on_search_owner(self, text):
-        term = text.strip()
+    def on_owner_results(self, results):
+        """Newest owner_search result set (debounced, off the GUI thread)."""
         self.owner_list.clear()
         self.pet_list.clear()
         self.history_list.clear()
-        results = []
-        if term.isdigit():
-            o = db_manager.get_owner_by_phone(term)
-            if o: results = [o]
-        else:
-            results = db_manager.find_owners_by_name(term)
         for o in results:
             itm = QListWidgetItem(f"{o['name']} — {o['phone']}")
             itm.data = o
             self.owner_list.addItem(itm)
 
+    def on_owner_search_failed(self, error):
+        self.on_owner_results([])
+        itm = QListWidgetItem(f"⚠ Search failed: {error}")
+        itm.setFlags(Qt.NoItemFlags)
+        self.owner_list.addItem(itm)
+
     def on_owner_selected(self, item):
         self.selected_owner = item.data
         self.pet_list.clear()
@@ -543,8 +550,9 @@ class AddVisitPage(QWidget):
 
         src = QComboBox()
         # re-check inventory stock every time you add a medicine row
-        items = db_manager.get_all_inventory()
-        if any(item.get('quantity', 0) > 0 for item in items):
+        # (the same snapshot unless inventory changed since the last row)
+        self._stock = db_manager.get_stock_snapshot()
+        if self._stock:
             src.addItem("Inventory")
         src.addItem("Pharmacy")
 
@@ -553,12 +561,13 @@ class AddVisitPage(QWidget):
 
         # placeholder for medicine name / widget
         self.pres_table.setCellWidget(row, 1, QLineEdit())
-        # placeholder for batch combo or label
+        # placeholder for the batch plan label
         self.pres_table.setCellWidget(row, 2, QLabel(""))
 
         # qty and price
         qty = QSpinBox()
         qty.setMaximum(999)
+        qty.valueChanged.connect(lambda _, r=row: self._update_batch_plan(r))
         self.pres_table.setCellWidget(row, 3, qty)
 
         pr = QDoubleSpinBox()
@@ -572,92 +581,61 @@ class AddVisitPage(QWidget):
     def on_source_changed(self, row, source):
         if source == "Inventory":
             combo = QComboBox()
-            # only include medications with quantity > 0
-            for m in db_manager.get_all_inventory():
-                if m.get('quantity', 0) > 0:
-                    combo.addItem(m['name'], m)
+            # only include medications with quantity > 0, once per name
+            combo.addItems(list(self._stock))
             combo.currentTextChanged.connect(lambda n, r=row: self.load_batches(r, n))
             self.pres_table.setCellWidget(row, 1, combo)
 
-            batch = QComboBox()
-            self.pres_table.setCellWidget(row, 2, batch)
+            # batches are taken first-expired-first-out on save; show which
+            self.pres_table.setCellWidget(row, 2, QLabel(""))
             self.load_batches(row, combo.currentText())
         else:
             self.pres_table.setCellWidget(row, 1, QLineEdit())
             self.pres_table.setCellWidget(row, 2, QLabel("N/A"))
 
     def load_batches(self, row, med_name):
-        batch_combo = self.pres_table.cellWidget(row, 2)
-        price_spin  = self.pres_table.cellWidget(row, 4)
-
-        batch_combo.clear()
-        # only include batches that still have stock > 0
-        batches = [
-            b for b in db_manager.get_inventory_batches(med_name)
-            if b.get('quantity', 0) > 0
-        ]
-
-        for b in batches:
-            batch_combo.addItem(
-                f"{b['expiration_date']} (stock:{b['quantity']})",
-                b
-            )
-
-        if batches:
-            # pre-fill price with the first batch’s default_sell_price
-            price_spin.setValue(batches[0].get('default_sell_price', 0.0))
+        """Pre-fill the price from the first batch FEFO will use."""
+        price_spin = self.pres_table.cellWidget(row, 4)
+        entry = self._stock.get(med_name)
+        if entry:
+            price_spin.setValue(entry['batches'][0].get('default_sell_price') or 0.0)
         else:
             price_spin.setValue(0.0)
+        self._update_batch_plan(row)
 
-        # update price whenever a different batch is selected
-        batch_combo.currentIndexChanged.connect(
-            lambda idx, r=row: self._update_price_for_row(r)
-        )
-
+    def _update_batch_plan(self, row):
+        """Show the batches (expiry ×qty) this row will be dispensed from."""
+        if self.pres_table.cellWidget(row, 0).currentText() != "Inventory":
+            return
+        name  = self.pres_table.cellWidget(row, 1).currentText()
+        qty   = self.pres_table.cellWidget(row, 3).value()
+        label = self.pres_table.cellWidget(row, 2)
+        entry = self._stock.get(name)
+        if not entry:
+            label.setText("")
+            return
 
-    def _update_price_for_row(self, row):
-        batch_combo = self.pres_table.cellWidget(row, 2)
-        price_spin  = self.pres_table.cellWidget(row, 4)
-        batch = batch_combo.currentData()
-        if batch:
-            price_spin.setValue(batch.get('default_sell_price', 0.0))
+        parts, left = [], qty
+        for b in entry['batches']:
+            if left <= 0:
+                break
+            take = min(left, b['quantity'])
+            parts.append(f"{b['expiration_date'] or 'no expiry'} ×{take}")
+            left -= take
+        if not parts:
+            text = f"stock:{entry['available']}"
+        elif left > 0:
+            text = f"only {entry['available']} in stock"
         else:
-            price_spin.setValue(0.0)
+            text = ", ".join(parts)
+        label.setText(text)
 
     def on_save_prescriptions(self):
         row_count = self.pres_table.rowCount()
 
-        # 1) Create the visit record regardless of prescription rows
-        try:
-            self.visit_id = db_manager.add_visit(self.visit_data)
-        except Exception as e:
-            ConfirmDialog(
-                "Error Saving Visit",
-                str(e),
-                parent=self
-            ).exec_()
-            return
-
-        # 1a) Save all Future Appointments
-        for app in self.visit_data.get('future_appointments', []):
-            date   = app['date']
-            reason = app['reason']
-            # ensure reason exists (adds if new)
-            rid = db_manager.add_reason(reason) if reason else None
-            db_manager.add_future_appointment(self.visit_id, date, rid)
-
-
-        # 2) If no prescriptions were added, we’re done
-        if row_count == 0:
-            ConfirmDialog(
-                "Visit Saved",
-                "Visit has been saved (no medications added).",
-                parent=self
-            ).exec_()
-            self.reset_visit_forms()
-            return
-
-        # 3) Loop through each prescription row
+        # 1) Collect every prescription row before touching the database
+        prescriptions = []
+        needs = {}      # inventory medicine → total quantity across rows
         for row in range(row_count):
             source = self.pres_table.cellWidget(row, 0).currentText()
             is_inv = (source == "Inventory")
@@ -671,62 +649,63 @@ class AddVisitPage(QWidget):
                 continue
 
             if is_inv:
-                batch_combo = self.pres_table.cellWidget(row, 2)
-                batch       = batch_combo.currentData() or {}
-                inv_id      = batch.get('id')
-                available   = batch.get('quantity', 0)
-
-                if qty > available:
-                    ConfirmDialog(
-                        "Insufficient Stock",
-                        f"Requested {qty}, but only {available} available for batch {batch.get('expiration_date','?')}.",
-                        parent=self
-                    ).exec_()
-                    return
-
-                med_name = None
+                # dispensed FEFO by name across batches when the visit is saved
+                med_name = self.pres_table.cellWidget(row, 1).currentText()
+                inv_id   = None
+                needs[med_name] = needs.get(med_name, 0) + qty
             else:
                 med_item = self.pres_table.cellWidget(row, 1)
                 med_name = med_item.text().strip() or None
                 inv_id   = None
 
-            # insert prescription
-            try:
-                db_manager.add_prescription({
-                    'visit_id':     self.visit_id,
-                    'inventory_id': inv_id,
-                    'med_name':     med_name,
-                    'is_inventory': int(is_inv),
-                    'quantity':     qty,
-                    'unit_price':   price
-                })
-            except Exception as e:
-                ConfirmDialog(
-                    "Error Saving Prescription",
-                    str(e),
-                    parent=self
-                ).exec_()
-                return
-
-            # deduct stock if from inventory
-            if is_inv:
-                new_qty = available - qty
-                try:
-                    db_manager.update_inventory_quantity(inv_id, new_qty)
-                except Exception as e:
-                    ConfirmDialog(
-                        "Error Updating Stock",
-                        str(e),
-                        parent=self
-                    ).exec_()
-                    return
-
-        # 4) All done!
+            prescriptions.append({
+                'inventory_id': inv_id,
+                'med_name':     med_name,
+                'is_inventory': int(is_inv),
+                'quantity':     qty,
+                'unit_price':   price
+            })
+
+        short = []
+        for name, qty in needs.items():
+            available = self._stock.get(name, {}).get('available', 0)
+            if qty > available:
+                short.append(f"{name}: requested {qty}, only {available} available")
+        if short:
+            ConfirmDialog("Insufficient Stock", "\n".join(short), parent=self).exec_()
+            return
+
+        # 2) Write visit, future appointments, prescriptions and stock
+        #    changes in one transaction (stock is re-checked there), on
+        #    the db_writer thread
+        self.save_pres_btn.setEnabled(False)
+        run_write(
+            self, db_manager.commit_visit,
+            self.visit_data,
+            self.visit_data.get('future_appointments', []),
+            prescriptions,
+            on_done=lambda saved: self._on_visit_saved(saved, prescriptions),
+            on_error=self._on_visit_error
+        )
+
+    def _on_visit_error(self, e):
+        self.save_pres_btn.setEnabled(True)
         ConfirmDialog(
-            "Done",
-            "Visit and all prescriptions have been saved.",
+            "Error Saving Visit",
+            str(e),
             parent=self
         ).exec_()
+
+    def _on_visit_saved(self, saved: dict, prescriptions: list):
+        self.save_pres_btn.setEnabled(True)
+        self.visit_id = saved['visit_id']
+
+        # 3) All done!
+        if prescriptions:
+            msg = "Visit and all prescriptions have been saved."
+        else:
+            msg = "Visit has been saved (no medications added)."
+        ConfirmDialog("Done" if prescriptions else "Visit Saved", msg, parent=self).exec_()
         self.reset_visit_forms()
 
     def set_context(self, owner: dict, pet: dict):
@@ -815,18 +794,19 @@ class AddVisitPage(QWidget):
 
     def _save_apps_and_next(self):
         """
-        Collect the future-appointments table into visit_data,
-        persist any new reasons, then advance to Prescriptions.
+        Collect the future-appointments table into visit_data, then
+        advance to Prescriptions. New reasons are saved with the visit
+        (commit_visit adds them).
         """
         apps = []
         for r in range(self.app_table.rowCount()):
             date = self.app_table.cellWidget(r, 0).date().toString("yyyy-MM-dd")
             cb   = self.app_table.cellWidget(r, 1)
             reason = cb.currentText().strip()
-            if reason and reason not in db_manager.get_all_reasons():
-                db_manager.add_reason(reason)
             apps.append({'date': date, 'reason': reason})
 
         # attach to visit_data for later saving
         self.visit_data['future_appointments'] = apps
+        # one stock snapshot shared by every prescription row's combos
+        self._stock = db_manager.get_stock_snapshot()
         self._goto(3)
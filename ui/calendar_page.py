@@ -10,7 +10,8 @@ from PyQt5.QtCore import Qt, QDate
 
 
 import db_manager
-import wp
+import reminder_outbox
+from ui.db_write import run_write
 
 # ── New at top of file, after ModeSelectDialog ──
 class ConfirmDialog(QDialog):
@@ -168,10 +169,12 @@ class ModeSelectDialog(QDialog):
 class AppointmentCalendar(QCalendarWidget):
     """
     Subclass QCalendarWidget to draw a star on days that have appointments.
+    Markers come from day_counts ({date: count}), filled month by month
+    by CalendarPage; the widget holds no appointment records itself.
     """
-    def __init__(self, apps_by_date, *args, **kwargs):
+    def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.apps_by_date = apps_by_date
+        self.day_counts = {}
         self.selectionChanged.connect(
             lambda: self.parent().on_date_selected(self.selectedDate())
         )
@@ -179,7 +182,7 @@ class AppointmentCalendar(QCalendarWidget):
     def paintCell(self, painter, rect, date):
         super().paintCell(painter, rect, date)
         ds = date.toString("yyyy-MM-dd")
-        if ds in self.apps_by_date:
+        if self.day_counts.get(ds):
             painter.save()
             # draw a filled circle in the top-right corner
             painter.setBrush(QColor("#FF5722"))      # orange-red fill
@@ -196,15 +199,22 @@ class CalendarPage(QWidget):
     A page showing a styled calendar with appointment markers,
     a side panel listing the appointments for the selected date,
     and the ability to open a patient's history.
+
+    Only the month on screen is loaded in full; its neighbours (whose
+    edge days the grid also shows) get marker counts only. Loaded months
+    are cached until change_log's appointments version moves.
     """
+    MAX_CACHED_MONTHS = 6
+
     def __init__(self, on_back, on_show_history):
         super().__init__()
         self.on_back = on_back
         self.on_show_history = on_show_history
-        self._load_appointments()
+        self.months_loaded = {}    # (year, month) → {date: [records]}
+        self.counts_loaded = set() # (year, month) whose day counts are in cal.day_counts
+        self._version = None
         self.current_date = QDate.currentDate().toString("yyyy-MM-dd")
         self._build_ui()
-        self.on_date_selected(QDate.currentDate())
 
     def paintEvent(self, event):
         painter = QPainter(self)
@@ -214,42 +224,52 @@ class CalendarPage(QWidget):
         painter.fillRect(self.rect(), grad)
         super().paintEvent(event)
 
-    def _load_appointments(self):
-        """
-        Load all future appointments from the new table, grouped by date.
-        """
-        self.apps_by_date = {}
+    # ── Month-window loading ──
+
+    @staticmethod
+    def _month_range(year: int, month: int) -> tuple[str, str]:
+        """Future part of one month as a BETWEEN range (past days are never shown)."""
         today = QDate.currentDate().toString("yyyy-MM-dd")
-        conn = db_manager.get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT
-                v.id                  AS visit_id,
-                fa.appointment_date   AS next_appointment,
-                p.id                  AS pet_id,
-                p.pet_name,
-                p.species_id,
-                s.name                AS species,
-                o.id                  AS owner_id,
-                o.name                AS owner_name,
-                o.phone,
-                v.doctor_name,
-                r.name                AS reason
-            FROM future_appointments fa
-            JOIN visits          v  ON fa.visit_id    = v.id
-            JOIN pets            p  ON v.pet_id       = p.id
-            JOIN species         s  ON p.species_id   = s.id
-            JOIN owners          o  ON p.owner_id     = o.id
-            LEFT JOIN reasons    r  ON fa.reason_id   = r.id
-            WHERE fa.appointment_date >= ?
-            ORDER BY fa.appointment_date
-        """, (today,))
-        for r in cur.fetchall():
-            record = dict(r)
-            date = record['next_appointment']
-            # each record now includes record['reason']
-            self.apps_by_date.setdefault(date, []).append(record)
-        conn.close()
+        return max(f"{year:04d}-{month:02d}-01", today), f"{year:04d}-{month:02d}-31"
+
+    def _check_version(self):
+        """Drop every cached month if appointments were written since loading."""
+        version = db_manager.get_change_versions().get("appointments")
+        if version != self._version:
+            self._version = version
+            self.months_loaded.clear()
+            self.counts_loaded.clear()
+            self.cal.day_counts.clear()
+
+    def _load_counts(self, year: int, month: int):
+        if (year, month) not in self.counts_loaded:
+            self.cal.day_counts.update(
+                db_manager.get_appointment_counts(*self._month_range(year, month))
+            )
+            self.counts_loaded.add((year, month))
+
+    def _month_records(self, year: int, month: int) -> dict:
+        key = (year, month)
+        if key not in self.months_loaded:
+            by_date = {}
+            for record in db_manager.get_appointments_between(*self._month_range(year, month)):
+                by_date.setdefault(record['next_appointment'], []).append(record)
+            self.months_loaded[key] = by_date
+            while len(self.months_loaded) > self.MAX_CACHED_MONTHS:
+                del self.months_loaded[next(iter(self.months_loaded))]
+        return self.months_loaded[key]
+
+    def _load_window(self, year: int, month: int):
+        """Visible month in full, plus marker counts for it and both neighbours."""
+        self._check_version()
+        shown = QDate(year, month, 1)
+        for d in (shown.addMonths(-1), shown, shown.addMonths(1)):
+            self._load_counts(d.year(), d.month())
+        self._month_records(year, month)
+        self.cal.updateCells()
+
+    def _on_page_changed(self, year: int, month: int):
+        self._load_window(year, month)
 
     def _build_ui(self):
         main = QVBoxLayout(self)
@@ -272,8 +292,9 @@ class CalendarPage(QWidget):
         main.addLayout(hdr_layout)
 
         content = QHBoxLayout()
-        self.cal = AppointmentCalendar(self.apps_by_date)
+        self.cal = AppointmentCalendar()
         self.cal.setFont(QFont("Segoe UI", 18))
+        self.cal.currentPageChanged.connect(self._on_page_changed)
         content.addWidget(self.cal, 2)
 
         panel = QFrame()
@@ -301,18 +322,39 @@ class CalendarPage(QWidget):
         remind_btn.clicked.connect(self.on_send_reminders)
         side.addWidget(remind_btn)
 
+        # outbox progress (reminders are sent in the background)
+        self.outbox_lbl = QLabel()
+        self.outbox_lbl.setFont(QFont("Segoe UI", 14))
+        self.outbox_lbl.setWordWrap(True)
+        self.outbox_lbl.hide()
+        side.addWidget(self.outbox_lbl)
+
+        # shown while reminders have failed for good: send them again, or acknowledge
+        self.failed_row = QWidget()
+        failed_lay = QHBoxLayout(self.failed_row)
+        failed_lay.setContentsMargins(0, 0, 0, 0)
+        retry_btn = QPushButton("↻ Retry failed")
+        retry_btn.setFont(QFont("Segoe UI", 14))
+        retry_btn.setCursor(Qt.PointingHandCursor)
+        retry_btn.clicked.connect(self._retry_failed)
+        dismiss_btn = QPushButton("Dismiss")
+        dismiss_btn.setFont(QFont("Segoe UI", 14))
+        dismiss_btn.setCursor(Qt.PointingHandCursor)
+        dismiss_btn.clicked.connect(self._dismiss_failed)
+        failed_lay.addWidget(retry_btn)
+        failed_lay.addWidget(dismiss_btn)
+        self.failed_row.hide()
+        side.addWidget(self.failed_row)
+        reminder_outbox.dispatcher().progress.connect(self._on_outbox_progress)
+
         content.addWidget(panel, 1)
         main.addLayout(content)
 
     def showEvent(self, event):
         super().showEvent(event)
-        # 1) reload fresh data
-        self._load_appointments()
-        # 2) update the calendar’s appointment map
-        self.cal.apps_by_date = self.apps_by_date
-        # 3) force redraw of all cells (stars)
-        self.cal.updateCells()
-        # 4) refresh the side‐list for whatever date is currently selected
+        # 1) load the visible month (a no-op if cached and nothing changed)
+        self._load_window(self.cal.yearShown(), self.cal.monthShown())
+        # 2) refresh the side‐list for whatever date is currently selected
         self.on_date_selected(self.cal.selectedDate())
 
 
@@ -324,7 +366,8 @@ class CalendarPage(QWidget):
 
     def _show_appointments_for(self, date_str: str):
         self.list_widget.clear()
-        visits = self.apps_by_date.get(date_str, [])
+        year, month = int(date_str[:4]), int(date_str[5:7])
+        visits = self._month_records(year, month).get(date_str, [])
         if not visits:
             self.list_widget.addItem("(No appointments)")
         else:
@@ -404,12 +447,48 @@ class CalendarPage(QWidget):
                 'reason':           ' و '.join(g['reasons'])
             })
 
-        # 5) Send and confirm
-        wp.send_reminders(merged_apps, mode=mode)
+        # 5) Queue for the background dispatcher and confirm
+        outbox = []
+        for m in merged_apps:
+            number, message = reminder_outbox.compose_reminder(m)
+            outbox.append({'phone': number, 'message': message, 'mode': mode,
+                           'appointment_date': m['next_appointment']})
+        reminder_outbox.queue_reminders(outbox)
 
         dlg = ConfirmDialog(
-            "Reminders Sent",
-            f"Sent {len(merged_apps)} reminder(s) for {date_str}.",
+            "Reminders Queued",
+            f"Queued {len(merged_apps)} reminder(s) for {date_str}. "
+            "They are sent in the background.",
             parent=self
         )
         dlg.exec_()
+
+    def _retry_failed(self):
+        run_write(self, db_manager.retry_failed_reminders,
+                  on_done=lambda n: self._after_outbox_change(wake=True),
+                  on_error=self._on_outbox_error)
+
+    def _dismiss_failed(self):
+        run_write(self, db_manager.dismiss_failed_reminders,
+                  on_done=lambda n: self._after_outbox_change(),
+                  on_error=self._on_outbox_error)
+
+    def _after_outbox_change(self, wake: bool = False):
+        if wake:
+            reminder_outbox.dispatcher().wake()
+        self._on_outbox_progress(db_manager.get_outbox_counts())
+
+    def _on_outbox_error(self, e):
+        ConfirmDialog("Error", str(e), parent=self).exec_()
+
+    def _on_outbox_progress(self, counts: dict):
+        pending = counts['queued'] + counts['sending']
+        self.failed_row.setVisible(bool(counts['failed']))
+        if not pending and not counts['failed']:
+            self.outbox_lbl.hide()
+            return
+        text = f"📤 {pending} reminder(s) waiting to send"
+        if counts['failed']:
+            text += f" · ⚠ {counts['failed']} failed"
+        self.outbox_lbl.setText(text)
+        self.outbox_lbl.show()
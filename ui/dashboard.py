@@ -145,11 +145,10 @@ class DashboardWidget(QWidget):
         self._update_grid()
 
     def _update_notif_count(self):
-        count = len(self.notif_manager.fetch_notifications())
+        count = self.notif_manager.notification_count()
         self.notif_btn.setText(f"🔔 {count}")
 
     def resizeEvent(self, event):
-        self._update_notif_count()
         self._update_grid()
         super().resizeEvent(event)
 
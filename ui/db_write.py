@@ -0,0 +1,35 @@
+# ui/db_write.py
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import db_writer
+
+
+class _WriteSignals(QObject):
+    # result, exception (None on success)
+    done = pyqtSignal(object, object)
+
+
+def run_write(parent, fn, *args, on_done=None, on_error=None, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the db_writer thread and call on_done(result)
+    or on_error(exception) back on the GUI thread once it has committed.
+    `parent` (the page) owns the signal object, so a page that is gone by
+    then gets no callback.
+    """
+    signals = _WriteSignals(parent)
+
+    def finished(result, error):
+        signals.deleteLater()
+        if error is None:
+            if on_done:
+                on_done(result)
+        elif on_error:
+            on_error(error)
+
+    signals.done.connect(finished)
+    future = db_writer.submit(fn, *args, **kwargs)
+    future.add_done_callback(
+        lambda f: signals.done.emit(None if f.exception() else f.result(), f.exception())
+    )
+    return future
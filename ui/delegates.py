@@ -0,0 +1,41 @@
+# ui/delegates.py
+
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt5.QtGui import QPainter, QColor, QPen
+from PyQt5.QtCore import Qt, QEvent, QRect, pyqtSignal
+
+
+class ActionDelegate(QStyledItemDelegate):
+    """Paints a button-looking cell and reports clicks, without a real widget per row."""
+    clicked = pyqtSignal(int)   # row
+
+    def __init__(self, text, border, hover, parent=None, width=64,
+                 fill="white", color=Qt.black):
+        super().__init__(parent)
+        self.text   = text
+        self.border = QColor(border)
+        self.hover  = QColor(hover)
+        self.width  = width
+        self.fill   = QColor(fill)
+        self.color  = QColor(color)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        btn = QRect(0, 0, min(option.rect.width() - 16, self.width),
+                    min(option.rect.height() - 16, 40))
+        btn.moveCenter(option.rect.center())
+        hovered = option.state & QStyle.State_MouseOver
+        painter.setPen(QPen(self.border, 2))
+        painter.setBrush(self.hover if hovered else self.fill)
+        painter.drawRoundedRect(btn, 6, 6)
+        font = painter.font(); font.setPixelSize(16); painter.setFont(font)
+        painter.setPen(self.color)
+        painter.drawText(btn, Qt.AlignCenter, self.text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            self.clicked.emit(index.row())
+            return True
+        return False
@@ -3,19 +3,105 @@
 import sys
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QToolButton, QPushButton, QFrame,
-    QTableWidget, QTableWidgetItem, QHBoxLayout, QVBoxLayout,
+    QTableView, QHBoxLayout, QVBoxLayout,
     QSizePolicy, QGraphicsDropShadowEffect, QApplication,
     QAbstractItemView, QInputDialog, QMessageBox,QHeaderView
 )
 from PyQt5.QtGui import QFont, QPainter, QLinearGradient, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
 
+from ui.delegates import ActionDelegate
+from ui.db_write import run_write
 from db_manager import (
-    get_all_inventory,
+    get_inventory_page,
     delete_inventory_item,
-    update_inventory_item
+    set_reorder_level
 )
 
+
+class InventoryModel(QAbstractTableModel):
+    """
+    Inventory batches with non-zero stock, fetched a page at a time as
+    the view scrolls (canFetchMore / fetchMore over get_inventory_page).
+    """
+    HEADERS = ["Name", "Category", "Qty", "Unit", "Reorder", "Expiry", "Edit", "Delete"]
+    KEYS    = ["name", "category", "quantity", "unit", "reorder_level", "expiration_date"]
+    PAGE    = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._exhausted = False
+
+    def reload(self):
+        """Drop every loaded row; the view pulls the first page back in."""
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+
+    def row_data(self, row: int) -> dict:
+        return self._rows[row]
+
+    def find_row(self, item_id: int):
+        """Row of batch `item_id`, or None if it is no longer loaded."""
+        for row, r in enumerate(self._rows):
+            if r['id'] == item_id:
+                return row
+        return None
+
+    def update_row(self, row: int, changes: dict):
+        self._rows[row].update(changes)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.KEYS) - 1))
+
+    def remove_row(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    # ── Qt model interface ──
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() >= len(self.KEYS):
+            return None
+        if role == Qt.DisplayRole:
+            value = self._rows[index.row()][self.KEYS[index.column()]]
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after = None
+        if self._rows:
+            last  = self._rows[-1]
+            after = (last['name'], last['expiration_date'], last['id'])
+        page = get_inventory_page(after, self.PAGE)
+        self._exhausted = len(page) < self.PAGE
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+
 class InventoryListPage(QWidget):
     def __init__(self, on_back, on_add):
         super().__init__()
@@ -25,10 +111,10 @@ class InventoryListPage(QWidget):
         self.on_back = on_back
         self.on_add  = on_add
         self._build_ui()
-        self._load_data()
 
     def showEvent(self, event):
-        self._load_data()
+        # cheap: only the first page is fetched, the rest as the user scrolls
+        self.model.reload()
         super().showEvent(event)
 
     def paintEvent(self, event):
@@ -90,11 +176,19 @@ class InventoryListPage(QWidget):
         container.setSpacing(10)
 
         # table
-        self.tbl = QTableWidget(0, 8)
-        self.tbl.setHorizontalHeaderLabels([
-            "Name", "Category", "Qty", "Unit",
-            "Reorder", "Expiry", "Edit", "Delete"
-        ])
+        self.model = InventoryModel(self)
+        self.tbl = QTableView()
+        self.tbl.setModel(self.model)
+
+        # — edit/delete actions are painted, not per-row QPushButtons —
+        self.edit_delegate = ActionDelegate("📝", "#007f7f", "#e0ffff", self.tbl)
+        self.edit_delegate.clicked.connect(self._edit_reorder)
+        self.tbl.setItemDelegateForColumn(6, self.edit_delegate)
+        self.del_delegate = ActionDelegate("🗑️", "#b40000", "#ffe5e5", self.tbl)
+        self.del_delegate.clicked.connect(self._remove)
+        self.tbl.setItemDelegateForColumn(7, self.del_delegate)
+        self.tbl.setMouseTracking(True)     # hover highlight + hand cursor
+        self.tbl.entered.connect(self._on_cell_entered)
 
         # — make table non-editable & non-selectable —
         self.tbl.setEditTriggers(QAbstractItemView.NoEditTriggers)
@@ -105,17 +199,17 @@ class InventoryListPage(QWidget):
         header.setSectionResizeMode(QHeaderView.Stretch)
 
 
-        # — word-wrap + auto row sizing with minimum height —
+        # — word-wrap + fixed 100px rows (ResizeToContents would measure every row) —
         self.tbl.setWordWrap(True)
         # apply a larger global font
         self.tbl.setFont(QFont("Arial", 20))
         vh = self.tbl.verticalHeader()
-        vh.setSectionResizeMode(QHeaderView.ResizeToContents)
+        vh.setSectionResizeMode(QHeaderView.Fixed)
         vh.setMinimumSectionSize(100)   # rows at least 100px tall now
         vh.setDefaultSectionSize(100)   # default height for new rows
         # — clean, neutral-themed styling with larger font —
         self.tbl.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;
                 font-size: 20px;
                 border: 1px solid #ccc;
@@ -130,11 +224,11 @@ class InventoryListPage(QWidget):
                 padding: 8px;
                 border: none;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px;
                 border-bottom: 1px solid #eee;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #f2f2f2;
             }
         """)
@@ -142,59 +236,12 @@ class InventoryListPage(QWidget):
         container.addWidget(self.tbl)
         main.addWidget(panel)
 
-    def _load_data(self):
-        self.tbl.setRowCount(0)
-        for item in get_all_inventory():
-            if item['quantity'] == 0:
-                continue
-
-            r = self.tbl.rowCount()
-            self.tbl.insertRow(r)
-            # populate columns
-            self.tbl.setItem(r, 0, QTableWidgetItem(item['name']))
-            self.tbl.setItem(r, 1, QTableWidgetItem(item['category']))
-            self.tbl.setItem(r, 2, QTableWidgetItem(str(item['quantity'])))
-            self.tbl.setItem(r, 3, QTableWidgetItem(item['unit']))
-            self.tbl.setItem(r, 4, QTableWidgetItem(str(item['reorder_level'])))
-            self.tbl.setItem(r, 5, QTableWidgetItem(item['expiration_date']))
-
-            # Edit reorder
-            edit_btn = QPushButton("📝")
-            edit_btn.setCursor(Qt.PointingHandCursor)
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background: white;
-                    border: 2px solid #007f7f;
-                    border-radius: 6px;
-                    font-size: 16px;
-                    padding: 4px 8px;
-                }
-                QPushButton:hover {
-                    background: #e0ffff;
-                }
-            """)
-            edit_btn.clicked.connect(lambda _, it=item: self._edit_reorder(it))
-            self.tbl.setCellWidget(r, 6, edit_btn)
-
-            # Delete
-            del_btn = QPushButton("🗑️")
-            del_btn.setCursor(Qt.PointingHandCursor)
-            del_btn.setStyleSheet("""
-                QPushButton {
-                    background: white;
-                    border: 2px solid #b40000;
-                    border-radius: 6px;
-                    font-size: 16px;
-                    padding: 4px 8px;
-                }
-                QPushButton:hover {
-                    background: #ffe5e5;
-                }
-            """)
-            del_btn.clicked.connect(lambda _, iid=item['id']: self._remove(iid))
-            self.tbl.setCellWidget(r, 7, del_btn)
-
-    def _edit_reorder(self, item):
+    def _on_cell_entered(self, index):
+        cursor = Qt.PointingHandCursor if index.column() >= 6 else Qt.ArrowCursor
+        self.tbl.viewport().setCursor(cursor)
+
+    def _edit_reorder(self, row):
+        item = self.model.row_data(row)
         new_val, ok = QInputDialog.getInt(
             self,
             "Edit Reorder Level",
@@ -203,21 +250,34 @@ class InventoryListPage(QWidget):
         )
         if not ok:
             return
-        update_inventory_item(item['id'], {
-            'name':               item['name'],
-            'category':           item['category'],
-            'quantity':           item['quantity'],
-            'unit':               item['unit'],
-            'reorder_level':      new_val,
-            'expiration_date':    item['expiration_date'],
-            'default_sell_price': item['default_sell_price']
-        })
+        # only the level: the cached row's quantity may be stale
+        run_write(
+            self, set_reorder_level, item['id'], new_val,
+            on_done=lambda _: self._on_reorder_saved(item['id'], new_val),
+            on_error=self._on_write_error
+        )
+
+    def _on_reorder_saved(self, item_id, level):
+        row = self.model.find_row(item_id)
+        if row is not None:
+            self.model.update_row(row, {'reorder_level': level})
         QMessageBox.information(self, "Updated", "Reorder level updated.")
-        self._load_data()
 
-    def _remove(self, item_id):
-        delete_inventory_item(item_id)
-        self._load_data()
+    def _remove(self, row):
+        item_id = self.model.row_data(row)['id']
+        run_write(
+            self, delete_inventory_item, item_id,
+            on_done=lambda _: self._on_removed(item_id),
+            on_error=self._on_write_error
+        )
+
+    def _on_removed(self, item_id):
+        row = self.model.find_row(item_id)
+        if row is not None:
+            self.model.remove_row(row)
+
+    def _on_write_error(self, e):
+        QMessageBox.warning(self, "Error", str(e))
 
 
 if __name__ == "__main__":
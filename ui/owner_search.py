@@ -0,0 +1,160 @@
+# ui/owner_search.py
+
+import time
+import logging
+import threading
+from collections import deque
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+import db_manager
+
+log = logging.getLogger(__name__)
+
+
+class SearchMetrics:
+    """
+    Query time of the last `window` owner searches, fed by the
+    controllers' metrics_hook; snapshot() summarises them.
+    """
+    def __init__(self, window: int = 500, slow_s: float = 0.25):
+        self.slow_s   = slow_s
+        self.count    = 0
+        self._recent  = deque(maxlen=window)    # seconds
+        self._lock    = threading.Lock()
+
+    def record(self, term: str, seconds: float, row_count: int):
+        with self._lock:
+            self.count += 1
+            self._recent.append(seconds)
+        if seconds >= self.slow_s:
+            log.warning("Slow owner search %r: %.0f ms, %d rows", term, seconds * 1000, row_count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count = self.count
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p / 100 * len(recent)))] * 1000 if recent else 0.0
+        return {
+            "count":  count,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "max_ms": recent[-1] * 1000 if recent else 0.0,
+        }
+
+
+search_metrics = SearchMetrics()
+
+
+class _SearchSignals(QObject):
+    # generation, term, rows, seconds spent in the query
+    done   = pyqtSignal(int, str, list, float)
+    failed = pyqtSignal(int, str, str)          # generation, term, error
+
+
+class _SearchJob(QRunnable):
+    """One search_owners() call on a pool thread."""
+    def __init__(self, controller, generation: int, term: str):
+        super().__init__()
+        self.controller = controller
+        self.generation = generation
+        self.term       = term
+
+    def run(self):
+        # superseded while waiting in the queue → skip the query entirely
+        if self.generation != self.controller.generation:
+            return
+        t0 = time.perf_counter()
+        try:
+            rows = db_manager.search_owners(self.term, self.controller.limit)
+        except Exception as e:
+            log.exception("Owner search for %r failed", self.term)
+            self.controller.signals.failed.emit(
+                self.generation, self.term, f"{type(e).__name__}: {e}"
+            )
+            return
+        self.controller.signals.done.emit(
+            self.generation, self.term, rows, time.perf_counter() - t0
+        )
+
+
+class OwnerSearchController(QObject):
+    """
+    Live owner search for a QLineEdit, shared by AddVisitPage and
+    ShowHistoryPage.
+
+    Keystrokes are debounced, the query runs on a QThreadPool worker,
+    and every new keystroke starts a new generation: queued jobs from
+    older generations are dropped and late results are ignored, so
+    `results` only ever fires with the newest result set.
+
+    metrics_hook(term, seconds, row_count) is called for each query that
+    completes, stale or not; the pages pass search_metrics.record. A
+    query that raises is logged, and `failed` fires if it was the newest.
+    """
+    results = pyqtSignal(list)
+    failed  = pyqtSignal(str)       # error of the newest search
+
+    def __init__(self, line_edit, parent=None, debounce_ms=150, limit=50,
+                 metrics_hook=None):
+        super().__init__(parent)
+        self.line_edit    = line_edit
+        self.limit        = limit
+        self.metrics_hook = metrics_hook
+        self.generation   = 0
+
+        # one thread: searches are sub-millisecond, there is nothing to parallelise
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self.signals = _SearchSignals(self)
+        self.signals.done.connect(self._on_done)
+        self.signals.failed.connect(self._on_failed)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._submit)
+
+        line_edit.textChanged.connect(self.schedule)
+
+    def schedule(self, text: str):
+        """Restart the debounce window for a new keystroke."""
+        self.generation += 1
+        self._pool.clear()
+        if not text.strip():
+            self._timer.stop()
+            self.results.emit([])
+        else:
+            self._timer.start()
+
+    def search_now(self, text: str) -> list:
+        """
+        Run the search synchronously and publish it as the newest result
+        (for callers that need owner_list filled before they continue).
+        """
+        self._timer.stop()
+        self.generation += 1
+        self._pool.clear()
+        t0 = time.perf_counter()
+        rows = db_manager.search_owners(text, self.limit) if text.strip() else []
+        self._report(text, rows, time.perf_counter() - t0)
+        self.results.emit(rows)
+        return rows
+
+    def _submit(self):
+        term = self.line_edit.text().strip()
+        self._pool.start(_SearchJob(self, self.generation, term))
+
+    def _on_done(self, generation: int, term: str, rows: list, seconds: float):
+        self._report(term, rows, seconds)
+        if generation == self.generation:
+            self.results.emit(rows)
+
+    def _on_failed(self, generation: int, term: str, error: str):
+        if generation == self.generation:
+            self.failed.emit(error)
+
+    def _report(self, term, rows, seconds):
+        if self.metrics_hook:
+            self.metrics_hook(term, seconds, len(rows))
@@ -3,12 +3,120 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit, QPushButton,
     QFrame, QSizePolicy, QGraphicsDropShadowEffect, QMessageBox, QCalendarWidget,
-    QTableWidget, QTableWidgetItem, QHeaderView,QDialog, QTextEdit
+    QTableWidget, QTableWidgetItem, QHeaderView,QDialog, QTextEdit, QTableView,
+    QMenu, QFileDialog
 )
 from PyQt5.QtGui import QFont, QPainter, QLinearGradient, QColor
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QAbstractTableModel, QModelIndex, pyqtSignal
 
 import db_manager
+from ui.delegates import ActionDelegate
+from ui.report_worker import ReportRunner, ExportThread
+
+
+class ReportModel(QAbstractTableModel):
+    """
+    One detail report, read a page at a time as the view scrolls. Pages
+    are fetched by a ReportRunner on its worker thread; fetchMore() only
+    sends the request, and the rows are appended when the page arrives.
+    """
+    PAGE = 500
+
+    status = pyqtSignal(str)
+
+    def __init__(self, runner: ReportRunner, parent=None):
+        super().__init__(parent)
+        self.runner  = runner
+        self.headers = []
+        self.keys    = []
+        self._rows   = []
+        self._query  = None         # (report, start_date, end_date)
+        self._job    = None         # job of the page being fetched
+        self._exhausted = True
+        worker = runner.worker
+        worker.page.connect(self._on_page)
+        worker.cancelled.connect(self._on_cancelled)
+        worker.failed.connect(self._on_failed)
+
+    def load(self, report: str, start_date: str, end_date: str, keys, headers):
+        self.beginResetModel()
+        self.keys, self.headers = keys, headers
+        self._rows  = []
+        self._query = (report, start_date, end_date)
+        self._job   = None
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def pending(self) -> bool:
+        return self._job is not None
+
+    def cancel(self):
+        if self._job is not None:
+            self.runner.cancel("page")
+
+    def row_data(self, row: int) -> dict:
+        return self._rows[row]
+
+    # ── Qt model interface ──
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() >= len(self.keys):
+            return None
+        if role == Qt.DisplayRole:
+            value = self._rows[index.row()].get(self.keys[index.column()])
+            return "" if value is None else str(value)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and self._job is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.canFetchMore():
+            return
+        report = self._query[0]
+        after  = db_manager.REPORT_KEYS[report](self._rows[-1]) if self._rows else None
+        self._job = self.runner.fetch_page(*self._query, after, self.PAGE)
+        self.status.emit(f"Loading… {len(self._rows)} rows")
+
+    # ── worker results ──
+
+    def _on_page(self, job: int, page: list, exhausted: bool):
+        if job != self._job:
+            return
+        self._job = None
+        self._exhausted = exhausted
+        if page:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+        more = "" if exhausted else " (scroll for more)"
+        self.status.emit(f"{len(self._rows)} rows{more}")
+
+    def _on_cancelled(self, job: int):
+        if job == self._job:
+            # left fetchable: scrolling to the bottom asks again
+            self._job = None
+            self.status.emit(f"Cancelled — {len(self._rows)} rows")
+
+    def _on_failed(self, job: int, error: str):
+        if job == self._job:
+            self._job = None
+            self._exhausted = True
+            self.status.emit(f"Failed: {error}")
+
 class VisitDetailsDialog(QDialog):
     def __init__(self, visit):
         super().__init__()
@@ -96,6 +204,11 @@ class ReportPage(QWidget):
     def __init__(self, on_back):
         super().__init__()
         self.on_back = on_back
+        self.runner  = ReportRunner(self)
+        self.runner.worker.summary.connect(self._on_summary)
+        self.runner.worker.failed.connect(self._on_summary_failed)
+        self.runner.worker.cancelled.connect(self._on_summary_cancelled)
+        self._summary_job = None
         self._build_ui()
         self.load_visits()
 
@@ -196,6 +309,7 @@ class ReportPage(QWidget):
         gen.setStyleSheet("background:#007777;color:white;padding:12px;border-radius:10px;")
         gen.clicked.connect(self._on_generate)
         body.addWidget(gen, alignment=Qt.AlignRight)
+        self.gen_btn = gen
 
         self.lbl_revenue = QLabel("Total Revenue: —")
         self.lbl_cost = QLabel("Total Cost: —")
@@ -216,9 +330,42 @@ class ReportPage(QWidget):
             b.setStyleSheet("background:#007777;color:white;padding:10px;border-radius:8px;")
             b.clicked.connect(func)
             btns.addWidget(b)
+
+        export = QPushButton("\u2b07 Export")
+        export.setFont(QFont("Segoe UI", 16))
+        export.setStyleSheet("background:#005555;color:white;padding:10px;border-radius:8px;")
+        menu = QMenu(export)
+        for label, report in [
+            ("Purchases",         "purchases"),
+            ("Sales",             "sales"),
+            ("Visits",            "visits"),
+            ("Financial summary", "summary"),
+        ]:
+            menu.addAction(label, lambda r=report: self._on_export(r))
+        export.setMenu(menu)
+        btns.addWidget(export)
+        self.export_btn = export
+        self._export = None
         body.addLayout(btns)
 
-        self.table = QTableWidget(0, 1)
+        status_row = QHBoxLayout()
+        self.status_lbl = QLabel("")
+        self.status_lbl.setFont(QFont("Segoe UI", 14))
+        self.status_lbl.setStyleSheet("color: #555;")
+        status_row.addWidget(self.status_lbl)
+        status_row.addStretch()
+        self.cancel_btn = QPushButton("\u23f9 Cancel")
+        self.cancel_btn.setFont(QFont("Segoe UI", 14))
+        self.cancel_btn.setStyleSheet("background:#cc4444;color:white;padding:8px;border-radius:6px;")
+        self.cancel_btn.clicked.connect(self._on_cancel)
+        self.cancel_btn.setVisible(False)
+        status_row.addWidget(self.cancel_btn)
+        body.addLayout(status_row)
+
+        self.model = ReportModel(self.runner, self)
+        self.model.status.connect(self._on_status)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setFont(QFont("Segoe UI", 18))
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         # ── Hide the default row numbers ──
@@ -226,20 +373,30 @@ class ReportPage(QWidget):
         # ── Remove grid lines and enable alternating row colors ──
         self.table.setShowGrid(False)
         self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setMouseTracking(True)      # hover state for the details button
+        # fixed row height: no per-row measuring however many rows stream in
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(56)
         self.table.setVisible(False)
+        self.details_delegate = ActionDelegate(
+            "View Details", "#006666", "#008080", self.table,
+            width=150, fill="#006666", color="white"
+        )
+        self.details_delegate.clicked.connect(self.show_visit_details)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;
                 font-size: 18px;
                 border: none;
                 border-radius: 8px;
                 alternate-background-color: #f9f9f9;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px;
                 border-bottom: 1px solid #eee;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e0f7fa;
             }
             QHeaderView::section {
@@ -275,114 +432,122 @@ class ReportPage(QWidget):
         if sd > ed:
             QMessageBox.warning(self, "Invalid Range", "Start date must be before end date.")
             return
-        stats = db_manager.get_revenue_and_cost(sd, ed)
-        count = db_manager.get_appointment_count(sd, ed)
+        self._summary_job = self.runner.fetch_summary(sd, ed)
+        self.gen_btn.setEnabled(False)
+        self.cancel_btn.setVisible(True)
+        self.status_lbl.setText("Calculating…")
+
+    def _on_summary(self, job: int, stats: dict):
+        if job != self._summary_job:
+            return
+        self._end_summary()
         self.lbl_revenue.setText(f"Total Revenue:  ${stats['revenue']:.2f}")
         self.lbl_cost.setText(f"Total Cost:     ${stats['cost']:.2f}")
-        self.lbl_appointments.setText(f"Appointments:   {count}")
+        self.lbl_appointments.setText(f"Appointments:   {stats['visits']}")
+
+    def _on_summary_failed(self, job: int, error: str):
+        if job == self._summary_job:
+            self._end_summary(f"Failed: {error}")
+
+    def _on_summary_cancelled(self, job: int):
+        # by the Cancel button, or superseded by a newer Generate
+        if job == self._summary_job:
+            self._end_summary()
+
+    def _end_summary(self, status: str = None):
+        self._summary_job = None
+        self.gen_btn.setEnabled(True)
+        if status is not None:
+            self.status_lbl.setText(status)
+        self._sync_cancel()
+
+    def _on_cancel(self):
+        summary = self._summary_job is not None
+        self.runner.cancel()
+        if self._export is not None:
+            self._export.cancel()
+        if summary:
+            self.status_lbl.setText("Cancelled")
+
+    def _on_status(self, text: str):
+        self.status_lbl.setText(text)
+        self._sync_cancel()
+
+    def _sync_cancel(self):
+        self.cancel_btn.setVisible(
+            self.model.pending() or self._summary_job is not None or self._export is not None
+        )
+
+    # ── Export ──
+
+    def _on_export(self, report: str):
+        sd, ed = self._range()
+        if sd > ed:
+            QMessageBox.warning(self, "Invalid Range", "Start date must be before end date.")
+            return
+        path, chosen = QFileDialog.getSaveFileName(
+            self, "Export Report", f"{report}_{sd}_{ed}.xlsx",
+            "Excel workbook (*.xlsx);;CSV (*.csv)"
+        )
+        if not path:
+            return
+        if not path.lower().endswith((".xlsx", ".csv")):
+            path += ".csv" if "csv" in chosen.lower() else ".xlsx"
+
+        self._export = ExportThread(report, sd, ed, path, self)
+        self._export.progress.connect(
+            lambda n: self.status_lbl.setText(f"Exporting… {n} rows"))
+        self._export.done.connect(
+            lambda p, n: self._end_export(f"Exported {n} rows to {p}"))
+        self._export.cancelled.connect(lambda: self._end_export("Export cancelled"))
+        self._export.failed.connect(self._on_export_failed)
+        self.export_btn.setEnabled(False)
+        self.status_lbl.setText("Exporting…")
+        self._export.start()
+        self._sync_cancel()
+
+    def _on_export_failed(self, error: str):
+        self._end_export("Export failed")
+        QMessageBox.warning(self, "Export Failed", error)
+
+    def _end_export(self, status: str):
+        self._export.wait()
+        self._export.deleteLater()
+        self._export = None
+        self.export_btn.setEnabled(True)
+        self.status_lbl.setText(status)
+        self._sync_cancel()
+
+    def _range(self):
+        return (self.start_date.date().toString("yyyy-MM-dd"),
+                self.end_date.date().toString("yyyy-MM-dd"))
 
     def load_purchases(self):
-        from db_manager import get_purchase_details
-        sd = self.start_date.date().toString("yyyy-MM-dd")
-        ed = self.end_date.date().toString("yyyy-MM-dd")
-        rows = get_purchase_details(sd, ed)
-        self._fill_table(rows, ["item", "quantity", "unit_cost", "total_cost", "purchase_date"],
-                         ["Item", "Qty", "Unit Cost", "Total", "Date"])
+        self._show_report("purchases",
+                          ["item", "quantity", "unit_cost", "total_cost", "purchase_date"],
+                          ["Item", "Qty", "Unit Cost", "Total", "Date"])
 
     def load_sales(self):
-        from db_manager import get_sales_details
-        sd = self.start_date.date().toString("yyyy-MM-dd")
-        ed = self.end_date.date().toString("yyyy-MM-dd")
-        rows = get_sales_details(sd, ed)
-        self._fill_table(rows, ["service", "owner", "quantity", "total", "visit_date"],
-                         ["Service", "Owner", "Qty", "Total", "Date"])
+        self._show_report("sales",
+                          ["service", "owner", "quantity", "total", "visit_date"],
+                          ["Service", "Owner", "Qty", "Total", "Date"])
 
     def load_visits(self):
-        from db_manager import get_visit_report_details
-        sd = self.start_date.date().toString("yyyy-MM-dd")
-        ed = self.end_date.date().toString("yyyy-MM-dd")
-        rows = get_visit_report_details(sd, ed)
-        self.visit_rows = rows
-        self._fill_table_with_details(rows)
-
-    def _fill_table(self, rows, keys, headers):
-        self.table.clear()
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
-        self.table.setRowCount(len(rows))
+        self._show_report("visits",
+                          ["pet_name", "owner", "visit_date", "doctor_name"],
+                          ["Pet", "Owner", "Date", "Doctor", "Details"])
+        self.table.setItemDelegateForColumn(4, self.details_delegate)
+
+    def _show_report(self, report, keys, headers):
+        """Point the model at a report; its first page loads in the background."""
+        self.table.setItemDelegateForColumn(4, None)
+        self.model.load(report, *self._range(), keys, headers)
         self.table.setVisible(True)
-        self.table.cellDoubleClicked.connect(self._on_notes_click)
-
-        for r, row in enumerate(rows):
-            for c, k in enumerate(keys):
-                item = QTableWidgetItem(str(row.get(k, "")))
-                self.table.setItem(r, c, item)
-                if headers[c] == "Notes":
-                    item.setForeground(QColor("blue"))
-                    item.setToolTip("Click to view details")
-                    item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-
-    def _on_notes_click(self, row, column):
-        if self.table.horizontalHeaderItem(column).text() != "Notes":
-            return
-        pet = self.table.item(row, 0).text()
-        owner = self.table.item(row, 1).text()
-        visit_date = self.table.item(row, 2).text()
-        doctor = self.table.item(row, 3).text()
-        notes = self.table.item(row, column).text()
-
-        details = f"""
-        <b>Pet:</b> {pet}<br>
-        <b>Owner:</b> {owner}<br>
-        <b>Date:</b> {visit_date}<br>
-        <b>Doctor:</b> {doctor}<br>
-        <b>Notes:</b><br>{notes}
-        """
-        QMessageBox.information(self, "Visit Details", details)
+        self.table.scrollToTop()
 
     def on_back(self):
         self.on_back()
 
-    def _fill_table_with_details(self, rows):
-        self.table.clear()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Pet", "Owner", "Date", "Doctor", "Details"])
-        self.table.setRowCount(len(rows))
-        self.table.setVisible(True)
-
-        # Remove old double‐click handler if present
-        try:
-            self.table.cellDoubleClicked.disconnect(self._on_notes_click)
-        except Exception:
-            pass
-
-        for r, visit in enumerate(rows):
-            self.table.setItem(r, 0, QTableWidgetItem(visit["pet_name"]))
-            self.table.setItem(r, 1, QTableWidgetItem(visit["owner"]))
-            self.table.setItem(r, 2, QTableWidgetItem(visit["visit_date"]))
-            self.table.setItem(r, 3, QTableWidgetItem(visit["doctor_name"]))
-
-            btn = QPushButton("View Details")
-            btn.setFont(QFont("Segoe UI", 16))
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #006666;
-                    color: white;
-                    border: none;
-                    border-radius: 6px;
-                    padding: 6px 12px;
-                }
-                QPushButton:hover {
-                    background-color: #008080;
-                }
-                QPushButton:pressed {
-                    background-color: #005757;
-                }
-            """)
-            btn.clicked.connect(lambda _, r=r: self.show_visit_details(r))
-            self.table.setCellWidget(r, 4, btn)
-
-
     def show_visit_details(self, row_index):
-        dlg = VisitDetailsDialog(self.visit_rows[row_index])
+        dlg = VisitDetailsDialog(self.model.row_data(row_index))
         dlg.exec_()
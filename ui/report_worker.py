@@ -0,0 +1,230 @@
+# ui/report_worker.py
+
+import sqlite3
+from collections import OrderedDict
+from PyQt5.QtCore import QCoreApplication, QObject, QThread, pyqtSignal, pyqtSlot
+
+import db_manager
+import report_export
+
+
+class ReportWorker(QObject):
+    """
+    Runs ReportPage's queries on its own QThread over a dedicated
+    db_manager.open_read_only() connection, so a long date range never
+    blocks the window.
+
+    Every request gets a job number, and the newest job of each kind
+    ("page" or "summary") is the current one. A newer request of the
+    same kind, or cancel(kind), makes the running one stale: the sqlite
+    progress handler aborts it mid-query, and queued requests for stale
+    jobs are skipped. A page request never cancels a summary, nor the
+    other way round. Every job ends with exactly one of page/summary,
+    failed or cancelled.
+
+    The summaries and first pages of the last `cache_size` date ranges
+    are kept and reused until anything is written to the database
+    (PRAGMA data_version moves); later pages are never cached, the
+    ReportModel already holds them.
+    """
+    KINDS = ("page", "summary")
+
+    page      = pyqtSignal(int, list, bool)    # job, rows, exhausted
+    summary   = pyqtSignal(int, dict)          # job, get_financial_summary()
+    progress  = pyqtSignal(int, int)           # job, rows read so far
+    failed    = pyqtSignal(int, str)           # job, error
+    cancelled = pyqtSignal(int)                # job
+
+    # queued into the worker thread by ReportRunner
+    _fetch_page    = pyqtSignal(int, str, str, str, object, int)  # job, report, start, end, after, limit
+    _fetch_summary = pyqtSignal(int, str, str)                    # job, start, end
+
+    def __init__(self, cache_size: int = 8):
+        super().__init__()
+        self.cache_size = cache_size
+        self.current    = dict.fromkeys(self.KINDS, 0)  # kind → newest job; written by the GUI thread
+        self._jobs      = 0                             # last job number handed out
+        self._conn      = None
+        self._version   = None
+        self._cache     = OrderedDict()
+        self._fetch_page.connect(self._on_fetch_page)
+        self._fetch_summary.connect(self._on_fetch_summary)
+
+    # ── GUI thread ──
+
+    def _next_job(self) -> int:
+        # one sequence for both kinds, so a job number is never ambiguous
+        self._jobs += 1
+        return self._jobs
+
+    def start(self, kind: str) -> int:
+        """A new job of `kind`; the one it replaces becomes stale."""
+        self.current[kind] = job = self._next_job()
+        return job
+
+    def cancel(self, kind: str = None):
+        """Abandon the running job of `kind` (of every kind if None)."""
+        for k in (kind,) if kind else self.KINDS:
+            self.current[k] = self._next_job()
+
+    # ── worker thread ──
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = db_manager.open_read_only()
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+        return self._conn
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _run(self, kind: str, job: int, work):
+        if job != self.current[kind]:
+            self.cancelled.emit(job)    # superseded while queued
+            return
+        try:
+            conn = self._connection()
+            conn.set_progress_handler(lambda: job != self.current[kind], 1000)
+            try:
+                work(conn)
+            finally:
+                conn.set_progress_handler(None, 0)
+        except sqlite3.OperationalError as e:
+            if job != self.current[kind] or "interrupted" in str(e):
+                self.cancelled.emit(job)
+            else:
+                self.failed.emit(job, str(e))
+        except Exception as e:
+            self.failed.emit(job, f"{type(e).__name__}: {e}")
+
+    @pyqtSlot(int, str, str, str, object, int)
+    def _on_fetch_page(self, job, report, start_date, end_date, after, limit):
+        def work(conn):
+            key  = ("page", report, start_date, end_date, limit)
+            rows = self._cached(key) if after is None else None
+            if rows is None:
+                rows = db_manager.get_report_page(report, start_date, end_date, after, limit, conn)
+                if after is None:
+                    self._store(key, rows)
+            self.progress.emit(job, len(rows))
+            self.page.emit(job, rows, len(rows) < limit)
+        self._run("page", job, work)
+
+    @pyqtSlot(int, str, str)
+    def _on_fetch_summary(self, job, start_date, end_date):
+        def work(conn):
+            key   = ("summary", start_date, end_date)
+            stats = self._cached(key)
+            if stats is None:
+                stats = db_manager.get_financial_summary(start_date, end_date, conn)
+                self._store(key, stats)
+            self.summary.emit(job, stats)
+        self._run("summary", job, work)
+
+    @pyqtSlot()
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class ReportRunner(QObject):
+    """
+    Owns the worker thread. Each fetch_*() supersedes the earlier request
+    of its kind and returns its job number; results arrive through
+    `worker`'s signals, queued back to the GUI thread.
+    """
+    def __init__(self, parent=None, cache_size: int = 8):
+        super().__init__(parent)
+        self.worker  = ReportWorker(cache_size)
+        self._thread = QThread(self)
+        self.worker.moveToThread(self._thread)
+        self._thread.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def fetch_page(self, report, start_date, end_date, after, limit) -> int:
+        """`after` is db_manager.REPORT_KEYS[report] of the last row held, or None."""
+        job = self.worker.start("page")
+        self.worker._fetch_page.emit(job, report, start_date, end_date, after, limit)
+        return job
+
+    def fetch_summary(self, start_date, end_date) -> int:
+        job = self.worker.start("summary")
+        self.worker._fetch_summary.emit(job, start_date, end_date)
+        return job
+
+    def cancel(self, kind: str = None):
+        self.worker.cancel(kind)
+
+    def stop(self, wait_ms: int = 5000):
+        """Abandon any query and end the thread (also run on aboutToQuit)."""
+        self.worker.cancel()
+        self._thread.quit()
+        self._thread.wait(wait_ms)
+        self.worker.close()
+
+
+class ExportThread(QThread):
+    """
+    One report_export.export() on its own thread and read-only
+    connection. cancel() stops it between rows or mid-query; the
+    partial file is removed.
+    """
+    progress  = pyqtSignal(int)         # rows written so far
+    done      = pyqtSignal(str, int)    # path, rows written
+    failed    = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, report: str, start_date: str, end_date: str, path: str, parent=None):
+        super().__init__(parent)
+        self.args       = (report, start_date, end_date, path)
+        self._cancelled = False
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def stop(self):
+        self.cancel()
+        self.wait()
+
+    def _progress(self, rows: int) -> bool:
+        self.progress.emit(rows)
+        return self._cancelled
+
+    def run(self):
+        try:
+            conn = db_manager.open_read_only()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        conn.set_progress_handler(lambda: self._cancelled, 10000)
+        try:
+            n = report_export.export(*self.args, conn=conn, progress=self._progress)
+        except (report_export.Cancelled, sqlite3.OperationalError) as e:
+            if self._cancelled:
+                self.cancelled.emit()
+            else:
+                self.failed.emit(str(e))
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+        else:
+            self.done.emit(self.args[3], n)
+        finally:
+            conn.close()
@@ -11,6 +11,7 @@ from PyQt5.QtCore import Qt
 
 
 import db_manager
+from ui.owner_search import OwnerSearchController, search_metrics
 
 class ShowHistoryPage(QWidget):
     def __init__(self, on_back, on_add_visit):
@@ -102,7 +103,11 @@ class ShowHistoryPage(QWidget):
         p0.addWidget(QLabel("Search Owner:"))
         self.search_input = mk_lineedit(QLineEdit())
         self.search_input.setPlaceholderText("Name or phone…")
-        self.search_input.textChanged.connect(self.on_search_owner)
+        self.owner_search = OwnerSearchController(
+            self.search_input, self, metrics_hook=search_metrics.record
+        )
+        self.owner_search.results.connect(self.on_owner_results)
+        self.owner_search.failed.connect(self.on_owner_search_failed)
         p0.addWidget(self.search_input)
 
         p0.addWidget(QLabel("Owners:"))
@@ -202,26 +207,25 @@ class ShowHistoryPage(QWidget):
     
     # ─── Handlers (from original) ───────────────────────────────────────────── :contentReference[oaicite:0]{index=0}
 
-    def on_search_owner(self, text):
-        term = text.strip()
+    def on_owner_results(self, results):
+        """Newest owner_search result set (debounced, off the GUI thread)."""
         self.owner_list.clear()
         self.pet_list.clear()
         self.history_list.clear()
         self.details.clear()
         self.new_visit_btn.setEnabled(False)
 
-        results = []
-        if term.isdigit():
-            owner = db_manager.get_owner_by_phone(term)
-            if owner: results = [owner]
-        else:
-            results = db_manager.find_owners_by_name(term)
-
         for o in results:
             item = QListWidgetItem(f"{o['name']} — {o['phone']}")
             item.data = o
             self.owner_list.addItem(item)
 
+    def on_owner_search_failed(self, error):
+        self.on_owner_results([])
+        itm = QListWidgetItem(f"⚠ Search failed: {error}")
+        itm.setFlags(Qt.NoItemFlags)
+        self.owner_list.addItem(itm)
+
     def on_owner_selected(self, item):
         self.selected_owner = item.data
         self.pet_list.clear()
@@ -1,8 +1,13 @@
 import sys, os
+import logging
 from PyQt5.QtWidgets import QWidget, QLabel, QProgressBar, QVBoxLayout, QApplication
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QThread, QElapsedTimer, pyqtSignal
 from PyQt5.QtGui import QPixmap
 
+from startup_timing import timed
+
+log = logging.getLogger(__name__)
+
 def resource_path(relative_path):
     """
     Get the absolute path to a resource, works for dev and for PyInstaller bundle.
@@ -13,15 +18,56 @@ def resource_path(relative_path):
         base = os.getcwd()
     return os.path.join(base, relative_path)
 
+class _TaskRunner(QThread):
+    """Runs the background startup tasks in order, off the GUI thread."""
+    step = pyqtSignal(int, str)     # index of the task about to run, its label
+
+    def __init__(self, tasks, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+
+    def run(self):
+        for i, (label, fn) in enumerate(self.tasks):
+            self.step.emit(i, label)
+            _run_task(label, fn)
+
+
+def _run_task(label, fn):
+    # a failing warm-up must not keep the app from opening; whatever it
+    # was preparing is simply done again on first use
+    with timed("task", label):
+        try:
+            fn()
+        except Exception:
+            log.exception("Startup task '%s' failed", label)
+
+
 class SplashScreen(QWidget):
+    """
+    Splash with a progress bar driven by real startup work.
+
+    tasks:     [(label, callable)] run in order on a background thread
+               (database open/migrate, cache warm-up, prefetches).
+    gui_tasks: [(label, callable)] run afterwards on the GUI thread, one
+               per event-loop turn so the bar keeps painting (e.g. building
+               widgets).
+    min_ms:    shortest time the splash stays up; 0 closes it as soon as
+               the last task is done.
+    """
     # Emitted when loading completes
     finished = pyqtSignal()
 
-    def __init__(self, logo_path="assets/logo.png", duration_ms=2000):
+    def __init__(self, logo_path="assets/logo.png", tasks=(), gui_tasks=(), min_ms=0):
         super().__init__()
-        self.duration = duration_ms
-        self.progress = 0
+        self.tasks     = list(tasks)
+        self.gui_tasks = list(gui_tasks)
+        self.min_ms    = min_ms
+        self.progress  = 0
+        self._started  = False
+        self._gui_done = 0
+        self._clock    = QElapsedTimer()
         self._build_ui(logo_path)
+        self._bar.setRange(0, max(1, len(self.tasks) + len(self.gui_tasks)))
 
         # Frameless, always on top, translucent background
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
@@ -33,11 +79,17 @@ class SplashScreen(QWidget):
         self.move(center.x() - self.width()//2,
                   center.y() - self.height()//2)
 
-        # Timer to advance the bar in 100 steps
-        interval = max(1, duration_ms // 100)
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self._update_progress)
-        self._timer.start(interval)
+        self._runner = _TaskRunner(self.tasks, self)
+        self._runner.step.connect(self._on_step)
+        self._runner.finished.connect(self._run_gui_tasks)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._started:
+            self._started = True
+            self._clock.start()
+            # let the first frame paint before any work starts
+            QTimer.singleShot(0, self._runner.start)
 
     def _build_ui(self, logo_path):
         layout = QVBoxLayout(self)
@@ -73,13 +125,43 @@ class SplashScreen(QWidget):
         """)
         layout.addWidget(self._bar)
 
-    def _update_progress(self):
-        self.progress += 1
-        self._bar.setValue(self.progress)
-        if self.progress >= 100:
-            self._timer.stop()
-            self.finished.emit()
-            self.close()
+        # Current startup task
+        self._status = QLabel("", self)
+        self._status.setAlignment(Qt.AlignCenter)
+        self._status.setStyleSheet("color: white; font-size: 12px;")
+        layout.addWidget(self._status)
+
+    def _on_step(self, index, label):
+        self._set_progress(index, label)
+
+    def _set_progress(self, done, label=""):
+        self.progress = done
+        self._bar.setValue(done)
+        self._status.setText(label)
+
+    def _run_gui_tasks(self):
+        i = self._gui_done
+        if i == len(self.gui_tasks):
+            self._finish()
+            return
+        label, fn = self.gui_tasks[i]
+        self._set_progress(len(self.tasks) + i, label)
+        # run it on the next turn so the label and bar paint first
+        QTimer.singleShot(0, lambda: self._run_gui_task(label, fn))
+
+    def _run_gui_task(self, label, fn):
+        _run_task(label, fn)
+        self._gui_done += 1
+        self._run_gui_tasks()
+
+    def _finish(self):
+        self._set_progress(self._bar.maximum())
+        wait = self.min_ms - self._clock.elapsed()
+        QTimer.singleShot(max(0, wait), self._emit_finished)
+
+    def _emit_finished(self):
+        self.finished.emit()
+        self.close()
 
     def keyPressEvent(self, event):
         # Ignore all key presses during the splash
@@ -87,8 +169,12 @@ class SplashScreen(QWidget):
 
 
 if __name__ == "__main__":
+    import time
     app = QApplication(sys.argv)
-    splash = SplashScreen(duration_ms=1500)
+    splash = SplashScreen(tasks=[
+        ("Opening database", lambda: time.sleep(0.3)),
+        ("Loading lookups",  lambda: time.sleep(0.2)),
+    ], gui_tasks=[("Preparing pages", lambda: time.sleep(0.1))])
     # Close the app once the splash finishes
     splash.finished.connect(app.quit)
     splash.show()
@@ -7,6 +7,7 @@ import sys
 import os
 import win32gui, win32con
 import ctypes
+import threading
 
 
 
@@ -49,78 +50,248 @@ def is_whatsapp_desktop_window(win) -> bool:
         return False
     return exe == "whatsapp.exe"
 
+# ── Readiness polling ──
+# Each step waits for the condition it actually needs (window present,
+# window focused, clipboard holding the message, title settled) instead
+# of sleeping a fixed time, and records how long the wait took.
+
+POLL_INTERVAL = 0.05
+DESKTOP_SETTLE_S = 2.0      # for the desktop chat to open when nothing shows it did
+# bucket upper bounds in milliseconds; the last bucket catches the rest
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class NotReady(TimeoutError):
+    """A readiness condition did not hold within its timeout."""
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram for one send step."""
+    def __init__(self):
+        self.buckets  = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count    = 0
+        self.total    = 0.0
+        self.max      = 0.0
+        self.timeouts = 0
+
+    def add(self, seconds: float, timed_out: bool = False):
+        ms = seconds * 1000
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.timeouts += timed_out
+
+    def percentile(self, p: float) -> float:
+        """Upper bucket bound (ms) containing the p-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                if i < len(LATENCY_BUCKETS_MS):
+                    return min(float(LATENCY_BUCKETS_MS[i]), self.max * 1000)
+                return self.max * 1000
+        return self.max * 1000
+
+    def snapshot(self) -> dict:
+        return {
+            "count":    self.count,
+            "mean_ms":  self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms":   self.percentile(50),
+            "p95_ms":   self.percentile(95),
+            "max_ms":   self.max * 1000,
+            "timeouts": self.timeouts,
+            "buckets":  dict(zip([*map(str, LATENCY_BUCKETS_MS), "inf"], self.buckets)),
+        }
+
+
+_latency      = {}
+_latency_lock = threading.Lock()
+_abort        = threading.Event()
+
+def _record(step: str, seconds: float, timed_out: bool = False):
+    with _latency_lock:
+        _latency.setdefault(step, LatencyHistogram()).add(seconds, timed_out)
+
+def latency_stats() -> dict:
+    """Per-step latency summary: {step: {count, mean_ms, p50_ms, p95_ms, ...}}."""
+    with _latency_lock:
+        return {step: h.snapshot() for step, h in _latency.items()}
+
+def reset_latency_stats():
+    with _latency_lock:
+        _latency.clear()
+
+def abort_sends():
+    """Make the send in progress give up at its next wait (app shutdown)."""
+    _abort.set()
+
+def _start_burst():
+    """A new burst of sends (idx 1): forget an earlier abort_sends()."""
+    _abort.clear()
+
+def _settle(seconds: float, step: str):
+    """
+    Wait a fixed time where no readiness signal exists; abort_sends()
+    cuts it short. Recorded under `step`.
+    """
+    if _abort.wait(seconds):
+        raise NotReady(f"{step}: aborted")
+    _record(step, seconds)
+
+def wait_until(condition, step: str, timeout: float, interval: float = POLL_INTERVAL):
+    """
+    Poll `condition()` until it returns something truthy and return that
+    value. Raises NotReady after `timeout` seconds, or at once after
+    abort_sends(). The wait is recorded under `step` either way.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + timeout
+    while True:
+        if _abort.is_set():
+            raise NotReady(f"{step}: aborted")
+        try:
+            result = condition()
+        except Exception:
+            result = None
+        if result:
+            _record(step, time.perf_counter() - t0)
+            return result
+        if time.perf_counter() >= deadline:
+            _record(step, time.perf_counter() - t0, timed_out=True)
+            raise NotReady(f"{step}: not ready after {timeout:.1f}s")
+        time.sleep(interval)
+
+def _find_window(predicate):
+    wins = [w for w in gw.getAllWindows() if predicate(w)]
+    return wins[0] if wins else None
+
+def _focus(win, step: str, timeout: float = 3.0):
+    """Activate `win` and wait until it really is the foreground window."""
+    try:
+        win.activate()
+    except Exception:
+        pass    # activate() raises spuriously on some Windows builds; the wait decides
+    wait_until(lambda: win32gui.GetForegroundWindow() == win._hWnd, step, timeout)
+
+def _paste(message: str):
+    """Put `message` on the clipboard, wait until it is there, then paste."""
+    pyperclip.copy(message)
+    wait_until(lambda: pyperclip.paste() == message, "clipboard", 2.0)
+    pyautogui.hotkey("ctrl", "v")
+
+def _web_loaded(win) -> bool:
+    """The WhatsApp Web page has rendered: no longer titled with its URL."""
+    return "WhatsApp" in win.title and "web.whatsapp.com" not in win.title
+
+def _title_settled(win, old_title: str, step: str, timeout: float):
+    """
+    Wait for a navigation in `win` to finish: the title must first move
+    away from `old_title` (the browser shows the URL while loading), then
+    read "WhatsApp" again once the chat has rendered. Raises NotReady if
+    the navigation is never seen to start (the keystrokes went elsewhere)
+    or does not finish within `timeout`.
+    """
+    # a fine poll: the URL title only shows while the page is loading
+    wait_until(lambda: win.title != old_title, step + ".start", min(timeout, 5.0), 0.01)
+    wait_until(lambda: _web_loaded(win), step + ".loaded", timeout)
+
+
 def send_via_web(chat_id: str, message: str, idx: int = 1) -> None:
     """
     Send via WhatsApp Web:
-    - open or focus the chat URL
+    - open or focus the chat URL and wait for it to load
     - accept any “Click to Chat” prompt
     - paste the message from clipboard
     - press Enter to send
     """
     encoded = urllib.parse.quote(message)
     url = f"https://web.whatsapp.com/send?phone={chat_id}&text={encoded}"
-
+    t0 = time.perf_counter()
 
     # focus existing WhatsApp Web tab or open a new one
-    tabs = [w for w in gw.getAllWindows() if is_whatsapp_web_window(w)]
-    if tabs:
-        win = tabs[0]
-        win.activate()
-        time.sleep(0.5)
+    win = _find_window(is_whatsapp_web_window)
+    if win:
+        _focus(win, "web.focus")
+        old_title = win.title
         pyautogui.hotkey("ctrl", "l")
-        time.sleep(0.1)
         pyautogui.hotkey("ctrl", "a")
-        time.sleep(0.1)
         pyautogui.typewrite(url)
         pyautogui.press("enter")
-        time.sleep(30)
+        _title_settled(win, old_title, "web.navigate", 30.0)
     else:
         webbrowser.open_new_tab(url)
+        win = wait_until(lambda: _find_window(is_whatsapp_web_window), "web.open", 30.0)
+        wait_until(lambda: _web_loaded(win), "web.open.loaded", 30.0)
+        _focus(win, "web.focus")
 
     pyautogui.press("enter")
-    time.sleep(1)
     # 2) paste the actual message
-    pyperclip.copy(message)
-    pyautogui.hotkey("ctrl", "v")
-    time.sleep(0.5)
+    _focus(win, "web.refocus")
+    _paste(message)
     # 3) send it
     pyautogui.press("enter")
+    _record("web.total", time.perf_counter() - t0)
 
 def send_via_desktop(chat_id: str, message: str, idx: int = 1) -> None:
     """
     Send via WhatsApp Desktop:
-    - launch whatsapp:// URI
+    - launch whatsapp:// URI and wait for the window
     - accept any new-chat confirmation
     - paste the message from clipboard
     - press Enter to send
     """
     uri = f"whatsapp://send?phone={chat_id}"
+    t0 = time.perf_counter()
+    fg_before = win32gui.GetForegroundWindow()
+    titles_before = {w._hWnd: w.title for w in gw.getAllWindows() if is_whatsapp_desktop_window(w)}
     try:
         os.startfile(uri)
     except Exception:
         webbrowser.open(uri)
 
-    # wait for app + any prompt
-    time.sleep(5 if idx == 1 else 2)
+    # wait for the app window (the first launch of a burst is the slow one)
+    win = wait_until(lambda: _find_window(is_whatsapp_desktop_window),
+                     "desktop.open", 20.0 if idx == 1 else 10.0)
+    # An already open window gives no sign that it switched to the new
+    # chat, so without one of these the message could go to the previous
+    # recipient: it was opened or brought to the front, or its title
+    # changed. Without any of them, only the full settle delay is safe.
+    def switched():
+        return (win._hWnd not in titles_before
+                or win.title != titles_before[win._hWnd]
+                or (fg_before != win._hWnd and win32gui.GetForegroundWindow() == win._hWnd))
+    try:
+        wait_until(switched, "desktop.switch", 3.0)
+        settle = DESKTOP_SETTLE_S / 4
+    except NotReady:
+        if _abort.is_set():
+            raise
+        settle = DESKTOP_SETTLE_S
+    _settle(settle, "desktop.settle")
+    _focus(win, "desktop.focus")
     # 1) accept new-chat confirmation
     pyautogui.press("enter")
-    time.sleep(1)
-    # 2) focus the Desktop window
-    wins = [w for w in gw.getAllWindows() if is_whatsapp_desktop_window(w)]
-    if wins:
-        win = wins[0]
-        win.activate()
-        time.sleep(0.5)
+    # 2) make sure the chat still has focus after the prompt closed
+    _focus(win, "desktop.refocus")
     # 3) paste and send
-    pyperclip.copy(message)
-    pyautogui.hotkey("ctrl", "v")
-    time.sleep(0.5)
+    _paste(message)
     pyautogui.press("enter")
+    _record("desktop.total", time.perf_counter() - t0)
 
 def send_whatsapp(chat_id: str, message: str, idx: int = 1, mode: str = "auto") -> None:
     """
-    Dispatch to the selected mode: "web", "desktop", or "auto".
+    Dispatch to the selected mode: "web", "desktop", or "auto". idx 1
+    starts a new burst.
     """
+    if idx == 1:
+        _start_burst()
     if mode == "web":
         send_via_web(chat_id, message, idx)
     elif mode == "desktop":
@@ -135,38 +306,14 @@ def send_whatsapp(chat_id: str, message: str, idx: int = 1, mode: str = "auto")
 
 def send_reminders(appointments: list, mode: str = "auto", delay: float = 2.0) -> None:
     """
-    Send WhatsApp reminders for a list of appointment dicts.
-    Each dict should have keys:
-      - phone:            recipient phone number (string)
-      - owner_name:       name of the recipient
-      - pet_name:         pet’s name(s)
-      - next_appointment: date string (yyyy-MM-dd)
-      - reason:           appointment reason/text
+    Send WhatsApp reminders for a list of appointment dicts (keys as in
+    reminder_outbox.compose_reminder), blocking until all are sent. The app queues them
+    through reminder_outbox instead.
     mode: "web", "desktop", or "auto"
     delay: seconds to wait between messages
     """
+    from reminder_outbox import compose_reminder
     for idx, v in enumerate(appointments, start=1):
-        number = v.get("phone", "")
-        # ensure country code
-        if number.startswith("0"):
-            number = "2" + number
-
-        name   = v.get("owner_name", "")
-        pet    = v.get("pet_name", "")
-        date   = v.get("next_appointment", "")
-        reason = v.get("reason", "")  # ← newly extracted
-
-        ts   = int(time.time())
-        link = f"https://www.facebook.com/share/1CdXFXvpQP/?_={ts}"
-        message = (
-            f"مرحبا {name} ,\n"
-            f"عيادة Cure تذكركم بموعد الزيارة القادمة لمتابعة سلامة {pet}\n"
-            f"بتاريخ {date}\n"
-            f"وذلك لإجراء موعد {reason}\n\n"  # ← inserted reason line
-            "و متنسوش تتابعوا نصايحنا و عروضنا على صفحة الفيسبوك:\n"
-            f"{link}"
-        )
-
+        number, message = compose_reminder(v)
         send_whatsapp(number, message, idx, mode)
         time.sleep(delay)
-